@@ -0,0 +1,34 @@
+"""index tp/sl order ids
+
+Revision ID: a6e2c8f4b153
+Revises: f3b9d4e2a718
+Create Date: 2026-10-18 15:02:44.871093
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6e2c8f4b153'
+down_revision: Union[str, None] = 'f3b9d4e2a718'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY cannot run inside a transaction; avoids locking trades while building
+    with op.get_context().autocommit_block():
+        op.create_index('ix_trades_tp_order_id', 'trades', ['tp_order_id'],
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_trades_sl_order_id', 'trades', ['sl_order_id'],
+                        postgresql_concurrently=True, if_not_exists=True)
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_trades_sl_order_id', table_name='trades',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_trades_tp_order_id', table_name='trades',
+                      postgresql_concurrently=True, if_exists=True)
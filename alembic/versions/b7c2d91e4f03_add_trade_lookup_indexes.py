@@ -0,0 +1,45 @@
+"""add trade lookup indexes
+
+Revision ID: b7c2d91e4f03
+Revises: a1a39eaf1fec
+Create Date: 2026-10-18 10:05:12.418305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7c2d91e4f03'
+down_revision: Union[str, None] = 'a1a39eaf1fec'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY cannot run inside a transaction; avoids locking trades while building
+    with op.get_context().autocommit_block():
+        op.create_index('ix_trades_mt5_ticket', 'trades', ['mt5_ticket'],
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_trades_account_login_mt5_ticket', 'trades', ['account_login', 'mt5_ticket'],
+                        postgresql_concurrently=True, if_not_exists=True)
+        # Predicate spelled like the ORM's is_closed.is_(False) so the planner matches it
+        op.create_index('ix_trades_open_created_at', 'trades', [sa.text('created_at DESC')],
+                        postgresql_where=sa.text('is_closed IS false'),
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_trades_pending_status', 'trades', ['status'],
+                        postgresql_where=sa.text("status IN ('pending', 'close_pending')"),
+                        postgresql_concurrently=True, if_not_exists=True)
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_trades_pending_status', table_name='trades',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_trades_open_created_at', table_name='trades',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_trades_account_login_mt5_ticket', table_name='trades',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_trades_mt5_ticket', table_name='trades',
+                      postgresql_concurrently=True, if_exists=True)
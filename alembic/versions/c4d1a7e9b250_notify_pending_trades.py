@@ -0,0 +1,44 @@
+"""notify pending trades
+
+Revision ID: c4d1a7e9b250
+Revises: b7c2d91e4f03
+Create Date: 2026-10-18 10:31:47.207114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d1a7e9b250'
+down_revision: Union[str, None] = 'b7c2d91e4f03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Wake group workers as soon as a trade needs placing or closing
+    op.execute("""
+        CREATE OR REPLACE FUNCTION notify_trade_pending() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify(
+                'trades_pending',
+                json_build_object('trade_id', NEW.trade_id, 'status', NEW.status)::text
+            );
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER trades_notify_pending
+        AFTER INSERT OR UPDATE OF status ON trades
+        FOR EACH ROW
+        WHEN (NEW.status IN ('pending', 'close_pending'))
+        EXECUTE FUNCTION notify_trade_pending()
+    """)
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS trades_notify_pending ON trades")
+    op.execute("DROP FUNCTION IF EXISTS notify_trade_pending()")
@@ -0,0 +1,27 @@
+"""add trade claim lease
+
+Revision ID: d2f6b8c3a914
+Revises: c4d1a7e9b250
+Create Date: 2026-10-18 10:52:03.551820
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2f6b8c3a914'
+down_revision: Union[str, None] = 'c4d1a7e9b250'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('trades', sa.Column('claimed_by', sa.String(length=100), nullable=True))
+    op.add_column('trades', sa.Column('lease_expires_at', sa.DateTime(timezone=True), nullable=True))
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('trades', 'lease_expires_at')
+    op.drop_column('trades', 'claimed_by')
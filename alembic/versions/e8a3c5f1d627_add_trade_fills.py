@@ -0,0 +1,55 @@
+"""add trade fills
+
+Revision ID: e8a3c5f1d627
+Revises: d2f6b8c3a914
+Create Date: 2026-10-18 11:14:38.906142
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8a3c5f1d627'
+down_revision: Union[str, None] = 'd2f6b8c3a914'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'trade_fills',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('trade_id', sa.String(length=50),
+                  sa.ForeignKey('trades.trade_id', ondelete='CASCADE'), nullable=False),
+        sa.Column('account_login', sa.String(length=50), nullable=False),
+        sa.Column('mt5_ticket', sa.String(length=50), nullable=True),
+        sa.Column('volume', sa.Numeric(), nullable=True),
+        sa.Column('fill_price', sa.Numeric(), nullable=True),
+        sa.Column('latency_ms', sa.Integer(), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False, server_default='open'),
+        sa.Column('error_message', sa.Text(), nullable=True),
+        sa.Column('claimed_by', sa.String(length=100), nullable=True),
+        sa.Column('lease_expires_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('closed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.UniqueConstraint('trade_id', 'account_login', name='uq_trade_fills_trade_account'),
+    )
+    op.create_index('ix_trade_fills_account_ticket', 'trade_fills', ['account_login', 'mt5_ticket'])
+
+    # Carry over the (last) follower ticket that was stored on the trade row
+    op.execute("""
+        INSERT INTO trade_fills (trade_id, account_login, mt5_ticket, status, created_at, closed_at)
+        SELECT trade_id, account_login, mt5_ticket,
+               CASE WHEN is_closed THEN 'closed' ELSE 'open' END,
+               COALESCE(executed_at, created_at), closed_at
+        FROM trades
+        WHERE trade_id IS NOT NULL AND account_login IS NOT NULL AND mt5_ticket IS NOT NULL
+        ON CONFLICT (trade_id, account_login) DO NOTHING
+    """)
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_trade_fills_account_ticket', table_name='trade_fills')
+    op.drop_table('trade_fills')
@@ -0,0 +1,27 @@
+"""add trade close details
+
+Revision ID: f3b9d4e2a718
+Revises: e8a3c5f1d627
+Create Date: 2026-10-18 14:21:37.204418
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b9d4e2a718'
+down_revision: Union[str, None] = 'e8a3c5f1d627'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('trades', sa.Column('close_reason', sa.String(length=20), nullable=True))
+    op.add_column('trades', sa.Column('close_price', sa.Numeric(), nullable=True))
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('trades', 'close_price')
+    op.drop_column('trades', 'close_reason')
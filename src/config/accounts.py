@@ -0,0 +1,31 @@
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, List
+
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+env_path = Path(__file__).parent.parent.parent / '.env'
+load_dotenv(env_path)
+
+logger = logging.getLogger(__name__)
+
+# MT5 accounts that trades are copied to
+ACCOUNTS_FILE = os.getenv(
+    'ACCOUNTS_FILE',
+    str(Path(__file__).parent.parent.parent / 'accounts.json')
+)
+
+def load_accounts(path: str = ACCOUNTS_FILE) -> List[Dict[str, Any]]:
+    """Load account list, or an empty list if the file is missing."""
+    if not os.path.exists(path):
+        logger.warning(f"Accounts file not found: {path}")
+        return []
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def load_account_logins(path: str = ACCOUNTS_FILE) -> List[str]:
+    """Load account logins only (no credentials)."""
+    return [str(account['login']) for account in load_accounts(path)]
@@ -0,0 +1,163 @@
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger('OrderCorrelation')
+
+class OrderCorrelation:
+    """Order ID -> trade_id map shared between process_order and process_execution.
+
+    Kept in memory for O(1) lookups and mirrored into a Redis hash so a proxy
+    restart can resolve executions for orders placed before it. Entries older
+    than ttl_seconds are dropped, and the least recently used go first past
+    max_size. Each entry also remembers whether its trade was already
+    published, so an order filling in parts is pushed to the workers once,
+    even across restarts.
+    """
+
+    def __init__(self, redis_client, async_redis_client, key: str = 'orders:pending',
+                 max_size: int = None, ttl_seconds: int = None):
+        self.redis = redis_client
+        self.async_redis = async_redis_client
+        self.key = key
+        self.max_size = max_size or int(os.getenv('ORDER_CORRELATION_MAX', '10000'))
+        self.ttl_seconds = ttl_seconds or int(os.getenv('ORDER_CORRELATION_TTL_SECONDS', '86400'))
+        self.entries: OrderedDict = OrderedDict()  # order_id -> (trade_id, created_at, published)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def hydrate(self) -> int:
+        """Load the mirrored map on startup, discarding anything past its TTL."""
+        try:
+            stored = self.redis.hgetall(self.key)
+        except Exception as e:
+            logger.error(f"Error hydrating order correlation: {e}")
+            return 0
+
+        entries, malformed = [], []
+        for order_id, value in stored.items():
+            try:
+                entry = json.loads(value)
+                entries.append((order_id, (entry['trade_id'], float(entry['created_at']), bool(entry.get('published', False)))))
+            except (ValueError, TypeError, KeyError) as e:
+                logger.error(f"Dropping malformed order correlation entry {order_id}: {e}")
+                malformed.append(order_id)
+
+        for order_id, entry in sorted(entries, key=lambda item: item[1][1]):
+            self.entries[order_id] = entry
+
+        evicted = [order_id for order_id, _ in self._evict()]
+        try:
+            if evicted or malformed:
+                self.redis.hdel(self.key, *evicted, *malformed)
+        except Exception as e:
+            logger.error(f"Error pruning order correlation: {e}")
+        logger.info(f"Order correlation hydrated with {len(self.entries)} orders ({len(evicted)} expired)")
+        return len(self.entries)
+
+    def _evict(self) -> List[Tuple[str, str]]:
+        """Drop expired entries from the least recently used end, then any beyond max_size."""
+        cutoff = time.time() - self.ttl_seconds
+        evicted = []
+        while self.entries:
+            order_id, (trade_id, created_at, _) = next(iter(self.entries.items()))
+            if created_at >= cutoff and len(self.entries) <= self.max_size:
+                break
+            self.entries.popitem(last=False)
+            evicted.append((order_id, trade_id))
+        self.evictions += len(evicted)
+        return evicted
+
+    @staticmethod
+    def _encode(trade_id: str, created_at: float, published: bool) -> str:
+        return json.dumps({'trade_id': trade_id, 'created_at': created_at, 'published': published})
+
+    async def add(self, order_id: str, trade_id: str) -> List[Tuple[str, str]]:
+        """Record an order; returns the (order_id, trade_id) pairs evicted to make room."""
+        created_at = time.time()
+        self.entries[order_id] = (trade_id, created_at, False)
+        self.entries.move_to_end(order_id)
+        evicted = self._evict()
+        try:
+            pipe = self.async_redis.pipeline(transaction=False)
+            pipe.hset(self.key, order_id, self._encode(trade_id, created_at, False))
+            if evicted:
+                pipe.hdel(self.key, *(evicted_id for evicted_id, _ in evicted))
+            pipe.expire(self.key, self.ttl_seconds)
+            await pipe.execute()
+        except Exception as e:
+            logger.error(f"Error mirroring order {order_id}: {e}")
+        return evicted
+
+    def get(self, order_id: str) -> Optional[str]:
+        entry = self.entries.get(order_id)
+        if entry is not None and entry[1] < time.time() - self.ttl_seconds:
+            # Expired but kept alive by recent lookups; its Redis copy goes at the next hydrate
+            del self.entries[order_id]
+            self.evictions += 1
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(order_id)
+        self.hits += 1
+        return entry[0]
+
+    def is_published(self, order_id: str) -> bool:
+        entry = self.entries.get(order_id)
+        return bool(entry and entry[2])
+
+    def claim_publish(self, order_id: str) -> bool:
+        """Flag the order as published before pushing it; False if it already is.
+
+        Synchronous, so two concurrent executions of one order cannot both
+        publish it. Call release_publish() if the push fails.
+        """
+        entry = self.entries.get(order_id)
+        if entry is None or entry[2]:
+            return False
+        self.entries[order_id] = (entry[0], entry[1], True)
+        return True
+
+    def release_publish(self, order_id: str) -> None:
+        entry = self.entries.get(order_id)
+        if entry is not None:
+            self.entries[order_id] = (entry[0], entry[1], False)
+
+    async def mark_published(self, order_id: str) -> None:
+        """Persist the published flag once the trade went to the workers."""
+        entry = self.entries.get(order_id)
+        if entry is None:
+            return
+        trade_id, created_at, _ = entry
+        self.entries[order_id] = (trade_id, created_at, True)
+        try:
+            await self.async_redis.hset(self.key, order_id, self._encode(trade_id, created_at, True))
+        except Exception as e:
+            logger.error(f"Error mirroring order {order_id}: {e}")
+
+    async def remove(self, order_id: str) -> None:
+        if self.entries.pop(order_id, None) is None:
+            return
+        try:
+            await self.async_redis.hdel(self.key, order_id)
+        except Exception as e:
+            logger.error(f"Error removing order {order_id}: {e}")
+
+    def __contains__(self, order_id: str) -> bool:
+        return order_id in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'size': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
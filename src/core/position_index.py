@@ -0,0 +1,125 @@
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger('PositionIndex')
+
+# Fields kept per TradingView position
+POSITION_FIELDS = (
+    'trade_id', 'position_id', 'mt5_ticket', 'instrument', 'side', 'quantity', 'type',
+    'execution_price', 'take_profit', 'stop_loss', 'trailing_stop_pips',
+    'order_id', 'tp_order_id', 'sl_order_id', 'ticket_seen_at'
+)
+
+ORDER_ID_FIELDS = ('order_id', 'tp_order_id', 'sl_order_id')
+
+class PositionIndex:
+    """Write-through view of open positions keyed by TradingView positionId.
+
+    TradeHandler updates the index alongside every DB write, so close and
+    modify signals can be built without reading Postgres first. Orders are
+    held by trade_id until their execution binds them to a positionId.
+    Closed positions are evicted; the least recently used open position is
+    dropped if max_size is exceeded (a later miss falls back to the DB).
+    Entry, TP and SL order IDs resolve to their trade in O(1). ticket_seen_at
+    stamps when the MT5 ticket was first known, i.e. a time it was open.
+    """
+
+    def __init__(self, max_size: int = None):
+        self.max_size = max_size or int(os.getenv('POSITION_INDEX_MAX', '10000'))
+        self.orders: Dict[str, Dict[str, Any]] = {}            # trade_id -> fields, awaiting execution
+        self.positions: OrderedDict = OrderedDict()           # position_id -> fields
+        self.order_ids: Dict[str, str] = {}                   # entry/TP/SL order ID -> trade_id
+        self.trade_positions: Dict[str, str] = {}             # trade_id -> position_id
+
+    def _link(self, fields: Dict[str, Any]) -> None:
+        for key in ORDER_ID_FIELDS:
+            if fields.get(key):
+                self.order_ids[str(fields[key])] = fields['trade_id']
+
+    def _unlink(self, fields: Dict[str, Any]) -> None:
+        for key in ORDER_ID_FIELDS:
+            if fields.get(key):
+                self.order_ids.pop(str(fields[key]), None)
+
+    def load(self, trades: List[Dict[str, Any]]) -> int:
+        """Rebuild from the DB's open trades (startup)."""
+        self.positions.clear()
+        self.order_ids.clear()
+        self.trade_positions.clear()
+        for trade in trades:
+            self.put(trade['position_id'], trade)
+        logger.info(f"Position index loaded with {len(self.positions)} open positions")
+        return len(self.positions)
+
+    def add_order(self, trade_id: str, fields: Dict[str, Any]) -> None:
+        self.orders[trade_id] = {key: fields.get(key) for key in POSITION_FIELDS}
+        self._link(self.orders[trade_id])
+
+    def drop_order(self, trade_id: str) -> None:
+        """Forget an order that will not execute (or closed on execution)."""
+        order = self.orders.pop(trade_id, None)
+        if order is not None and trade_id not in self.trade_positions:
+            self._unlink(order)
+
+    def get_order(self, trade_id: str) -> Optional[Dict[str, Any]]:
+        return self.orders.get(trade_id)
+
+    def bind(self, trade_id: str, position_id: str, **fields) -> Optional[Dict[str, Any]]:
+        """Move an executed order under its positionId."""
+        order = self.orders.pop(trade_id, None)
+        if order is None:
+            return None
+        return self.put(position_id, {**order, **fields, 'position_id': position_id})
+
+    def put(self, position_id: str, fields: Dict[str, Any]) -> Dict[str, Any]:
+        entry = {key: fields.get(key) for key in POSITION_FIELDS}
+        entry['position_id'] = position_id
+        if entry['mt5_ticket'] and not entry['ticket_seen_at']:
+            entry['ticket_seen_at'] = time.time()
+        self.positions[position_id] = entry
+        self.positions.move_to_end(position_id)
+        self._link(entry)
+        self.trade_positions[entry['trade_id']] = position_id
+        while len(self.positions) > self.max_size:
+            evicted, evicted_entry = self.positions.popitem(last=False)
+            self._forget(evicted_entry)
+            logger.warning(f"Position index full, evicted {evicted}")
+        return entry
+
+    def _forget(self, entry: Dict[str, Any]) -> None:
+        self._unlink(entry)
+        self.trade_positions.pop(entry['trade_id'], None)
+
+    def get(self, position_id: str) -> Optional[Dict[str, Any]]:
+        entry = self.positions.get(position_id)
+        if entry is not None:
+            self.positions.move_to_end(position_id)
+        return entry
+
+    def find_by_order_id(self, order_id: str) -> Optional[Dict[str, Any]]:
+        """Open position owning an entry/TP/SL order ID (or its 'orderId.TP.ts' base)."""
+        trade_id = self.order_ids.get(order_id) or self.order_ids.get(order_id.split('.')[0])
+        if trade_id is None:
+            return None
+        position_id = self.trade_positions.get(trade_id)
+        return self.get(position_id) if position_id else None
+
+    def update(self, position_id: str, **fields) -> None:
+        entry = self.positions.get(position_id)
+        if entry is not None:
+            entry.update((key, value) for key, value in fields.items() if key in POSITION_FIELDS)
+            if entry['mt5_ticket'] and not entry['ticket_seen_at']:
+                # The ticket is written after the MT5 order went through, so it was open by now
+                entry['ticket_seen_at'] = time.time()
+
+    def evict(self, position_id: str) -> None:
+        """Drop a closed position."""
+        entry = self.positions.pop(position_id, None)
+        if entry is not None:
+            self._forget(entry)
+
+    def __len__(self) -> int:
+        return len(self.positions)
@@ -1,11 +1,14 @@
 import asyncio
 import logging
+import os
+from collections import OrderedDict
 from datetime import datetime
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
-import MetaTrader5 as mt5
-
-from src.utils.database_handler import DatabaseHandler
+from src.config.accounts import load_account_logins
+from src.core.order_correlation import OrderCorrelation
+from src.core.position_index import PositionIndex
+from src.utils.async_database_handler import create_database_handler
 from src.utils.queue_handler import RedisQueue
 
 logging.basicConfig(
@@ -17,10 +20,57 @@ logger = logging.getLogger('TradeHandler')
 
 class TradeHandler:
     def __init__(self):
-        self.db = DatabaseHandler()
+        self.db = create_database_handler()
         self.queue = RedisQueue()
-        self.pending_orders = {}  # Track order->execution mapping
+        # Order ID -> trade_id, mirrored to Redis so executions survive a proxy restart
+        self.pending_orders = OrderCorrelation(self.queue.redis, self.queue.async_redis)
+        self.pending_orders.hydrate()
+        
+        # Executions already handled, and fills so far for orders executing in parts
+        self.seen_executions = OrderedDict()
+        self.seen_executions_max = int(os.getenv('SEEN_EXECUTIONS_MAX', '5000'))
+        self.handling_executions = set()
+        self.order_fills = {}
         self.loop = asyncio.get_event_loop()
+
+        # Follower accounts; each gets trades on its own shard
+        self.account_logins = load_account_logins()
+
+        # Open positions by TV positionId: rebuilt from the DB, then kept write-through
+        self.positions = PositionIndex()
+        try:
+            self.positions.load(self.db.get_open_positions())
+        except Exception as e:
+            logger.error(f"Error loading position index: {e}")
+
+    async def _get_position(self, position_id: str) -> Optional[Dict[str, Any]]:
+        """Position from the index; the DB is only read on a miss or until the MT5 ticket is known."""
+        trade = self.positions.get(position_id)
+        if trade and trade.get('mt5_ticket'):
+            return trade
+
+        db_trade = await self.db.async_get_trade_by_position(position_id)
+        if not db_trade:
+            return trade
+        if trade:
+            self.positions.update(position_id, mt5_ticket=db_trade.get('mt5_ticket'))
+            return trade
+        return self.positions.put(position_id, db_trade)
+
+    async def _publish_trade(self, trade_data: Dict[str, Any]) -> None:
+        """Fan trade out to every follower's shard (shared channel if none configured).
+
+        mt5_ticket in close/update payloads is the ticket one follower
+        reported; workers act on their own ticket for the TV positionId.
+        """
+        if not self.account_logins:
+            await self.queue.async_push_trade(trade_data)
+            return
+
+        # Same payload for every follower: encoded once, sent in one pipeline
+        await self.queue.async_push_trades(
+            [(trade_data, account_login) for account_login in self.account_logins]
+        )
     
     async def process_order(self, request_data: Dict[str, Any], response_data: Dict[str, Any]) -> None:
         """Process new order from TradingView asynchronously."""
@@ -51,7 +101,7 @@ class TradeHandler:
                 'status': 'pending',
                 'tv_request': request_data,
                 'tv_response': response_data,
-                'created_at': datetime.utcnow()
+                'created_at': datetime.utcnow(),
                 'account_login': request_data.get('account_login')
             }
             
@@ -65,76 +115,165 @@ class TradeHandler:
             
             # Store in database asynchronously
             await self.db.async_save_trade(trade_data)
-            self.pending_orders[response_data['d']['orderId']] = trade_id
-            
-            if tp_order_id:
-                self.pending_orders[tp_order_id] = trade_id
-            if sl_order_id:
-                self.pending_orders[sl_order_id] = trade_id
+            self.positions.add_order(trade_id, trade_data)
+            for order_id in filter(None, (response_data['d']['orderId'], tp_order_id, sl_order_id)):
+                for evicted_order_id, evicted_trade_id in await self.pending_orders.add(order_id, trade_id):
+                    # Never (fully) executed: stop holding its order fields too
+                    self.positions.drop_order(evicted_trade_id)
+                    self.order_fills.pop(evicted_order_id, None)
             
         except Exception as e:
             logger.error(f"Error processing order: {e}")
             print(f"❌ Order failed: {e}")
 
+    @staticmethod
+    def _execution_key(execution: Dict[str, Any]) -> str:
+        """Stable identity of an execution across repeated /executions polls."""
+        if execution.get('id'):
+            return str(execution['id'])
+        return f"{execution.get('orderId')}:{execution.get('time')}:{execution.get('qty')}:{execution.get('price')}"
+
+    def _is_seen(self, key: str) -> bool:
+        """True if an earlier poll's execution was already handled."""
+        if key in self.seen_executions:
+            self.seen_executions.move_to_end(key)
+            return True
+        return False
+
+    def _mark_seen(self, key: str) -> None:
+        """Record a handled execution so later polls skip it."""
+        self.seen_executions[key] = None
+        if len(self.seen_executions) > self.seen_executions_max:
+            self.seen_executions.popitem(last=False)
+
     async def process_execution(self, execution_data: Dict[str, Any]) -> None:
         """Process execution update from TradingView asynchronously."""
         try:
             executions = execution_data.get('d', [])
             for execution in executions:
+                # TV re-lists recent executions on every poll; a concurrent poll may be on it already
+                key = self._execution_key(execution)
+                if self._is_seen(key) or key in self.handling_executions:
+                    continue
+
                 order_id = execution.get('orderId')
-                if order_id and order_id in self.pending_orders:
-                    trade_id = self.pending_orders[order_id]
-                    position_id = execution.get('positionId')
-                    
-                    # Get original trade data asynchronously
-                    original_trade = await self.db.async_get_trade(trade_id)
-                    if not original_trade:
-                        logger.error(f"Trade not found: {trade_id}")
-                        continue
-                    
-                    # Prepare trade data
-                    trade_data = {
-                        'trade_id': trade_id,
-                        'execution_data': execution,
-                        'position_id': position_id,
-                        'instrument': original_trade.get('instrument'),
-                        'side': original_trade.get('side'),
-                        'qty': original_trade.get('quantity'),
-                        'type': original_trade.get('type'),
-                        'take_profit': original_trade.get('take_profit'),
-                        'stop_loss': original_trade.get('stop_loss')
-                    }
-
-                    # Update database asynchronously
-                    update_data = {
-                        'position_id': position_id,
-                        'execution_price': execution.get('price'),
-                        'execution_data': execution,
-                        'executed_at': datetime.utcnow(),
-                        'is_closed': execution.get('isClose', False)
-                    }
-                    
-                    await self.db.async_update_trade_status(trade_id, 'executed', update_data)
-                    
-                    # Publish trade for execution asynchronously
-                    await self.queue.async_push_trade(trade_data)
-                    print(f"✔  Trade executed - TV PositionID#: {position_id}")
-                    print(f"💲 Average Fill Price - {update_data['execution_price']}")
+                trade_id = self.pending_orders.get(order_id) if order_id else None
+                if not trade_id:
+                    # Unknown yet (its order may still be saving): left unseen so the next poll retries it
+                    continue
+
+                self.handling_executions.add(key)
+                try:
+                    if await self._handle_execution(execution, order_id, trade_id):
+                        self._mark_seen(key)
+                except Exception as e:
+                    # Not marked seen: retried on the next poll
+                    logger.error(f"Error processing execution {key}: {e}")
+                finally:
+                    self.handling_executions.discard(key)
 
-                    
-                    del self.pending_orders[order_id]
-                    
         except Exception as e:
             logger.error(f"Error processing execution: {e}")
 
+    async def _handle_execution(self, execution: Dict[str, Any], order_id: str, trade_id: str) -> bool:
+        """Record one execution of a known order and mirror it to the workers; False if it was dropped."""
+        position_id = execution.get('positionId')
+
+        fills = self.order_fills.get(order_id)
+        if fills is None:
+            # Original order from the index; the DB only if the proxy restarted in between
+            original_trade = self.positions.get_order(trade_id) or await self.db.async_get_trade(trade_id)
+            if not original_trade:
+                logger.error(f"Trade not found: {trade_id}")
+                return False
+            # A concurrent execution of the same order may have created it meanwhile
+            fills = self.order_fills.setdefault(
+                order_id, {'trade': original_trade, 'qty': 0.0, 'notional': 0.0, 'count': 0}
+            )
+        original_trade = fills['trade']
+
+        # Aggregate partial executions of the same order before any await, so
+        # concurrent partials add up; rolled back if handling fails
+        qty = float(execution.get('qty') or 0)
+        notional = qty * float(execution.get('price') or 0)
+        fills['qty'] += qty
+        fills['notional'] += notional
+        fills['count'] += 1
+        try:
+            return await self._apply_execution(execution, order_id, trade_id, fills)
+        except Exception:
+            fills['qty'] -= qty
+            fills['notional'] -= notional
+            fills['count'] -= 1
+            raise
+
+    async def _apply_execution(self, execution: Dict[str, Any], order_id: str, trade_id: str,
+                               fills: Dict[str, Any]) -> bool:
+        """Write an aggregated execution to the DB and index, publishing the order's first fill."""
+        position_id = execution.get('positionId')
+        original_trade = fills['trade']
+        filled_qty, fill_count = fills['qty'], fills['count']
+        avg_price = fills['notional'] / filled_qty if filled_qty else execution.get('price')
+        order_qty = float(original_trade.get('quantity') or 0)
+        is_filled = not order_qty or filled_qty >= order_qty - 1e-9
+
+        # Prepare trade data
+        trade_data = {
+            'trade_id': trade_id,
+            'execution_data': execution,
+            'position_id': position_id,
+            'instrument': original_trade.get('instrument'),
+            'side': original_trade.get('side'),
+            'qty': original_trade.get('quantity'),
+            'type': original_trade.get('type'),
+            'take_profit': original_trade.get('take_profit'),
+            'stop_loss': original_trade.get('stop_loss')
+        }
+
+        # Update database asynchronously
+        update_data = {
+            'position_id': position_id,
+            'execution_price': avg_price,
+            'execution_data': {**execution, 'filledQty': filled_qty, 'fillCount': fill_count},
+            'executed_at': datetime.utcnow(),
+            'is_closed': execution.get('isClose', False)
+        }
+
+        await self.db.async_update_trade_status(trade_id, 'executed', update_data)
+        if update_data['is_closed']:
+            self.positions.drop_order(trade_id)
+            self.positions.evict(position_id)
+        elif self.positions.get(position_id):
+            self.positions.update(position_id, execution_price=avg_price)
+        elif not self.positions.bind(trade_id, position_id, execution_price=avg_price):
+            self.positions.put(position_id, {**original_trade, 'execution_price': avg_price})
+
+        # First fill mirrors the whole order; later partials only update the average
+        if self.pending_orders.claim_publish(order_id):
+            try:
+                await self._publish_trade(trade_data)
+            except Exception:
+                self.pending_orders.release_publish(order_id)
+                raise
+            await self.pending_orders.mark_published(order_id)
+            print(f"✔  Trade executed - TV PositionID#: {position_id}")
+        else:
+            print(f"🧩 Partial fill {fill_count} - TV PositionID#: {position_id} ({filled_qty}/{order_qty})")
+        print(f"💲 Average Fill Price - {update_data['execution_price']}")
+
+        if is_filled:
+            await self.pending_orders.remove(order_id)
+            self.order_fills.pop(order_id, None)
+        return True
+
     async def process_position_close(self, position_id: str, close_data: Dict[str, Any] = None) -> None:
         """Process position close request from TradingView asynchronously."""
         try:
             close_data = close_data or {}  # Ensure close_data is dict
             print(f"\n📤 Closing PositionID#: {position_id}")
             
-            # Get trade data asynchronously
-            trade = await self.db.async_get_trade_by_position(position_id)
+            # Get trade data from the position index
+            trade = await self._get_position(position_id)
             if not trade:
                 logger.error(f"No trade found for position {position_id}")
                 return           
@@ -144,27 +283,20 @@ class TradeHandler:
                 logger.error(f"No MT5 ticket found for trade {trade['trade_id']}")
                 return
 
-            try:
-                # Initialize MT5 connection if needed
-                if not mt5.initialize():
-                    logger.error("Failed to initialize MT5")
-                    return
-
-                # Get specific position
-                positions = mt5.positions_get(ticket=int(mt5_ticket))
-
-                if not positions:
-                    # If position not found in MT5, add the closing log here
-                    direction_emoji = "BUY🔼" if trade['side'].lower() == 'buy' else "SELL🔻"
-                    print(f"📌 Closed {direction_emoji} {trade['instrument']} x {trade['quantity']}")
-                    return
-                    
-            except Exception as e:
-                logger.error(f"Error getting MT5 position: {e}")
-                logger.error(f"MT5 last error: {mt5.last_error()}")
+            # Live volume from the workers' Redis snapshots; the proxy never talks to a terminal
+            current_volume = await self.queue.async_get_position_volume(
+                position_id, self.account_logins, not_before=trade.get('ticket_seen_at')
+            )
+            if current_volume == 0.0:
+                # Position no longer open in MT5, add the closing log here
+                direction_emoji = "BUY🔼" if trade['side'].lower() == 'buy' else "SELL🔻"
+                print(f"📌 Closed {direction_emoji} {trade['instrument']} x {trade['quantity']}")
+                self.positions.evict(position_id)
                 return
-            
-            current_volume = float(positions[0].volume)
+            if current_volume is None:
+                # No fresh snapshot from every follower: forward the close, the worker re-validates the amount
+                logger.warning(f"No fresh positions snapshot for PositionID {position_id}, using recorded quantity")
+                current_volume = float(trade['quantity'])
             
             # Get direction emoji
             direction_emoji = "BUY🔼" if trade['side'].lower() == 'buy' else "SELL🔻"
@@ -185,6 +317,7 @@ class TradeHandler:
                 return
 
             # Prepare close data
+            # Same payload for every follower: each worker closes its own ticket for this positionId
             close_request = {
                 'trade_id': trade['trade_id'],
                 'mt5_ticket': mt5_ticket,
@@ -203,7 +336,11 @@ class TradeHandler:
             }
             
             # Publish close request asynchronously
-            await self.queue.async_push_trade(close_request)
+            await self._publish_trade(close_request)
+            if is_partial:
+                self.positions.update(position_id, quantity=str(current_volume - close_amount))
+            else:
+                self.positions.evict(position_id)
             
             # Update status asynchronously
             close_status = 'closing' if is_partial else 'closed'
@@ -250,8 +387,8 @@ class TradeHandler:
 
             update_data = update_data or {}
             
-            # Get trade data asynchronously
-            trade = await self.db.async_get_trade_by_position(position_id)
+            # Get trade data from the position index
+            trade = await self._get_position(position_id)
             if not trade:
                 logger.error(f"No trade found for position {position_id}")
                 return
@@ -297,6 +434,9 @@ class TradeHandler:
             if trailing_stop_pips is not None:
                 print(f"🟠 Trailing Stop: {trailing_stop_pips} pips")
             
+            # Push to MT5 first; persistence doesn't gate the signal
+            await self._publish_trade(update_trade_data)
+            
             # Update database
             db_update = {
                 'take_profit': take_profit if take_profit is not None else current_tp,
@@ -305,9 +445,12 @@ class TradeHandler:
                 'updated_at': datetime.utcnow()
             }
             await self.db.async_update_trade_status(trade['trade_id'], 'updated', db_update)
-            
-            # Push to MT5
-            await self.queue.async_push_trade(update_trade_data)
+            self.positions.update(
+                position_id,
+                take_profit=db_update['take_profit'],
+                stop_loss=db_update['stop_loss'],
+                trailing_stop_pips=trailing_stop_pips
+            )
             
         except Exception as e:
             logger.error(f"Error processing position update: {e}")
@@ -318,13 +461,20 @@ class TradeHandler:
     async def process_tpsl_delete(self, order_id: str, level_type: str) -> None:
         """Process deletion of TP or SL level."""
         try:
-            # Get active trades from database
-            trade = await self.db.async_get_latest_active_trade()
-            if not trade:
-                logger.error("No active trades found")
+            # TV may suffix order ids (e.g. "123.1"); both lookups use the base id
+            order_id = str(order_id).split('.')[0]
+            # Resolve the TP/SL order to its position; indexed DB lookup only on a miss
+            trade = self.positions.find_by_order_id(order_id)
+            if trade is None:
+                trade = await self.db.async_get_trade_by_order_id(order_id)
+                if trade and trade.get('position_id'):
+                    self.positions.put(trade['position_id'], trade)
+            if not trade or not trade.get('position_id'):
+                logger.error(f"No open trade found for order {order_id}")
                 return
 
-            position_id = trade.get('position_id')
+            position_id = trade['position_id']
+            trade = await self._get_position(position_id)
             print(f"🗑  Removing {level_type} for Position #{position_id}")
             
             # Prepare update data
@@ -350,7 +500,7 @@ class TradeHandler:
                 print(f"🛑 SL: {current_sl} → None")
 
             # Push to queue for MT5 processing
-            await self.queue.async_push_trade(update_data)
+            await self._publish_trade(update_data)
 
             # Update database
             db_update = {
@@ -359,6 +509,7 @@ class TradeHandler:
                 'updated_at': datetime.utcnow()
             }
             await self.db.async_update_trade_status(trade['trade_id'], 'updated', db_update)
+            self.positions.update(position_id, take_profit=db_update['take_profit'], stop_loss=db_update['stop_loss'])
 
         except Exception as e:
             logger.error(f"Error processing {level_type} deletion: {e}")
@@ -2,8 +2,9 @@ import logging
 import time
 from datetime import datetime
 
-from sqlalchemy import (JSON, Boolean, Column, DateTime, Integer, Numeric,
-                        String, Text, create_engine, text)
+from sqlalchemy import (JSON, Boolean, Column, DateTime, ForeignKey, Index,
+                        Integer, Numeric, String, Text, UniqueConstraint,
+                        create_engine, text)
 from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
@@ -51,7 +52,7 @@ class Trade(Base):
     trade_id = Column(String(50), unique=True, index=True)
     order_id = Column(String(50), index=True)
     position_id = Column(String(50), index=True)
-    mt5_ticket = Column(String(50))
+    mt5_ticket = Column(String(50), index=True)
     mt5_position = Column(String(50))
     account_login = Column(String(50))
 
@@ -67,8 +68,8 @@ class Trade(Base):
     execution_price = Column(Numeric)
     take_profit = Column(Numeric)
     stop_loss = Column(Numeric)
-    tp_order_id = Column(String(50)) 
-    sl_order_id = Column(String(50))
+    tp_order_id = Column(String(50), index=True)  # ix_trades_tp_order_id (alembic a6e2c8f4b153)
+    sl_order_id = Column(String(50), index=True)
     trailing_stop_pips = Column(Numeric)
 
     
@@ -77,8 +78,14 @@ class Trade(Base):
     error_message = Column(Text)
     is_closed = Column(Boolean, default=False)
     close_requested_at = Column(DateTime(timezone=True))
+    close_reason = Column(String(20))  # sl / tp / stop_out / manual / expert, from the exit deal
+    close_price = Column(Numeric)
     execution_time_ms = Column(Integer)
     
+    # Group worker lease (claim_pending_trades / claim_pending_closes)
+    claimed_by = Column(String(100))
+    lease_expires_at = Column(DateTime(timezone=True))
+    
     # JSON data
     tv_request = Column(JSON)
     tv_response = Column(JSON)
@@ -94,6 +101,44 @@ class Trade(Base):
     def __repr__(self):
         return f"<Trade(trade_id='{self.trade_id}', instrument='{self.instrument}', status='{self.status}')>"
 
+# Hot lookup indexes (alembic revision b7c2d91e4f03)
+Index('ix_trades_account_login_mt5_ticket', Trade.account_login, Trade.mt5_ticket)
+Index('ix_trades_open_created_at', Trade.created_at.desc(),
+      postgresql_where=Trade.is_closed.is_(False))
+Index('ix_trades_pending_status', Trade.status,
+      postgresql_where=Trade.status.in_(['pending', 'close_pending']))
+
+class TradeFill(Base):
+    """One follower account's execution of a trade."""
+    __tablename__ = "trade_fills"
+    __table_args__ = (
+        UniqueConstraint('trade_id', 'account_login', name='uq_trade_fills_trade_account'),
+        Index('ix_trade_fills_account_ticket', 'account_login', 'mt5_ticket'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    trade_id = Column(String(50), ForeignKey('trades.trade_id', ondelete='CASCADE'), nullable=False)
+    account_login = Column(String(50), nullable=False)
+    mt5_ticket = Column(String(50))
+
+    # Execution
+    volume = Column(Numeric)
+    fill_price = Column(Numeric)
+    latency_ms = Column(Integer)
+
+    # Status: open -> closed (or failed if the order was rejected)
+    status = Column(String(20), nullable=False, default='open')
+    error_message = Column(Text)
+    claimed_by = Column(String(100))
+    lease_expires_at = Column(DateTime(timezone=True))
+
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
+    closed_at = Column(DateTime(timezone=True))
+
+    def __repr__(self):
+        return f"<TradeFill(trade_id='{self.trade_id}', account_login='{self.account_login}', status='{self.status}')>"
+
 def init_db():
     """Initialize database tables."""
     try:
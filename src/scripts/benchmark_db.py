@@ -0,0 +1,106 @@
+"""Compare trade persistence throughput of the executor-based and asyncpg handlers.
+
+Each round saves, updates and reads back N trades concurrently (N = 1, 10, 100
+by default) through DatabaseHandler (sync session in run_in_executor) and
+AsyncDatabaseHandler (SQLAlchemy asyncio + asyncpg). Requires the DB_* env vars
+and a migrated database. Benchmark rows are prefixed BENCH_ and deleted after.
+
+Usage: python src/scripts/benchmark_db.py [--concurrency 1 10 100] [--rounds 3]
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Add project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+sys.path.insert(0, project_root)
+
+from sqlalchemy import text
+
+from src.utils.async_database_handler import AsyncDatabaseHandler
+from src.utils.database_handler import DatabaseHandler
+from src.utils.id_generator import new_ulid
+
+
+def make_trade() -> dict:
+    trade_id = f"BENCH_{new_ulid()}"
+    return {
+        'trade_id': trade_id,
+        'order_id': trade_id,
+        'instrument': 'EURUSD',
+        'side': 'buy',
+        'quantity': '0.01',
+        'type': 'market',
+        'ask_price': 1.1000,
+        'bid_price': 1.0999,
+        'take_profit': None,
+        'stop_loss': None,
+        'status': 'pending',
+        'tv_request': {},
+        'tv_response': {},
+        'created_at': datetime.utcnow()
+    }
+
+
+async def trade_roundtrip(db: DatabaseHandler) -> float:
+    trade = make_trade()
+    start = time.perf_counter()
+    await db.async_save_trade(trade)
+    await db.async_update_trade_status(trade['trade_id'], 'executed', {'position_id': trade['trade_id']})
+    await db.async_get_trade(trade['trade_id'])
+    return (time.perf_counter() - start) * 1000
+
+
+async def run_handler(name: str, db: DatabaseHandler, concurrency: int, rounds: int) -> None:
+    latencies = []
+    wall = 0.0
+    for _ in range(rounds):
+        start = time.perf_counter()
+        latencies.extend(await asyncio.gather(*(trade_roundtrip(db) for _ in range(concurrency))))
+        wall += time.perf_counter() - start
+
+    latencies.sort()
+    p95 = latencies[max(int(len(latencies) * 0.95) - 1, 0)]
+    print(f"{name:<9} c={concurrency:<4} "
+          f"p50={statistics.median(latencies):8.2f}ms "
+          f"p95={p95:8.2f}ms "
+          f"trades/s={len(latencies) / wall:8.1f}")
+
+
+def delete_bench_rows(db: DatabaseHandler) -> None:
+    with db.get_db() as session:
+        session.execute(text("DELETE FROM trades WHERE trade_id LIKE 'BENCH_%'"))
+        session.commit()
+
+
+async def main_async(levels: list, rounds: int) -> None:
+    legacy = DatabaseHandler()
+    legacy.loop = asyncio.get_running_loop()
+    native = AsyncDatabaseHandler()
+    try:
+        for concurrency in levels:
+            await run_handler('executor', legacy, concurrency, rounds)
+            await run_handler('asyncpg', native, concurrency, rounds)
+    finally:
+        delete_bench_rows(legacy)
+        await native.async_cleanup()
+        native.cleanup()
+        legacy.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Database handler throughput benchmark")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"\n📊 DB throughput: save + update + get per trade, {args.rounds} rounds")
+    asyncio.run(main_async(args.concurrency, args.rounds))
+
+
+if __name__ == "__main__":
+    main()
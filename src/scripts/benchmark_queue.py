@@ -0,0 +1,100 @@
+"""Compare trade delivery latency of the legacy and native asyncio queue paths.
+
+Legacy: async_push via run_in_executor + pubsub.run_in_thread subscriber that
+blocks on each async callback. Native: redis.asyncio publish + async_subscribe
+with concurrent handlers. Requires a running Redis (docker-compose up -d).
+
+Usage: python src/scripts/benchmark_queue.py [--messages 200] [--handler-ms 20]
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+sys.path.insert(0, project_root)
+
+from src.utils.queue_handler import RedisQueue
+
+
+def summarize(name: str, latencies_ms: list, wall_s: float) -> None:
+    latencies_ms.sort()
+    p95 = latencies_ms[int(len(latencies_ms) * 0.95) - 1]
+    print(f"{name:<8} n={len(latencies_ms):<5} "
+          f"p50={statistics.median(latencies_ms):8.2f}ms "
+          f"p95={p95:8.2f}ms "
+          f"max={latencies_ms[-1]:8.2f}ms "
+          f"wall={wall_s:6.2f}s")
+
+
+async def run_legacy(count: int, handler_ms: int) -> None:
+    """Executor hops for publish, polling thread for subscribe."""
+    loop = asyncio.get_running_loop()
+    queue = RedisQueue(mode='pubsub')
+    queue.loop = loop
+    latencies = []
+    done = asyncio.Event()
+
+    async def on_message(msg_type, data):
+        if msg_type != 'trade':
+            return
+        latencies.append((time.perf_counter() - data['data']['sent_at']) * 1000)
+        await asyncio.sleep(handler_ms / 1000)
+        if len(latencies) == count:
+            done.set()
+
+    queue.subscribe(on_message)
+    await asyncio.sleep(0.2)
+
+    start = time.perf_counter()
+    for _ in range(count):
+        await loop.run_in_executor(None, queue.push_trade, {'sent_at': time.perf_counter()})
+    await asyncio.wait_for(done.wait(), timeout=count * (handler_ms / 1000 + 0.1) + 10)
+    summarize('legacy', latencies, time.perf_counter() - start)
+    queue.cleanup()
+
+
+async def run_native(count: int, handler_ms: int, concurrency: int) -> None:
+    """redis.asyncio publish and async_subscribe."""
+    queue = RedisQueue(mode='pubsub', concurrency=concurrency)
+    latencies = []
+    done = asyncio.Event()
+
+    async def on_message(msg_type, data):
+        if msg_type != 'trade':
+            return
+        latencies.append((time.perf_counter() - data['data']['sent_at']) * 1000)
+        await asyncio.sleep(handler_ms / 1000)
+        if len(latencies) == count:
+            done.set()
+
+    await queue.async_subscribe(on_message)
+    await asyncio.sleep(0.2)
+
+    start = time.perf_counter()
+    for _ in range(count):
+        await queue.async_push_trade({'sent_at': time.perf_counter()})
+    await asyncio.wait_for(done.wait(), timeout=count * (handler_ms / 1000 + 0.1) + 10)
+    summarize('native', latencies, time.perf_counter() - start)
+    await queue.async_cleanup()
+    queue.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Redis queue latency benchmark")
+    parser.add_argument('--messages', type=int, default=200)
+    parser.add_argument('--handler-ms', type=int, default=20,
+                        help="Simulated handling time per trade")
+    parser.add_argument('--concurrency', type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"\n📊 Queue latency: {args.messages} trades, {args.handler_ms}ms handler")
+    asyncio.run(run_legacy(args.messages, args.handler_ms))
+    asyncio.run(run_native(args.messages, args.handler_ms, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Compare the per-position trailing-stop loop with the vectorized batch path.
+
+Builds N synthetic positions (N = 100, 1000, 10000 by default) spread over
+the configured instruments and times one monitoring cycle both ways: the
+scalar loop (calculate_trailing_distance + round per ticket) and
+compute_trailing_stops over packed arrays. Pure computation; no MT5 or DB.
+
+Usage: python src/scripts/benchmark_trailing.py [--positions 100 1000 10000] [--rounds 5]
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+
+# Add project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+sys.path.insert(0, project_root)
+
+from src.utils.instrument_manager import InstrumentManager
+from src.utils.trailing import compute_trailing_stops
+
+
+def make_positions(count: int, symbols: list) -> list:
+    positions = []
+    for ticket in range(count):
+        symbol = random.choice(symbols)
+        price = round(random.uniform(0.5, 2.0), 5)
+        is_buy = random.random() < 0.5
+        positions.append(SimpleNamespace(
+            ticket=ticket,
+            symbol=symbol,
+            pips=random.choice([5.0, 10.0, 20.0]),
+            is_buy=is_buy,
+            last_sl=round(price - 0.0015 if is_buy else price + 0.0015, 5),
+            bid=price,
+            ask=round(price + 0.0001, 5)
+        ))
+    return positions
+
+
+def scalar_cycle(positions: list, instruments: InstrumentManager) -> list:
+    spec = SimpleNamespace(digits=5)
+    step = 0.00001
+    updates = []
+    for position in positions:
+        distance = instruments.calculate_trailing_distance(position.symbol, position.pips, spec)
+        if position.is_buy:
+            new_sl = round(position.bid - distance, spec.digits)
+            moved = new_sl - position.last_sl
+        else:
+            new_sl = round(position.ask + distance, spec.digits)
+            moved = position.last_sl - new_sl
+        if not position.last_sl or round(moved / step, 6) >= 1:
+            updates.append((position.ticket, new_sl))
+    return updates
+
+
+def vector_cycle(positions: list, instruments: InstrumentManager) -> list:
+    count = len(positions)
+    pip_sizes = {symbol: instruments.get_pip_size(symbol) for symbol in {p.symbol for p in positions}}
+    new_sl, move = compute_trailing_stops(
+        np.fromiter((p.is_buy for p in positions), dtype=bool, count=count),
+        np.fromiter((p.bid for p in positions), dtype=float, count=count),
+        np.fromiter((p.ask for p in positions), dtype=float, count=count),
+        np.fromiter((p.pips for p in positions), dtype=float, count=count),
+        np.fromiter((pip_sizes[p.symbol] for p in positions), dtype=float, count=count),
+        np.fromiter((p.last_sl for p in positions), dtype=float, count=count),
+        np.full(count, 5.0),
+        np.full(count, 0.00001)
+    )
+    return [(positions[i].ticket, float(new_sl[i])) for i in np.flatnonzero(move)]
+
+
+def time_cycle(func, positions: list, instruments: InstrumentManager, rounds: int) -> float:
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func(positions, instruments)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Trailing-stop computation benchmark')
+    parser.add_argument('--positions', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    instruments = InstrumentManager()
+    symbols = [pair['name'] for pair in instruments.instruments.get('instruments', {}).get('pairs', [])] or ['EURUSD']
+
+    print("\n📊 Trailing-stop cycle benchmark (median ms per cycle)")
+    print(f"{'positions':>10} {'scalar':>10} {'vector':>10} {'speedup':>8}")
+    for count in args.positions:
+        positions = make_positions(count, symbols)
+
+        scalar_updates = scalar_cycle(positions, instruments)
+        vector_updates = vector_cycle(positions, instruments)
+        mismatches = sum(
+            1 for a, b in zip(scalar_updates, vector_updates) if a[0] != b[0] or abs(a[1] - b[1]) > 1e-9
+        ) + abs(len(scalar_updates) - len(vector_updates))
+        if mismatches:
+            print(f"⚠️ {mismatches} results differ between scalar and vector paths")
+
+        scalar_ms = time_cycle(scalar_cycle, positions, instruments, args.rounds)
+        vector_ms = time_cycle(vector_cycle, positions, instruments, args.rounds)
+        print(f"{count:>10} {scalar_ms:>10.2f} {vector_ms:>10.2f} {scalar_ms / vector_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
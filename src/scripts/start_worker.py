@@ -2,13 +2,20 @@ import json
 import MetaTrader5 as mt5
 import time
 import os
+import socket
 import sys
+import threading
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from concurrent.futures import wait
 from pathlib import Path
+from types import SimpleNamespace
 
 # Add project root to Python path
 project_root = str(Path(__file__).parent.parent.parent)
 sys.path.insert(0, project_root)
 
+from src.services.mt5_session_pool import MT5SessionPool
+from src.services.mt5_supervisor import MT5Supervisor
 from src.utils.database_handler import DatabaseHandler
 from src.utils.ssl_handler import silence_ssl_warnings
 
@@ -22,86 +29,158 @@ accounts_file = os.path.join(project_root, 'accounts.json')
 with open(accounts_file, 'r') as f:
     accounts = json.load(f)
 
-def connect_mt5(account):
-    return mt5.initialize(
-        path=account['path'],
-        login=account['login'],
-        password=account['password'],
-        server=account['server']
-    )
+# Several group workers can run side by side; rows are leased per worker
+WORKER_ID = f"{socket.gethostname()}-{os.getpid()}"
+CLAIM_BATCH = int(os.getenv('WORKER_CLAIM_BATCH', '10'))
+LEASE_SECONDS = int(os.getenv('WORKER_LEASE_SECONDS', '60'))
+# Longest wait for one terminal process to answer an order
+ORDER_TIMEOUT_SECONDS = float(os.getenv('WORKER_ORDER_TIMEOUT_SECONDS', '30'))
 
-def place_trade(account, trade):
-    if not connect_mt5(account):
-        print(f"❌ Failed to connect to MT5 for {account['login']}")
-        return False
+# Terminal sessions stay attached between orders
+session_pool = MT5SessionPool()
+
+# Optionally run one execution process per terminal and fan out in parallel
+supervisor = None
+if os.getenv('WORKER_PROCESS_PER_TERMINAL', 'false').lower() == 'true':
+    supervisor = MT5Supervisor(accounts)
 
+# Orders still unanswered after ORDER_TIMEOUT_SECONDS: trade_id -> logins.
+# Their trades stay pending until the last answer lands.
+late_orders = {}
+deferred_trades = set()
+late_lock = threading.Lock()
+
+def build_open_request(trade):
     symbol = trade['instrument']
     volume = round(max(float(trade['quantity']), 0.01), 2)
     order_type = trade['side'].lower()
 
-    symbol_info = mt5.symbol_info(symbol)
-    if symbol_info is None or not symbol_info.visible:
-        if not mt5.symbol_select(symbol, True):
-            print(f"❌ Symbol {symbol} not available for {account['login']}")
-            mt5.shutdown()
-            return False
-
     if order_type == "buy":
-        price = mt5.symbol_info_tick(symbol).ask
         order_type_code = mt5.ORDER_TYPE_BUY
     elif order_type == "sell":
-        price = mt5.symbol_info_tick(symbol).bid
         order_type_code = mt5.ORDER_TYPE_SELL
     else:
         print(f"❌ Unknown order type: {order_type}")
-        mt5.shutdown()
-        return False
+        return None
 
-    request = {
+    # Price is filled from the latest tick by the session pool
+    return {
         "action": mt5.TRADE_ACTION_DEAL,
         "symbol": symbol,
         "volume": volume,
         "type": order_type_code,
-        "price": price,
         "deviation": 10,
         "type_time": mt5.ORDER_TIME_GTC,
         "type_filling": mt5.ORDER_FILLING_FOK,
     }
 
-    print(f"\n📤 Sending order for {account['login']} -> {order_type.upper()} {symbol} {volume} lots @ {price}")
-    print(f"📦 Request: {request}")
+def fill_from_result(account_login, request, result, latency_ms):
+    """Turn an order_send result (object or supervisor dict) into a trade fill, or False."""
+    if result is None:
+        print(f"❌ Order failed for {account_login}: no response from MT5")
+        return False
 
-    result = mt5.order_send(request)
-    mt5.shutdown()
+    if isinstance(result, dict):
+        result = SimpleNamespace(**result)
 
     if result.retcode == mt5.TRADE_RETCODE_DONE:
-        print(f"✅ Order placed for {account['login']} - {order_type.upper()} {symbol} {volume}")
+        print(f"✅ Order placed for {account_login} - {request['symbol']} {request['volume']} @ {result.price}")
         
-        # ✅ Save MT5 ticket to DB (use str because mt5_ticket is varchar)
-        # from src.utils.database_handler import db_handler  # add this import at the top or pass it in
-        db_handler.update_mt5_ticket(trade['trade_id'], account['login'], str(result.order))
-
-        return True
+        # Saved as soon as it is placed (mt5_ticket is varchar)
+        return {
+            'account_login': str(account_login),
+            'mt5_ticket': str(result.order),
+            'volume': result.volume,
+            'fill_price': result.price,
+            'latency_ms': latency_ms
+        }
     else:
-        print(f"❌ Order failed for {account['login']}: {result.retcode}")
+        print(f"❌ Order failed for {account_login}: {result.retcode}")
         print(f"⚠️  Error description: {result}")
         return False
 
-def close_trade(account, ticket, symbol, volume, side):
-    if not connect_mt5(account):
-        print(f"❌ Failed to connect to MT5 for {account['login']}")
+def place_trade(account, trade):
+    request = build_open_request(trade)
+    if request is None:
         return False
-        
+
+    print(f"\n📤 Sending order for {account['login']} -> {trade['side'].upper()} {request['symbol']} {request['volume']} lots")
+    print(f"📦 Request: {request}")
+
+    sent_at = time.perf_counter()
+    result = session_pool.submit(account, request)
+    latency_ms = int((time.perf_counter() - sent_at) * 1000)
+    return fill_from_result(account['login'], request, result, latency_ms)
+
+def place_trade_parallel(trade, logins):
+    """Send the trade to the given followers' terminal processes at once.
+
+    An order that is not answered within ORDER_TIMEOUT_SECONDS may still
+    fill, so it is not given up on: its fill is saved when the answer lands.
+    """
+    request = build_open_request(trade)
+    if request is None or not logins:
+        return []
+
+    print(f"\n📤 Dispatching {trade['side'].upper()} {request['symbol']} {request['volume']} lots to {len(logins)} followers")
+    sent_at = time.perf_counter()
+    futures = {login: supervisor.submit(login, request) for login in logins}
+    wait(futures.values(), timeout=ORDER_TIMEOUT_SECONDS)
+    latency_ms = int((time.perf_counter() - sent_at) * 1000)
+
+    fills = []
+    for login, future in futures.items():
+        if not future.done():
+            print(f"⏳ No answer from {login} after {ORDER_TIMEOUT_SECONDS}s, keeping {trade['trade_id']} pending")
+            with late_lock:
+                late_orders.setdefault(trade['trade_id'], set()).add(login)
+            future.add_done_callback(
+                lambda late, login=login: save_late_fill(trade['trade_id'], login, request, late, sent_at)
+            )
+            continue
+        fill = fill_from_result(login, request, future.result(), latency_ms)
+        if fill:
+            fills.append(fill)
+    return fills
+
+def save_late_fill(trade_id, login, request, future, sent_at):
+    """Done-callback for a timed-out order: save its fill and finish the trade if it was the last."""
+    latency_ms = int((time.perf_counter() - sent_at) * 1000)
+    try:
+        fill = fill_from_result(login, request, future.result(), latency_ms)
+        if fill:
+            db_handler.save_trade_fills(trade_id, [fill])
+    except Exception as e:
+        print(f"❌ Could not save late fill for {trade_id}/{login}: {e}")
+
+    with late_lock:
+        waiting = late_orders.get(trade_id, set())
+        waiting.discard(login)
+        if waiting:
+            return
+        late_orders.pop(trade_id, None)
+        if trade_id not in deferred_trades:
+            # The batch loop has not reached this trade yet and will complete it
+            return
+        deferred_trades.discard(trade_id)
+    db_handler.complete_trade(trade_id, WORKER_ID)
+
+def finish_trade(trade_id):
+    """Mark a trade executed, unless an order for it is still unanswered."""
+    with late_lock:
+        if late_orders.get(trade_id):
+            deferred_trades.add(trade_id)
+            return
+    db_handler.complete_trade(trade_id, WORKER_ID)
+
+def close_trade(account, ticket, symbol, volume, side):
     # Ensure ticket is int
     try:
         ticket = int(ticket)
     except Exception as e:
         print(f"❌ Invalid ticket number: {ticket} ({e})")
-        mt5.shutdown()
         return False
 
-    # Get correct price
-    price = mt5.symbol_info_tick(symbol).bid if side.lower() == "buy" else mt5.symbol_info_tick(symbol).ask
     opposite_type = mt5.ORDER_TYPE_SELL if side.lower() == "buy" else mt5.ORDER_TYPE_BUY
 
     request = {
@@ -110,7 +189,6 @@ def close_trade(account, ticket, symbol, volume, side):
         "volume": volume,
         "type": opposite_type,
         "position": ticket,
-        "price": price,
         "deviation": 10,
         "type_time": mt5.ORDER_TIME_GTC,
         "type_filling": mt5.ORDER_FILLING_IOC,
@@ -119,58 +197,137 @@ def close_trade(account, ticket, symbol, volume, side):
     print(f"\n📤 Sending close order for {account['login']} - {symbol} ticket {ticket}")
     print(f"📦 Close request: {request}")
 
-    result = mt5.order_send(request)
-    # mt5.shutdown()
+    if supervisor:
+        try:
+            result = supervisor.submit(account['login'], request).result(timeout=ORDER_TIMEOUT_SECONDS)
+        except FuturesTimeoutError:
+            # Hung terminal: the row stays leased and is retried after the lease expires
+            print(f"❌ Close order for {account['login']} timed out after {ORDER_TIMEOUT_SECONDS:g}s")
+            return False
+        result = SimpleNamespace(**result) if result else None
+    else:
+        result = session_pool.submit(account, request)
 
     # ✅ Defensive check for None
     if result is None:
         print(f"❌ Close order failed for {account['login']}: No response from MT5 (check terminal, ticket, or market status)")
-        mt5.shutdown()
         return False
 
     if result.retcode == mt5.TRADE_RETCODE_DONE:
         print(f"✅ Position closed for {account['login']}. Deal ID: {result.deal}")
-        # return True
     else:
         print(f"❌ Close order failed for {account['login']}: {result.retcode}")
         print(f"⚠️  Error: {result.comment}")
-        # return False
     
-    mt5.shutdown()
     return result.retcode == mt5.TRADE_RETCODE_DONE
 
-def main():
-    print("🚀 Group Worker Started")
+def renew_lease(trade_ids, renewed_at):
+    """Extend the lease on claimed trades once a third of it has passed; returns the renewal time."""
+    now = time.monotonic()
+    if now - renewed_at < LEASE_SECONDS / 3:
+        return renewed_at
+    db_handler.renew_claims(trade_ids, WORKER_ID, LEASE_SECONDS)
+    return now
+
+def process_pending_trades():
+    while True:
+        claimed = db_handler.claim_pending_trades(WORKER_ID, CLAIM_BATCH, LEASE_SECONDS)
+        if not claimed:
+            return
+        trade_ids = [trade['trade_id'] for trade in claimed]
+        renewed_at = time.monotonic()
+
+        # A re-claimed trade (crash or lost lease) is only placed where it has no fill yet
+        filled = db_handler.get_filled_accounts(trade_ids)
+        if supervisor:
+            for trade in claimed:
+                renewed_at = renew_lease(trade_ids, renewed_at)
+                with late_lock:
+                    waiting = set(late_orders.get(trade['trade_id'], ()))
+                logins = [login for login in supervisor.terminals
+                          if login not in filled[trade['trade_id']] and login not in waiting]
+                db_handler.save_trade_fills(trade['trade_id'], place_trade_parallel(trade, logins))
+        else:
+            # Account-major order: attach each terminal once per batch, not once per trade
+            for account in accounts:
+                for trade in claimed:
+                    if str(account['login']) in filled[trade['trade_id']]:
+                        continue
+                    renewed_at = renew_lease(trade_ids, renewed_at)
+                    fill = place_trade(account, trade)
+                    if fill:
+                        # Persisted per order, so a crash mid-batch never re-places it
+                        db_handler.save_trade_fills(trade['trade_id'], [fill])
+        for trade_id in trade_ids:
+            finish_trade(trade_id)
+
+def process_pending_closes():
+    # Trades with nothing left to close are never claimed; finish them here
+    db_handler.settle_empty_closes(LEASE_SECONDS)
     while True:
-        # Process pending trades
-        pending_trades = db_handler.get_pending_trades()
-        if pending_trades:
-            for trade in pending_trades:
-                for account in accounts:
-                    success = place_trade(account, trade)
-                    if success:
-                        # After placing trade, mark only that account’s row as executed
-                        db_handler.update_mt5_ticket(trade['trade_id'], account['login'], str(result.order))  # example
-                db_handler.mark_trade_as_executed(trade['trade_id'])
-
-        # Process pending closes
-        pending_closes = db_handler.get_pending_closes()
-        if pending_closes:
-            for close in pending_closes:
-                account_login = str(close.get('account_login'))
-                if not account_login:
-                    print(f"⚠️ Skipping close for {close['trade_id']} (no account_login)")
+        claimed = db_handler.claim_pending_closes(WORKER_ID, CLAIM_BATCH, LEASE_SECONDS)
+        if not claimed:
+            return
+        # Group by account so each terminal is attached once per batch
+        claimed.sort(key=lambda close: str(close.get('account_login')))
+        for close in claimed:
+            account_login = str(close.get('account_login'))
+            if not account_login:
+                print(f"⚠️ Skipping close for {close['trade_id']} (no account_login)")
+                continue
+
+            account = next((acc for acc in accounts if str(acc['login']) == account_login), None)
+            if account:
+                success = close_trade(account, close['mt5_ticket'], close['instrument'], float(close['quantity']), close['side'])
+                if success:
+                    db_handler.complete_close(close['trade_id'], account_login, WORKER_ID)
                     continue
+            else:
+                print(f"❌ Account login {account_login} not found in accounts.json")
+            # Leave it for the next lease window rather than retrying in this loop
 
-                account = next((acc for acc in accounts if str(acc['login']) == account_login), None)
-                if account:
-                    success = close_trade(account, close['mt5_ticket'], close['instrument'], float(close['quantity']), close['side'])
-                    if success:
-                        db_handler.mark_trade_as_closed(close['trade_id'])
-                else:
-                    print(f"❌ Account login {account_login} not found in accounts.json")
+def main():
+    print(f"🚀 Group Worker Started ({WORKER_ID})")
+    if supervisor:
+        supervisor.start()
+        print(f"🧵 {len(accounts)} terminal processes started")
+    # Notifications wake the worker immediately; the slow poll catches anything missed
+    # (e.g. rows written while the LISTEN connection was down)
+    fallback_poll = float(os.getenv('WORKER_FALLBACK_POLL_SECONDS', '30'))
 
-        time.sleep(1)
+    # LISTEN before the initial drain so nothing slips in between
+    try:
+        db_handler.listen_for_trades()
+    except Exception as e:
+        print(f"⚠️ Could not LISTEN for trades ({e}), falling back to polling")
+
+    # Drain whatever is already pending before waiting
+    process_pending_trades()
+    process_pending_closes()
+
+    while True:
+        try:
+            notifications = db_handler.wait_for_trade_notifications(fallback_poll)
+        except Exception as e:
+            print(f"⚠️ LISTEN connection lost ({e}), polling until it is back")
+            time.sleep(1)
+            notifications = None
+
+        if notifications:
+            statuses = {n.get('status') for n in notifications}
+            if statuses & {'pending', None}:
+                process_pending_trades()
+            if statuses & {'close_pending', None}:
+                process_pending_closes()
+        else:
+            # Fallback poll (timeout or listener failure)
+            process_pending_trades()
+            process_pending_closes()
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    finally:
+        if supervisor:
+            supervisor.stop()
+        session_pool.close()
@@ -0,0 +1,95 @@
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import List, Optional
+
+import MetaTrader5 as mt5
+
+logger = logging.getLogger('DealCursor')
+
+# Deal reason -> close reason stored with the trade
+CLOSE_REASONS = {
+    mt5.DEAL_REASON_SL: 'sl',
+    mt5.DEAL_REASON_TP: 'tp',
+    mt5.DEAL_REASON_SO: 'stop_out',
+    mt5.DEAL_REASON_CLIENT: 'manual',
+    mt5.DEAL_REASON_MOBILE: 'manual',
+    mt5.DEAL_REASON_WEB: 'manual',
+    mt5.DEAL_REASON_EXPERT: 'expert',
+}
+
+EXIT_ENTRIES = {mt5.DEAL_ENTRY_OUT, mt5.DEAL_ENTRY_OUT_BY}
+
+class DealCursor:
+    """Read only the exit deals that appeared since the last poll.
+
+    history_deals_get filters with second resolution, so each poll re-reads
+    the last second and skips deal tickets it has already returned. Cost per
+    poll is proportional to the number of new deals, not open positions.
+
+    Deal times are broker server time, which can be hours off UTC, so the
+    cursor is never derived from the local clock: until it is seeded, polls
+    read a day either side of now and the cursor is placed lookback_seconds
+    before the server's clock (its newest deal or that symbol's latest tick).
+    """
+
+    def __init__(self, lookback_seconds: float = 60.0):
+        self.lock = threading.Lock()
+        self.lookback_msc = int(lookback_seconds * 1000)
+        self.cursor_msc: Optional[int] = None  # server time; seeded by the first poll that sees a deal
+        self.seen = {}  # deal ticket -> time_msc, only for deals at/after cursor - 1s
+
+    def _seed(self, deals) -> bool:
+        """Place the cursor lookback before the server clock; False if there is nothing to read it from."""
+        newest = max(deals, key=lambda d: d.time_msc, default=None)
+        if newest is None:
+            return False
+        server_now = newest.time_msc
+        tick = mt5.symbol_info_tick(newest.symbol)
+        if tick is not None:
+            server_now = max(server_now, getattr(tick, 'time_msc', tick.time * 1000))
+        self.cursor_msc = server_now - self.lookback_msc
+        return True
+
+    def poll(self) -> Optional[List[SimpleNamespace]]:
+        """New exit deals since the last poll, oldest first; None if the terminal didn't answer."""
+        with self.lock:
+            now = datetime.now(timezone.utc)
+            if self.cursor_msc is None:
+                date_from = now - timedelta(days=1, milliseconds=self.lookback_msc)
+            else:
+                date_from = datetime.fromtimestamp(self.cursor_msc // 1000, tz=timezone.utc)
+            # Open-ended upper bound: server time can be hours ahead of ours
+            date_to = now + timedelta(days=1)
+            deals = mt5.history_deals_get(date_from, date_to)
+            if deals is None:
+                logger.error(f"history_deals_get failed: {mt5.last_error()}")
+                return None
+            if self.cursor_msc is None and not self._seed(deals):
+                return []
+
+            closes = []
+            for deal in sorted(deals, key=lambda d: d.time_msc):
+                if deal.ticket in self.seen or deal.time_msc < self.cursor_msc - 1000:
+                    continue
+                self.seen[deal.ticket] = deal.time_msc
+                self.cursor_msc = max(self.cursor_msc, deal.time_msc)
+                if deal.entry not in EXIT_ENTRIES:
+                    continue
+                closes.append(SimpleNamespace(
+                    deal=deal.ticket,
+                    position_id=str(deal.position_id),
+                    symbol=deal.symbol,
+                    reason=CLOSE_REASONS.get(deal.reason, 'other'),
+                    price=deal.price,
+                    volume=deal.volume,
+                    profit=deal.profit,
+                    # Broker server time (not UTC), as MT5 reports it
+                    server_time=datetime.fromtimestamp(deal.time_msc / 1000, tz=timezone.utc).replace(tzinfo=None)
+                ))
+
+            # Only the last second can be re-read; forget anything older
+            horizon = self.cursor_msc - 1000
+            self.seen = {ticket: msc for ticket, msc in self.seen.items() if msc >= horizon}
+            return closes
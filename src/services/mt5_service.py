@@ -3,16 +3,28 @@ import asyncio
 import logging
 import time
 from datetime import datetime
+from types import SimpleNamespace
 from typing import Any, Callable, Dict, Optional, List
 from pathlib import Path
 import MetaTrader5 as mt5
+import numpy as np
 
 from src.config.mt5_symbol_config import SymbolMapper
 from src.utils.database_handler import DatabaseHandler
 from src.utils.instrument_manager import InstrumentManager
+from src.utils.trailing import compute_trailing_stops
+from src.services.tick_cache import TickCache
 
 logger = logging.getLogger('MT5Service')
 
+# Retcodes that mean our cached symbol spec may be stale
+SPEC_INVALIDATING_RETCODES = {
+    mt5.TRADE_RETCODE_INVALID_FILL,
+    mt5.TRADE_RETCODE_INVALID_VOLUME,
+    mt5.TRADE_RETCODE_TRADE_DISABLED,
+    mt5.TRADE_RETCODE_MARKET_CLOSED,
+}
+
 def find_mt5_terminals() -> List[str]:
     """Find all MT5 terminals installed on the system."""
     terminals = []
@@ -39,6 +51,18 @@ class MT5Service:
         self.db = db_handler
         self.instrument_manager = InstrumentManager()
         
+        # Static symbol metadata per terminal; prices always come from symbol_info_tick
+        self.symbol_specs: Dict[str, SimpleNamespace] = {}
+        self.symbol_cache_ttl = float(os.getenv('MT5_SYMBOL_CACHE_TTL', '3600'))
+        
+        # One price view for every consumer; orders demand a fresher tick than monitors
+        self.ticks = TickCache()
+        self.order_tick_max_age_ms = float(os.getenv('MT5_ORDER_TICK_MAX_AGE_MS', '150'))
+        
+        # Trailing-stop registry: ticket -> SimpleNamespace(symbol, pips, is_buy, last_sl, tp)
+        self.trailing_stops: Dict[int, SimpleNamespace] = {}
+        self.trailing_interval = float(os.getenv('MT5_TRAILING_INTERVAL', '1'))
+        
         # Get terminal path from environment
         self.terminal_path = os.getenv('MT5_TERMINAL_PATH')
         
@@ -106,6 +130,11 @@ class MT5Service:
             if self.terminal_path:
                 logger.info(f"Using terminal: {self.terminal_path}\n")
             logger.info(f"✅ MT5 Connected: {account_info.login} ({account_info.server})")
+            
+            # New session: previously cached specs and ticks may belong to another terminal
+            self.symbol_specs.clear()
+            self.ticks.clear()
+            self.warm_symbol_cache()
             return True
                 
         except Exception as e:
@@ -161,6 +190,71 @@ class MT5Service:
             logger.error(f"Error determining filling type: {e}")
             return None
 
+    def _load_symbol_spec(self, mt5_symbol: str) -> Optional[SimpleNamespace]:
+        """Read the static parts of symbol_info that orders need."""
+        symbol_info = mt5.symbol_info(mt5_symbol)
+        if not symbol_info:
+            return None
+        
+        spec = SimpleNamespace(
+            name=mt5_symbol,
+            digits=symbol_info.digits,
+            point=symbol_info.point,
+            tick_size=symbol_info.trade_tick_size or symbol_info.point,
+            volume_min=symbol_info.volume_min,
+            volume_max=symbol_info.volume_max,
+            volume_step=symbol_info.volume_step,
+            filling_mode=symbol_info.filling_mode,
+            filling_type=self._get_filling_type(symbol_info),
+            trade_mode=symbol_info.trade_mode,
+            visible=symbol_info.visible,
+            loaded_at=time.monotonic()
+        )
+        self.symbol_specs[mt5_symbol] = spec
+        return spec
+
+    def get_symbol_spec(self, mt5_symbol: str) -> Optional[SimpleNamespace]:
+        """Cached symbol metadata; selects the symbol into Market Watch on first use."""
+        spec = self.symbol_specs.get(mt5_symbol)
+        if spec is None or time.monotonic() - spec.loaded_at > self.symbol_cache_ttl:
+            spec = self._load_symbol_spec(mt5_symbol)
+            if spec is None:
+                return None
+        
+        # Ticks only flow for selected symbols
+        if not spec.visible:
+            if not mt5.symbol_select(mt5_symbol, True):
+                return None
+            spec.visible = True
+        return spec
+
+    def invalidate_symbol(self, mt5_symbol: str) -> None:
+        """Drop a symbol's cached spec so the next order reloads it."""
+        if self.symbol_specs.pop(mt5_symbol, None):
+            logger.info(f"Symbol spec for {mt5_symbol} invalidated")
+
+    def _check_retcode(self, mt5_symbol: str, result) -> None:
+        """Invalidate the spec when the terminal rejects an order for spec reasons."""
+        if result is not None and result.retcode in SPEC_INVALIDATING_RETCODES:
+            self.invalidate_symbol(mt5_symbol)
+
+    def warm_symbol_cache(self) -> int:
+        """Load specs for every configured instrument so the first order pays nothing."""
+        names = set(self.symbol_mapper.get_all_mappings().values())
+        for section in ('instruments', 'custom'):
+            for pair in self.instrument_manager.instruments.get(section, {}).get('pairs', []):
+                names.add(self.map_symbol(pair['name']))
+        
+        loaded = 0
+        for mt5_symbol in names:
+            try:
+                if self._load_symbol_spec(mt5_symbol):
+                    loaded += 1
+            except Exception as e:
+                logger.error(f"Error loading symbol spec for {mt5_symbol}: {e}")
+        logger.info(f"Symbol cache warmed: {loaded}/{len(names)} symbols")
+        return loaded
+
     def _execute_order(self, trade_data: Dict[str, Any]) -> Dict[str, Any]:
             try:
                 # Initialize MT5
@@ -179,24 +273,25 @@ class MT5Service:
                 if not all([instrument, side, quantity]):
                     return {"error": "Missing required fields"}
                     
-                # Map symbol and enable for trading
+                # Map symbol; spec comes from cache
                 mt5_symbol = self.map_symbol(instrument)
-                if not mt5.symbol_select(mt5_symbol, True):
-                    return {"error": f"Failed to select symbol {mt5_symbol}"}
-                
-                # Get symbol info
-                symbol_info = mt5.symbol_info(mt5_symbol)
-                if not symbol_info:
+                symbol_spec = self.get_symbol_spec(mt5_symbol)
+                if not symbol_spec:
                     return {"error": f"Failed to get symbol info for {mt5_symbol}"}
                 
+                # Live price is the only terminal read on the hot path
+                tick = self.ticks.get(mt5_symbol, self.order_tick_max_age_ms)
+                if not tick:
+                    return {"error": f"Failed to get price for {mt5_symbol}"}
+                
                 # Prepare order parameters
                 is_buy = side.lower() == 'buy'
                 order_type = mt5.ORDER_TYPE_BUY if is_buy else mt5.ORDER_TYPE_SELL
-                price = symbol_info.ask if is_buy else symbol_info.bid
+                price = tick.ask if is_buy else tick.bid
                 position_id = trade_data.get('execution_data', {}).get('positionId', 'unknown')
 
-                # Get supported filling modes
-                filling_type = self._get_filling_type(symbol_info)
+                # Supported filling mode (cached with the spec)
+                filling_type = symbol_spec.filling_type
 
                 # Construct order request
                 request = {
@@ -223,6 +318,7 @@ class MT5Service:
 
                 # Send order
                 result = mt5.order_send(request)
+                self._check_retcode(mt5_symbol, result)
                 if not result or result.retcode != mt5.TRADE_RETCODE_DONE:
                     error_msg = mt5.last_error() if not result else result.comment
                     return {
@@ -280,13 +376,9 @@ class MT5Service:
             # Get position details
             mt5_symbol = self.map_symbol(instrument)
                         
-            # Select symbol first
-            if not mt5.symbol_select(mt5_symbol, True):
-                return {"error": f"Failed to select symbol {mt5_symbol}"}
-                
-            # Get symbol info
-            symbol_info = mt5.symbol_info(mt5_symbol)
-            if not symbol_info:
+            # Cached symbol spec
+            symbol_spec = self.get_symbol_spec(mt5_symbol)
+            if not symbol_spec:
                 return {"error": f"Failed to get symbol info for {mt5_symbol}"}
 
             # Get position details
@@ -302,17 +394,21 @@ class MT5Service:
             
             is_partial = close_volume < position.volume
                 
+            tick = self.ticks.get(mt5_symbol, self.order_tick_max_age_ms)
+            if not tick:
+                return {"error": f"Failed to get price for {mt5_symbol}"}
+                
             # Determine order type based on position type
             if position.type == mt5.POSITION_TYPE_BUY:
                 order_type = mt5.ORDER_TYPE_SELL
-                price = symbol_info.bid
+                price = tick.bid
             else:
                 order_type = mt5.ORDER_TYPE_BUY
-                price = symbol_info.ask
+                price = tick.ask
 
             position_id = trade_data.get('execution_data', {}).get('positionId', 'unknown')
 
-            filling_type = self._get_filling_type(symbol_info)
+            filling_type = symbol_spec.filling_type
 
             request = {
                 "action": mt5.TRADE_ACTION_DEAL,
@@ -332,6 +428,7 @@ class MT5Service:
             
             # Send close order
             result = mt5.order_send(request)
+            self._check_retcode(mt5_symbol, result)
             
             if not result or result.retcode != mt5.TRADE_RETCODE_DONE:
                 error_msg = mt5.last_error() if not result else result.comment
@@ -383,10 +480,11 @@ class MT5Service:
             symbol = trade_data['instrument']
             ticket = int(trade_data['mt5_ticket'])
             
-            # Map symbol and enable for trading
+            # Map symbol; spec comes from cache
             mt5_symbol = self.map_symbol(symbol)
-            if not mt5.symbol_select(mt5_symbol, True):
-                return {"error": f"Failed to select symbol {mt5_symbol}"}
+            symbol_spec = self.get_symbol_spec(mt5_symbol)
+            if not symbol_spec:
+                return {'error': f'Could not get symbol info for {mt5_symbol}'}
             
             # Get current position
             positions = mt5.positions_get(ticket=ticket)
@@ -399,23 +497,21 @@ class MT5Service:
             if position.symbol != mt5_symbol:
                 return {'error': f'Position #{ticket} exists but symbol mismatch: expected {mt5_symbol}, found {position.symbol}'}
 
-            # Get symbol info for proper formatting
-            symbol_info = mt5.symbol_info(mt5_symbol)
-            if not symbol_info:
-                return {'error': f'Could not get symbol info for {mt5_symbol}'}
-            
-            digits = symbol_info.digits
-            point = symbol_info.point
+            digits = symbol_spec.digits
+            point = symbol_spec.point
 
             # Handle None values and proper formatting
             take_profit = float(trade_data['take_profit']) if trade_data.get('take_profit') is not None else None
             stop_loss = float(trade_data['stop_loss']) if trade_data.get('stop_loss') is not None else None
             trailing_pips = float(trade_data.get('trailing_stop_pips', 0)) if trade_data.get('trailing_stop_pips') is not None else None
 
+            price_tick = self.ticks.get(mt5_symbol, self.order_tick_max_age_ms)
+            if not price_tick:
+                return {'error': f'Failed to get price for {mt5_symbol}'}
+
             # Calculate stop loss based on trailing pips if provided
             if trailing_pips and trailing_pips > 0:
                 trailing_points = trailing_pips * 10  # Convert pips to points
-                price_tick = mt5.symbol_info_tick(mt5_symbol)
                 
                 if position.type == mt5.POSITION_TYPE_BUY:
                     stop_loss = round(price_tick.bid - trailing_points * point, digits)
@@ -423,7 +519,6 @@ class MT5Service:
                     stop_loss = round(price_tick.ask + trailing_points * point, digits)
 
             # Validate stop loss level
-            price_tick = mt5.symbol_info_tick(mt5_symbol)
             if stop_loss is not None:
                 if position.type == mt5.POSITION_TYPE_BUY and stop_loss >= price_tick.bid:
                     return {'error': 'Stop Loss must be below current price for buy positions'}
@@ -448,6 +543,7 @@ class MT5Service:
 
             # Send the update request
             result = mt5.order_send(request)
+            self._check_retcode(mt5_symbol, result)
             
             if result.retcode != mt5.TRADE_RETCODE_DONE:
                 return {
@@ -455,6 +551,17 @@ class MT5Service:
                     'retcode': result.retcode
                 }
                 
+            # Keep the trailing registry in step with the position
+            if trailing_pips is not None:
+                self.register_trailing_stop(
+                    ticket, mt5_symbol, trailing_pips,
+                    position.type == mt5.POSITION_TYPE_BUY,
+                    request['sl'], request['tp']
+                )
+            else:
+                # A TP/SL-only modify ends trailing, as it did before the registry
+                self.unregister_trailing_stop(ticket)
+                
             response = {
                 'ticket': ticket,
                 'symbol': mt5_symbol,
@@ -469,66 +576,107 @@ class MT5Service:
             logger.error(f"Error updating position: {e}")
             return {'error': str(e)}     
     
+    def register_trailing_stop(self, ticket: int, symbol: str, trailing_pips: float, is_buy: bool,
+                               sl: float = 0.0, tp: float = 0.0) -> None:
+        """Track a position's trailing stop; zero pips removes it."""
+        if not trailing_pips or trailing_pips <= 0:
+            self.unregister_trailing_stop(ticket)
+            return
+        self.trailing_stops[int(ticket)] = SimpleNamespace(
+            ticket=int(ticket),
+            symbol=symbol,
+            pips=float(trailing_pips),
+            is_buy=is_buy,
+            last_sl=sl or 0.0,
+            tp=tp or 0.0
+        )
+
+    def unregister_trailing_stop(self, ticket) -> None:
+        """Stop trailing a position (closed or trailing removed)."""
+        if str(ticket).isdigit():
+            self.trailing_stops.pop(int(ticket), None)
+
+    async def load_trailing_stops(self) -> int:
+        """Seed the registry once at startup: one DB query plus one positions_get."""
+        if not self.db:
+            return 0
+        trades = await self.db.async_get_trailing_trades()
+        if not trades:
+            return 0
+        
+        positions = await self.loop.run_in_executor(None, mt5.positions_get)
+        by_ticket = {str(position.ticket): position for position in positions or ()}
+        for trade in trades:
+            position = by_ticket.get(str(trade['mt5_ticket']))
+            if position:
+                self.register_trailing_stop(
+                    position.ticket, position.symbol, trade['trailing_stop_pips'],
+                    position.type == mt5.POSITION_TYPE_BUY, position.sl, position.tp
+                )
+        logger.info(f"Loaded {len(self.trailing_stops)} trailing stops")
+        return len(self.trailing_stops)
+
+    def _trailing_updates(self) -> List[tuple]:
+        """Compute (entry, new_sl) for stops that moved by at least one broker step.
+        
+        Reads one tick per distinct symbol, then packs every position into
+        arrays and evaluates all candidate SLs in one vectorized step.
+        """
+        entries = list(self.trailing_stops.values())
+        
+        quotes = {}
+        for symbol in {entry.symbol for entry in entries}:
+            symbol_spec = self.get_symbol_spec(symbol)
+            tick = self.ticks.get(symbol)
+            if symbol_spec and tick:
+                pip_size = self.instrument_manager.get_pip_size(symbol)
+                step = max(symbol_spec.point, symbol_spec.tick_size)
+                quotes[symbol] = (tick.bid, tick.ask, pip_size, symbol_spec.digits, step)
+        
+        entries = [entry for entry in entries if entry.symbol in quotes]
+        if not entries:
+            return []
+        
+        count = len(entries)
+        bid, ask, pip_size, digits, step = (
+            np.fromiter(column, dtype=float, count=count)
+            for column in zip(*(quotes[entry.symbol] for entry in entries))
+        )
+        new_sl, move = compute_trailing_stops(
+            np.fromiter((entry.is_buy for entry in entries), dtype=bool, count=count),
+            bid, ask,
+            np.fromiter((entry.pips for entry in entries), dtype=float, count=count),
+            pip_size,
+            np.fromiter((entry.last_sl for entry in entries), dtype=float, count=count),
+            digits, step
+        )
+        return [(entries[i], float(new_sl[i])) for i in np.flatnonzero(move)]
+
     async def monitor_trailing_stops(self):
-        """Monitor and update trailing stops."""
+        """Monitor and update trailing stops from the in-memory registry."""
+        try:
+            await self.load_trailing_stops()
+        except Exception as e:
+            logger.error(f"Error loading trailing stops: {e}")
+        
         while self.running:
             try:
-                positions = await self.loop.run_in_executor(None, mt5.positions_get)
-                if not positions:
-                    await asyncio.sleep(1)
-                    continue
-
-                for position in positions:
-                    try:
-                        trade = await self.db.async_get_trade_by_mt5_ticket(str(position.ticket))
-                        if not trade or not trade.get('trailing_stop_pips'):
-                            continue
+                if self.trailing_stops:
+                    updates = await self.loop.run_in_executor(None, self._trailing_updates)
+                    for entry, new_sl in updates:
+                        try:
+                            if await self._update_stop_loss_mt5(entry.ticket, new_sl, entry.tp, entry.symbol):
+                                entry.last_sl = new_sl
+                        except Exception as e:
+                            logger.error(f"Error processing position {entry.ticket}: {e}")
 
-                        trailing_pips = float(trade['trailing_stop_pips'])
-                        symbol_info = mt5.symbol_info(position.symbol)
-                        current_prices = mt5.symbol_info_tick(position.symbol)
-                        
-                        if not symbol_info or not current_prices:
-                            continue
-
-                        trailing_distance = self.instrument_manager.calculate_trailing_distance(
-                            position.symbol,
-                            trailing_pips,
-                            symbol_info
-                        )
-
-                        if position.type == mt5.POSITION_TYPE_BUY:
-                            new_sl = round(current_prices.bid - trailing_distance, symbol_info.digits)
-                            
-                            if position.sl == 0 or new_sl > position.sl:
-                                await self._update_stop_loss_mt5(
-                                    position.ticket, 
-                                    new_sl, 
-                                    position.tp, 
-                                    position.symbol
-                                )
-
-                        else:  # SELL position
-                            new_sl = round(current_prices.ask + trailing_distance, symbol_info.digits)
-                            
-                            if position.sl == 0 or new_sl < position.sl:
-                                await self._update_stop_loss_mt5(
-                                    position.ticket, 
-                                    new_sl, 
-                                    position.tp, 
-                                    position.symbol
-                                )
-
-                    except Exception as e:
-                        logger.error(f"Error processing position {position.ticket}: {e}")
-
-                await asyncio.sleep(1)
+                await asyncio.sleep(self.trailing_interval)
 
             except Exception as e:
                 logger.error(f"Error monitoring trailing stops: {e}")
-                await asyncio.sleep(1)
+                await asyncio.sleep(self.trailing_interval)
 
-    async def _update_stop_loss_mt5(self, ticket: int, sl_price: float, tp: float, symbol: str) -> None:
+    async def _update_stop_loss_mt5(self, ticket: int, sl_price: float, tp: float, symbol: str) -> bool:
         """Update position's stop loss with retry logic."""
         for attempt in range(5):
             try:
@@ -538,15 +686,11 @@ class MT5Service:
                         position = mt5.positions_get(ticket=ticket)
                         if not position:
                             print(f"❌ Position {ticket} not found")
+                            self.unregister_trailing_stop(ticket)
                             return False
                         
-                        # Select symbol
-                        if not mt5.symbol_select(symbol):
-                            print(f"❌ Failed to select symbol {symbol}")
-                            return False
-
-                        # Get symbol info
-                        symbol_info = mt5.symbol_info(symbol)
+                        # Cached symbol spec (selects the symbol if needed)
+                        symbol_info = self.get_symbol_spec(symbol)
                         if not symbol_info:
                             print(f"❌ Failed to get symbol info for {symbol}")
                             return False
@@ -571,6 +715,7 @@ class MT5Service:
                             request["tp"] = tp
                         
                         result = mt5.order_send(request)
+                        self._check_retcode(symbol, result)
                         
                         if result is None:
                             print(f"❌ Order send failed: {mt5.last_error()}")
@@ -598,7 +743,9 @@ class MT5Service:
 
                 success = await self.loop.run_in_executor(None, _modify)
                 if success:
-                    return
+                    return True
+                if ticket not in self.trailing_stops:
+                    return False  # position is gone, nothing to retry
 
                 wait_time = 0.1 * (attempt + 1)
                 print(f"⏳ Retrying in {wait_time}s...")
@@ -609,9 +756,11 @@ class MT5Service:
                 await asyncio.sleep(0.1 * (attempt + 1))
 
         logger.error(f"Failed to update trailing stop after 5 attempts")
+        return False
 
     def cleanup(self):
         """Cleanup MT5 connection."""
+        self.ticks.stop()
         self.running = False  # Stop the monitor
         if self.initialized:
             mt5.shutdown()
@@ -687,6 +836,7 @@ class MT5Service:
 
     def cleanup(self):
         """Cleanup MT5 connection."""
+        self.ticks.stop()
         if self.initialized:
             mt5.shutdown()
             self.initialized = False
\ No newline at end of file
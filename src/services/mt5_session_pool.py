@@ -0,0 +1,134 @@
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import MetaTrader5 as mt5
+
+from src.services.tick_cache import TickCache
+
+logger = logging.getLogger('MT5SessionPool')
+
+# IPC failures where the request never reached the terminal, so a resend is safe
+RETRYABLE_ERRORS = {-10001, -10003, -10004}  # INTERNAL_FAIL_SEND / _INIT / _CONNECT
+
+class MT5SessionPool:
+    """Keep terminal sessions attached across orders instead of initialize/shutdown per trade.
+
+    The MetaTrader5 package talks to one terminal per process, so the pool holds
+    the current attachment open and only re-initializes when an order targets a
+    different account or the health check fails. Run one process per terminal
+    for every account to stay attached permanently.
+    """
+
+    def __init__(self, health_check_interval: float = 5.0):
+        self.health_check_interval = health_check_interval
+        self.order_tick_max_age_ms = float(os.getenv('MT5_ORDER_TICK_MAX_AGE_MS', '150'))
+        self.lock = threading.RLock()
+        self.current_login = None
+        self.last_healthy = 0.0
+        self.connects = 0
+        self.selected = set()  # symbols known to be in Market Watch on this attachment
+        self.ticks = TickCache()
+
+    def _connect(self, account: Dict[str, Any]) -> bool:
+        # Detach whatever is attached (no-op when nothing is)
+        mt5.shutdown()
+        self.current_login = None
+        self.selected.clear()
+        self.ticks.clear()
+
+        if not mt5.initialize(
+            path=account['path'],
+            login=int(account['login']),
+            password=account['password'],
+            server=account['server']
+        ):
+            logger.error(f"MT5 initialization failed for {account['login']}: {mt5.last_error()}")
+            return False
+
+        self.current_login = str(account['login'])
+        self.last_healthy = time.monotonic()
+        self.connects += 1
+        logger.info(f"✅ MT5 session attached: {account['login']} ({account['server']})")
+        return True
+
+    def _healthy(self, account: Dict[str, Any]) -> bool:
+        """Cheap check that the attached terminal is still logged into this account."""
+        if self.current_login != str(account['login']):
+            return False
+        if time.monotonic() - self.last_healthy < self.health_check_interval:
+            return True
+
+        terminal = mt5.terminal_info()
+        info = mt5.account_info()
+        if terminal is None or info is None or not terminal.connected or str(info.login) != self.current_login:
+            logger.warning(f"MT5 session for {self.current_login} is unhealthy, reconnecting")
+            return False
+
+        self.last_healthy = time.monotonic()
+        return True
+
+    def ensure(self, account: Dict[str, Any]) -> bool:
+        """Attach to account's terminal unless already attached and healthy."""
+        with self.lock:
+            return self._healthy(account) or self._connect(account)
+
+    def _prepare(self, request: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Select the symbol and fill in a market price if the request has none."""
+        symbol = request['symbol']
+        if symbol not in self.selected:
+            symbol_info = mt5.symbol_info(symbol)
+            if symbol_info is None or not symbol_info.visible:
+                if not mt5.symbol_select(symbol, True):
+                    logger.error(f"Symbol {symbol} not available for {self.current_login}")
+                    return None
+            self.selected.add(symbol)
+
+        if request.get('price') is None:
+            tick = self.ticks.get(symbol, self.order_tick_max_age_ms)
+            if tick is None:
+                logger.error(f"No tick for {symbol}")
+                return None
+            is_buy = request['type'] == mt5.ORDER_TYPE_BUY
+            request = {**request, 'price': tick.ask if is_buy else tick.bid}
+        return request
+
+    def submit(self, account: Dict[str, Any], request: Dict[str, Any]) -> Any:
+        """Send request on account's session; returns the order_send result or None."""
+        with self.lock:
+            for attempt in range(2):
+                if not self.ensure(account):
+                    return None
+
+                prepared = self._prepare(request)
+                if prepared is None:
+                    return None
+
+                result = mt5.order_send(prepared)
+                if result is not None:
+                    self.last_healthy = time.monotonic()
+                    return result
+
+                error = mt5.last_error()
+                logger.error(f"order_send returned None for {account['login']}: {error}")
+                # Force a reconnect; resend only if the terminal never got the request
+                self.last_healthy = 0.0
+                self.current_login = None
+                if error[0] not in RETRYABLE_ERRORS or attempt:
+                    return None
+            return None
+
+    def call(self, account: Dict[str, Any], func, *args, **kwargs) -> Any:
+        """Run any MetaTrader5 call (e.g. mt5.positions_get) on account's session."""
+        with self.lock:
+            if not self.ensure(account):
+                return None
+            return func(*args, **kwargs)
+
+    def close(self) -> None:
+        with self.lock:
+            if self.current_login is not None:
+                mt5.shutdown()
+                self.current_login = None
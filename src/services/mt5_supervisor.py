@@ -0,0 +1,176 @@
+import itertools
+import json
+import logging
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import Future, wait
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger('MT5Supervisor')
+
+project_root = str(Path(__file__).parent.parent.parent)
+
+class TerminalProcess:
+    """One mt5_terminal child process owning a single account's terminal."""
+
+    def __init__(self, account: Dict[str, Any]):
+        self.account = account
+        self.login = str(account['login'])
+        self.process = None
+        self.reader = None
+        self.pending = {}  # request id -> Future
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.restarts = 0
+
+    def start(self) -> None:
+        with self.lock:
+            self.process = subprocess.Popen(
+                [sys.executable, '-m', 'src.services.mt5_terminal'],
+                cwd=project_root,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                text=True,
+                bufsize=1
+            )
+            # Credentials go over the pipe, not argv/env
+            self.process.stdin.write(json.dumps(self.account) + '\n')
+            self.process.stdin.flush()
+            # Fresh map per process so a dying reader only fails its own requests
+            self.pending = {}
+            self.reader = threading.Thread(target=self._read_results, args=(self.process, self.pending), daemon=True)
+            self.reader.start()
+        logger.info(f"Started terminal process for {self.login} (pid {self.process.pid})")
+
+    def _read_results(self, process: subprocess.Popen, pending: Dict[int, Future]) -> None:
+        for line in process.stdout:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                logger.error(f"Bad message from {self.login}: {line!r}")
+                continue
+            with self.lock:
+                future = pending.pop(message.get('id'), None)
+            if future:
+                future.set_result(message.get('result'))
+
+        # EOF: process exited, nothing in flight will be answered
+        with self.lock:
+            orphaned = list(pending.values())
+            pending.clear()
+        for future in orphaned:
+            future.set_result(None)
+
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def send(self, op: str, request: Optional[Dict[str, Any]] = None) -> Future:
+        future = Future()
+        with self.lock:
+            if not self.alive():
+                future.set_result(None)
+                return future
+            request_id = next(self.ids)
+            self.pending[request_id] = future
+            try:
+                self.process.stdin.write(json.dumps({'id': request_id, 'op': op, 'request': request}) + '\n')
+                self.process.stdin.flush()
+            except (BrokenPipeError, OSError) as e:
+                logger.error(f"Pipe to {self.login} broken: {e}")
+                self.pending.pop(request_id, None)
+                future.set_result(None)
+        return future
+
+    def stop(self, timeout: float = 5.0) -> None:
+        if not self.alive():
+            return
+        try:
+            self.process.stdin.write(json.dumps({'op': 'stop'}) + '\n')
+            self.process.stdin.flush()
+            self.process.wait(timeout=timeout)
+        except (BrokenPipeError, OSError, subprocess.TimeoutExpired):
+            self.process.kill()
+            self.process.wait()
+
+class MT5Supervisor:
+    """Run one long-lived execution process per follower terminal.
+
+    Orders go to every child at once over its stdin/stdout pipe, so a leader
+    signal is executed on all followers in parallel instead of serially through
+    the process-global MetaTrader5 module. Crashed children are restarted.
+    """
+
+    def __init__(self, accounts: List[Dict[str, Any]], monitor_interval: float = 1.0,
+                 max_restart_delay: float = 30.0):
+        self.terminals = {str(account['login']): TerminalProcess(account) for account in accounts}
+        self.monitor_interval = monitor_interval
+        self.max_restart_delay = max_restart_delay
+        self.running = False
+        self.monitor_thread = None
+
+    def start(self) -> None:
+        self.running = True
+        for terminal in self.terminals.values():
+            terminal.start()
+        self.monitor_thread = threading.Thread(target=self._monitor, daemon=True)
+        self.monitor_thread.start()
+
+    def _monitor(self) -> None:
+        """Restart children that died, backing off if one keeps crashing."""
+        next_restart = {}
+        while self.running:
+            now = time.monotonic()
+            for login, terminal in self.terminals.items():
+                if terminal.alive() or not self.running:
+                    continue
+                if now < next_restart.get(login, 0):
+                    continue
+                logger.warning(f"Terminal process for {login} exited "
+                               f"(code {terminal.process.returncode}), restarting")
+                terminal.restarts += 1
+                delay = min(2 ** min(terminal.restarts, 10) * 0.1, self.max_restart_delay)
+                next_restart[login] = now + delay
+                try:
+                    terminal.start()
+                except Exception as e:
+                    logger.error(f"Failed to restart terminal process for {login}: {e}")
+            time.sleep(self.monitor_interval)
+
+    def submit(self, login: str, request: Dict[str, Any]) -> Future:
+        """Send one order to one follower; the Future resolves to a result dict or None."""
+        return self.terminals[str(login)].send('order', request)
+
+    def dispatch(self, requests: Dict[str, Dict[str, Any]], timeout: float = 30.0) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Send each login its request concurrently and collect results (None on failure/timeout)."""
+        futures = {login: self.submit(login, request) for login, request in requests.items()}
+        wait(futures.values(), timeout=timeout)
+        return {
+            login: future.result() if future.done() else None
+            for login, future in futures.items()
+        }
+
+    def broadcast(self, request: Dict[str, Any], timeout: float = 30.0) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Send the same request to every follower."""
+        return self.dispatch({login: request for login in self.terminals}, timeout)
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            login: {
+                'alive': terminal.alive(),
+                'pid': terminal.process.pid if terminal.process else None,
+                'restarts': terminal.restarts,
+                'in_flight': len(terminal.pending)
+            }
+            for login, terminal in self.terminals.items()
+        }
+
+    def stop(self) -> None:
+        self.running = False
+        if self.monitor_thread:
+            self.monitor_thread.join(timeout=self.monitor_interval * 2)
+        for terminal in self.terminals.values():
+            terminal.stop()
+        logger.info("All terminal processes stopped")
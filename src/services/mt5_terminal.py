@@ -0,0 +1,66 @@
+"""Single-terminal execution process driven by MT5Supervisor.
+
+Protocol: JSON lines. The first line on stdin is the account dict; each
+following line is {"id", "op", "request"} and gets exactly one
+{"id", "result"} line back on stdout. Logs go to stderr.
+
+Usage (normally spawned by MT5Supervisor): python -m src.services.mt5_terminal
+"""
+import json
+import logging
+import sys
+from pathlib import Path
+
+# Add project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+sys.path.insert(0, project_root)
+
+from src.services.mt5_session_pool import MT5SessionPool
+
+logger = logging.getLogger('MT5Terminal')
+
+RESULT_FIELDS = ('retcode', 'deal', 'order', 'volume', 'price', 'bid', 'ask', 'comment')
+
+def result_to_dict(result):
+    """Reduce an order_send TradeResult to plain JSON fields."""
+    if result is None:
+        return None
+    return {field: getattr(result, field, None) for field in RESULT_FIELDS}
+
+def main():
+    # stdout carries the protocol only; anything printed goes to stderr
+    protocol_out = sys.stdout
+    sys.stdout = sys.stderr
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    account = json.loads(sys.stdin.readline())
+    pool = MT5SessionPool()
+    # Log in up front so the first order doesn't pay for it
+    pool.ensure(account)
+    logger.info(f"Terminal process ready for {account['login']}")
+
+    for line in sys.stdin:
+        message = json.loads(line)
+        op = message.get('op')
+        try:
+            if op == 'order':
+                result = result_to_dict(pool.submit(account, message['request']))
+            elif op == 'ping':
+                result = pool.ensure(account)
+            elif op == 'stop':
+                break
+            else:
+                result = None
+                logger.error(f"Unknown op: {op}")
+        except Exception as e:
+            logger.error(f"Error handling {op}: {e}")
+            result = None
+
+        protocol_out.write(json.dumps({'id': message.get('id'), 'result': result}) + '\n')
+        protocol_out.flush()
+
+    pool.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from types import SimpleNamespace
+from typing import Optional
+
+import MetaTrader5 as mt5
+
+logger = logging.getLogger('TickCache')
+
+class TickCache:
+    """Latest bid/ask per symbol for one terminal, shared by every consumer.
+
+    get() serves the cached tick when it is younger than the caller's max age
+    and only goes to the terminal otherwise, so components asking for the same
+    symbol within milliseconds share one symbol_info_tick call. While run() is
+    active, every symbol requested in the last idle_seconds is refreshed each
+    poll interval, keeping reads for active symbols IPC-free.
+    """
+
+    def __init__(self, poll_ms: float = None, max_age_ms: float = None, idle_seconds: float = 60.0):
+        self.poll_ms = poll_ms if poll_ms is not None else float(os.getenv('MT5_TICK_POLL_MS', '100'))
+        self.max_age_ms = max_age_ms if max_age_ms is not None else float(os.getenv('MT5_TICK_MAX_AGE_MS', '250'))
+        self.idle_seconds = idle_seconds
+        self.lock = threading.Lock()
+        self.ticks = {}      # symbol -> SimpleNamespace(bid, ask, time_msc, fetched_at)
+        self.last_used = {}  # symbol -> monotonic time of last get()
+        self.running = False
+
+    def _fetch(self, symbol: str) -> Optional[SimpleNamespace]:
+        tick = mt5.symbol_info_tick(symbol)
+        if tick is None:
+            return None
+        entry = SimpleNamespace(
+            bid=tick.bid,
+            ask=tick.ask,
+            time_msc=getattr(tick, 'time_msc', tick.time * 1000),
+            fetched_at=time.monotonic()
+        )
+        with self.lock:
+            self.ticks[symbol] = entry
+        return entry
+
+    def get(self, symbol: str, max_age_ms: float = None) -> Optional[SimpleNamespace]:
+        """Latest tick for symbol no older than max_age_ms, with its age in age_ms."""
+        max_age_ms = self.max_age_ms if max_age_ms is None else max_age_ms
+        now = time.monotonic()
+        with self.lock:
+            self.last_used[symbol] = now
+            entry = self.ticks.get(symbol)
+
+        if entry is None or (now - entry.fetched_at) * 1000 > max_age_ms:
+            entry = self._fetch(symbol)
+            if entry is None:
+                return None
+
+        return SimpleNamespace(
+            bid=entry.bid,
+            ask=entry.ask,
+            time_msc=entry.time_msc,
+            age_ms=(time.monotonic() - entry.fetched_at) * 1000
+        )
+
+    def active_symbols(self) -> list:
+        """Symbols someone asked for within idle_seconds; idle ones are dropped."""
+        cutoff = time.monotonic() - self.idle_seconds
+        with self.lock:
+            for symbol in [s for s, used in self.last_used.items() if used < cutoff]:
+                del self.last_used[symbol]
+                self.ticks.pop(symbol, None)
+            return list(self.last_used)
+
+    def refresh(self) -> int:
+        """Fetch every active symbol once; returns how many ticks were updated."""
+        updated = 0
+        for symbol in self.active_symbols():
+            if self._fetch(symbol):
+                updated += 1
+        return updated
+
+    async def run(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Poll active symbols until stop() is called."""
+        self.running = True
+        while self.running:
+            try:
+                await loop.run_in_executor(None, self.refresh)
+            except Exception as e:
+                logger.error(f"Error refreshing ticks: {e}")
+            await asyncio.sleep(self.poll_ms / 1000)
+
+    def stop(self) -> None:
+        self.running = False
+
+    def clear(self) -> None:
+        """Forget all ticks (e.g. after attaching to a different terminal)."""
+        with self.lock:
+            self.ticks.clear()
+            self.last_used.clear()
@@ -0,0 +1,396 @@
+# utils/async_database_handler.py
+
+import asyncio
+import logging
+import os
+import traceback
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import DateTime, Numeric, String, or_, select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.models.database import Trade
+from src.utils.database_handler import DatabaseHandler
+
+logger = logging.getLogger('AsyncDatabaseHandler')
+
+class AsyncDatabaseHandler(DatabaseHandler):
+    """DatabaseHandler whose async_* methods run natively on asyncpg.
+
+    Sync methods (used by the group worker scripts) are inherited and keep
+    using the psycopg2 engine; the async ones no longer go through the
+    default thread pool shared with MT5 calls.
+    """
+
+    def __init__(self):
+        super().__init__()
+        try:
+            async_url = (
+                f"postgresql+asyncpg://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@"
+                f"{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
+            )
+
+            self.async_engine = create_async_engine(
+                async_url,
+                pool_size=20,
+                max_overflow=10,
+                pool_timeout=30,
+                pool_recycle=1800,
+                pool_pre_ping=True,
+                connect_args={
+                    "timeout": 10,
+                    "server_settings": {"application_name": "TradingView Copier"}
+                }
+            )
+            self.AsyncSessionLocal = async_sessionmaker(
+                self.async_engine,
+                autoflush=False,
+                expire_on_commit=False
+            )
+            self.async_flush_lock = asyncio.Lock()
+        except Exception as e:
+            logger.error(f"Error initializing AsyncDatabaseHandler: {e}")
+            logger.error(traceback.format_exc())
+            raise
+
+    @staticmethod
+    def _coerce_values(values: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert values to the Python types asyncpg expects for each column.
+
+        psycopg2 lets Postgres cast ISO strings and numeric strings; asyncpg
+        requires datetime / Decimal / str objects. Naive datetimes come from
+        datetime.utcnow(), so they are tagged UTC rather than local time.
+        """
+        columns = Trade.__table__.c
+        coerced = {}
+        for key, value in values.items():
+            column = columns.get(key)
+            if column is not None and value is not None:
+                if isinstance(column.type, DateTime):
+                    if isinstance(value, str):
+                        value = datetime.fromisoformat(value)
+                    if value.tzinfo is None:
+                        value = value.replace(tzinfo=timezone.utc)
+                elif isinstance(column.type, Numeric) and isinstance(value, (str, int, float)):
+                    value = Decimal(str(value))
+                elif isinstance(column.type, String) and not isinstance(value, str):
+                    value = str(value)
+            coerced[key] = value
+        return coerced
+
+    async def async_save_trade(self, trade_data: Dict[str, Any]) -> None:
+        """Save trade to database asynchronously."""
+        async with self.AsyncSessionLocal() as session:
+            try:
+                logger.info(f"Async saving trade {trade_data.get('trade_id')}")
+                trade = Trade(**self._coerce_values({
+                    'trade_id': trade_data['trade_id'],
+                    'order_id': trade_data['order_id'],
+                    'tp_order_id': trade_data.get('tp_order_id'),
+                    'sl_order_id': trade_data.get('sl_order_id'),
+                    'instrument': trade_data['instrument'],
+                    'side': trade_data['side'],
+                    'quantity': trade_data['quantity'],
+                    'type': trade_data['type'],
+                    'ask_price': trade_data['ask_price'],
+                    'bid_price': trade_data['bid_price'],
+                    'take_profit': trade_data.get('take_profit'),
+                    'stop_loss': trade_data.get('stop_loss'),
+                    'status': trade_data['status'],
+                    'tv_request': trade_data['tv_request'],
+                    'tv_response': trade_data['tv_response'],
+                    'created_at': trade_data['created_at']
+                }))
+                session.add(trade)
+                await session.commit()
+                logger.info(f"Trade {trade_data['trade_id']} saved successfully")
+            except Exception as e:
+                await session.rollback()
+                logger.error(f"Error in async save trade: {e}")
+                logger.error(traceback.format_exc())
+                raise
+
+    async def _async_write_status(self, group: Dict[str, Dict[str, Any]]) -> None:
+        async with self.AsyncSessionLocal() as session:
+            try:
+                coerced = {trade_id: self._coerce_values(values) for trade_id, values in group.items()}
+                for stmt in self._build_status_batches(coerced):
+                    await session.execute(stmt)
+                await session.commit()
+            except Exception:
+                await session.rollback()
+                raise
+
+    async def async_flush_status(self) -> int:
+        """Write journaled status updates over asyncpg.
+
+        Same contract as flush_status: per column-set commits, row-by-row
+        retry of a failed batch, and errors logged instead of raised.
+        """
+        if not self.status_journal:
+            return 0
+        async with self.async_flush_lock:
+            entries = self._drain_journal()
+            if not entries:
+                return 0
+            flushed = 0
+            groups = self._group_status_entries(entries)
+            for index, group in enumerate(groups):
+                try:
+                    await self._async_write_status(group)
+                    flushed += self._status_written(group)
+                    continue
+                except Exception as e:
+                    if self._is_transient(e):
+                        self._status_interrupted(groups[index:], e)
+                        return flushed
+                    logger.warning(f"Status batch of {len(group)} trades failed, retrying row by row: {e}")
+
+                rows = list(group.items())
+                for position, (trade_id, values) in enumerate(rows):
+                    try:
+                        await self._async_write_status({trade_id: values})
+                        flushed += self._status_written({trade_id: values})
+                    except Exception as e:
+                        if self._is_transient(e):
+                            self._status_interrupted([dict(rows[position:]), *groups[index + 1:]], e)
+                            return flushed
+                        self._status_row_failed(trade_id, values, e)
+            return flushed
+
+    async def async_update_trade_status(self, trade_id: str, status: str, update_data: Dict[str, Any]) -> None:
+        """Update trade status asynchronously (journaled when DB_WRITE_BEHIND=true)."""
+        if self.write_behind:
+            if self._journal_status(trade_id, status, update_data) >= self.status_flush_rows:
+                await self.async_flush_status()
+            else:
+                self._ensure_journal_flusher()
+            return
+
+        async with self.AsyncSessionLocal() as session:
+            try:
+                data_to_update = self._coerce_values({
+                    'status': status,
+                    'updated_at': datetime.utcnow(),
+                    **update_data
+                })
+
+                stmt = (
+                    update(Trade)
+                    .where(Trade.trade_id == trade_id)
+                    .values(data_to_update)
+                    .execution_options(synchronize_session=False)
+                )
+
+                result = await session.execute(stmt)
+                if result.rowcount == 0:
+                    raise Exception(f"Trade not found: {trade_id}")
+
+                await session.commit()
+            except Exception as e:
+                await session.rollback()
+                logger.error(f"Error in async update trade: {e}")
+                logger.error(traceback.format_exc())
+                raise
+
+    async def async_get_trade(self, trade_id: str) -> Optional[Dict[str, Any]]:
+        """Get trade by ID asynchronously."""
+        await self.async_flush_status()
+        async with self.AsyncSessionLocal() as session:
+            try:
+                logger.info(f"Async fetching trade {trade_id}")
+                trade = (await session.execute(
+                    select(Trade).where(Trade.trade_id == trade_id).limit(1)
+                )).scalars().first()
+
+                if trade:
+                    return {
+                        'trade_id': trade.trade_id,
+                        'order_id': trade.order_id,
+                        'position_id': trade.position_id,
+                        'instrument': trade.instrument,
+                        'side': trade.side,
+                        'quantity': str(trade.quantity),
+                        'type': trade.type,
+                        'take_profit': float(trade.take_profit) if trade.take_profit is not None else None,
+                        'stop_loss': float(trade.stop_loss) if trade.stop_loss is not None else None,
+                        'status': trade.status
+                    }
+                return None
+            except Exception as e:
+                logger.error(f"Error in async get trade: {e}")
+                logger.error(traceback.format_exc())
+                raise
+
+    async def async_get_trade_by_position(self, position_id: str) -> Optional[Dict[str, Any]]:
+        """Get trade by position ID asynchronously."""
+        await self.async_flush_status()
+        async with self.AsyncSessionLocal() as session:
+            try:
+                trade = (await session.execute(
+                    select(Trade).where(Trade.position_id == position_id).limit(1)
+                )).scalars().first()
+
+                if trade:
+                    return {
+                        'trade_id': trade.trade_id,
+                        'order_id': trade.order_id,
+                        'tp_order_id': trade.tp_order_id,
+                        'sl_order_id': trade.sl_order_id,
+                        'position_id': trade.position_id,
+                        'mt5_ticket': trade.mt5_ticket,
+                        'instrument': trade.instrument,
+                        'side': trade.side,
+                        'execution_price': trade.execution_price,
+                        'quantity': str(trade.quantity),
+                        'status': trade.status,
+                        'type': trade.type,
+                        'take_profit': float(trade.take_profit) if trade.take_profit is not None else None,
+                        'stop_loss': float(trade.stop_loss) if trade.stop_loss is not None else None
+                    }
+                return None
+            except Exception as e:
+                logger.error(f"Error in async get trade by position: {e}")
+                raise
+
+    async def async_get_trade_by_order_id(self, order_id: str) -> Optional[Dict[str, Any]]:
+        """Get the open trade owning an entry, TP or SL order ID asynchronously."""
+        await self.async_flush_status()
+        async with self.AsyncSessionLocal() as session:
+            try:
+                trade = (await session.execute(
+                    select(Trade).where(
+                        or_(
+                            Trade.order_id == order_id,
+                            Trade.tp_order_id == order_id,
+                            Trade.sl_order_id == order_id
+                        ),
+                        Trade.is_closed.is_(False)
+                    ).limit(1)
+                )).scalars().first()
+
+                if trade:
+                    return {
+                        'trade_id': trade.trade_id,
+                        'order_id': trade.order_id,
+                        'tp_order_id': trade.tp_order_id,
+                        'sl_order_id': trade.sl_order_id,
+                        'position_id': trade.position_id,
+                        'mt5_ticket': trade.mt5_ticket,
+                        'instrument': trade.instrument,
+                        'side': trade.side,
+                        'execution_price': trade.execution_price,
+                        'quantity': str(trade.quantity),
+                        'status': trade.status,
+                        'type': trade.type,
+                        'take_profit': float(trade.take_profit) if trade.take_profit is not None else None,
+                        'stop_loss': float(trade.stop_loss) if trade.stop_loss is not None else None
+                    }
+                return None
+            except Exception as e:
+                logger.error(f"Error in async get trade by order ID: {e}")
+                logger.error(traceback.format_exc())
+                raise
+
+    async def async_get_latest_active_trade(self) -> Optional[Dict[str, Any]]:
+        """Get the most recent active trade."""
+        await self.async_flush_status()
+        async with self.AsyncSessionLocal() as session:
+            try:
+                trade = (await session.execute(
+                    select(Trade)
+                    .where(
+                        Trade.position_id.isnot(None),
+                        Trade.is_closed.is_(False),
+                        Trade.mt5_ticket.isnot(None)  # Ensure it's executed in MT5
+                    )
+                    .order_by(Trade.created_at.desc())
+                    .limit(1)
+                )).scalars().first()
+
+                if trade:
+                    return {
+                        'trade_id': trade.trade_id,
+                        'position_id': trade.position_id,
+                        'mt5_ticket': trade.mt5_ticket,
+                        'instrument': trade.instrument,
+                        'side': trade.side,
+                        'quantity': str(trade.quantity),
+                        'status': trade.status,
+                        'type': trade.type,
+                        'take_profit': float(trade.take_profit) if trade.take_profit is not None else None,
+                        'stop_loss': float(trade.stop_loss) if trade.stop_loss is not None else None
+                    }
+                return None
+            except Exception as e:
+                logger.error(f"Error in async get latest active trade: {e}")
+                raise
+
+    async def async_get_trade_by_mt5_ticket(self, mt5_ticket: str) -> Optional[Dict[str, Any]]:
+        """Get trade by MT5 ticket asynchronously."""
+        await self.async_flush_status()
+        async with self.AsyncSessionLocal() as session:
+            try:
+                trade = (await session.execute(
+                    select(Trade).where(Trade.mt5_ticket == str(mt5_ticket)).limit(1)
+                )).scalars().first()
+
+                if trade:
+                    return {
+                        'trade_id': trade.trade_id,
+                        'position_id': trade.position_id,
+                        'mt5_ticket': trade.mt5_ticket,
+                        'instrument': trade.instrument,
+                        'side': trade.side,
+                        'execution_price': trade.execution_price,
+                        'quantity': str(trade.quantity),
+                        'status': trade.status,
+                        'is_closed': trade.is_closed,
+                        'trailing_stop_pips': float(trade.trailing_stop_pips) if trade.trailing_stop_pips is not None else None,
+                        'take_profit': float(trade.take_profit) if trade.take_profit is not None else None,
+                        'stop_loss': float(trade.stop_loss) if trade.stop_loss is not None else None,
+                    }
+                return None
+            except Exception as e:
+                logger.error(f"Error in async get trade by MT5 ticket: {e}")
+                logger.error(traceback.format_exc())
+                raise
+
+    async def async_get_trailing_trades(self) -> List[Dict[str, Any]]:
+        """Get every open, executed trade that has a trailing stop (one query)."""
+        await self.async_flush_status()
+        async with self.AsyncSessionLocal() as session:
+            try:
+                rows = (await session.execute(
+                    select(Trade.mt5_ticket, Trade.trailing_stop_pips).where(
+                        Trade.is_closed.is_(False),
+                        Trade.mt5_ticket.isnot(None),
+                        Trade.trailing_stop_pips > 0
+                    )
+                )).all()
+                return [
+                    {'mt5_ticket': row.mt5_ticket, 'trailing_stop_pips': float(row.trailing_stop_pips)}
+                    for row in rows
+                ]
+            except Exception as e:
+                logger.error(f"Error in async get trailing trades: {e}")
+                logger.error(traceback.format_exc())
+                raise
+
+    async def async_cleanup(self) -> None:
+        """Flush the journal, then dispose the asyncpg pool; the sync engine is left to cleanup()."""
+        await super().async_cleanup()
+        try:
+            logger.info("Cleaning up async database connections")
+            await self.async_engine.dispose()
+        except Exception as e:
+            logger.error(f"Error during async cleanup: {e}")
+            logger.error(traceback.format_exc())
+
+def create_database_handler() -> DatabaseHandler:
+    """Build the handler selected by DB_ASYNC_DRIVER ('asyncpg' or default executor-based)."""
+    if os.getenv('DB_ASYNC_DRIVER', '').lower() == 'asyncpg':
+        return AsyncDatabaseHandler()
+    return DatabaseHandler()
@@ -1,22 +1,31 @@
 # utils/database_handler.py
 
 import asyncio
+import json
 import logging
 import os
+import select
+import threading
 import traceback
 from contextlib import contextmanager
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Set
 
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, text, update
+from sqlalchemy import bindparam, create_engine, func, or_, text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import DisconnectionError, InterfaceError, OperationalError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy.pool import QueuePool
 
-from src.models.database import Trade
+from src.models.database import Trade, TradeFill
 
 logger = logging.getLogger('DatabaseHandler')
 
+# NOTIFY channel fed by the trades_notify_pending trigger
+TRADE_NOTIFY_CHANNEL = 'trades_pending'
+
 class DatabaseHandler:
     def __init__(self):
         try:
@@ -52,6 +61,20 @@ class DatabaseHandler:
             # Initialize thread pool for async operations
             self.loop = asyncio.get_event_loop()
             
+            # Write-behind status journal: trade_id -> pending column values
+            self.write_behind = os.getenv('DB_WRITE_BEHIND', 'false').lower() == 'true'
+            self.status_flush_ms = int(os.getenv('DB_STATUS_FLUSH_MS', '50'))
+            self.status_flush_rows = int(os.getenv('DB_STATUS_FLUSH_ROWS', '100'))
+            self.status_max_attempts = int(os.getenv('DB_STATUS_MAX_ATTEMPTS', '3'))
+            self.status_journal = {}
+            self.status_failures = {}
+            self.journal_lock = threading.Lock()
+            self.flush_lock = threading.Lock()
+            self.journal_task = None
+            
+            # Dedicated LISTEN connection (outside the pool), opened on demand
+            self.listen_conn = None
+            
             # Test connection
             self._test_connection()
             
@@ -98,6 +121,8 @@ class DatabaseHandler:
                 trade = Trade(
                     trade_id=trade_data['trade_id'],
                     order_id=trade_data['order_id'],
+                    tp_order_id=trade_data.get('tp_order_id'),
+                    sl_order_id=trade_data.get('sl_order_id'),
                     instrument=trade_data['instrument'],
                     side=trade_data['side'],
                     quantity=trade_data['quantity'],
@@ -195,8 +220,218 @@ class DatabaseHandler:
             logger.error(traceback.format_exc())
             raise
     
+    def _journal_status(self, trade_id: str, status: str, update_data: Dict[str, Any]) -> int:
+        """Merge an update into the journal (last writer wins per column); return journal size."""
+        values = {
+            'status': status,
+            'updated_at': datetime.utcnow(),
+            **update_data
+        }
+        unknown = [name for name in values if name not in Trade.__table__.c]
+        if unknown:
+            raise ValueError(f"Unknown trade columns: {unknown}")
+        
+        with self.journal_lock:
+            self.status_journal.setdefault(trade_id, {}).update(values)
+            return len(self.status_journal)
+
+    def _drain_journal(self) -> Dict[str, Dict[str, Any]]:
+        """Take all pending updates out of the journal."""
+        with self.journal_lock:
+            entries, self.status_journal = self.status_journal, {}
+            return entries
+
+    def _restore_journal(self, entries: Dict[str, Dict[str, Any]]) -> None:
+        """Put back updates from a failed flush without overwriting newer values."""
+        with self.journal_lock:
+            for trade_id, values in entries.items():
+                self.status_journal[trade_id] = {**values, **self.status_journal.get(trade_id, {})}
+
+    def _build_status_batches(self, entries: Dict[str, Dict[str, Any]]) -> list:
+        """Build one UPDATE ... FROM (VALUES ...) per distinct column set."""
+        columns = Trade.__table__.c
+        groups = {}
+        for trade_id, values in entries.items():
+            groups.setdefault(tuple(sorted(values)), []).append((trade_id, values))
+        
+        statements = []
+        for names, rows in groups.items():
+            sql_types = {
+                name: columns[name].type.compile(dialect=self.engine.dialect)
+                for name in ('trade_id', *names)
+            }
+            params = []
+            value_rows = []
+            for i, (trade_id, values) in enumerate(rows):
+                placeholders = [f"CAST(:trade_id_{i} AS {sql_types['trade_id']})"]
+                params.append(bindparam(f"trade_id_{i}", trade_id, type_=columns['trade_id'].type))
+                for name in names:
+                    placeholders.append(f"CAST(:{name}_{i} AS {sql_types[name]})")
+                    params.append(bindparam(f"{name}_{i}", values[name], type_=columns[name].type))
+                value_rows.append(f"({', '.join(placeholders)})")
+            
+            sql = (
+                f"UPDATE {Trade.__tablename__} AS t "
+                f"SET {', '.join(f'{name} = v.{name}' for name in names)} "
+                f"FROM (VALUES {', '.join(value_rows)}) AS v(trade_id, {', '.join(names)}) "
+                f"WHERE t.trade_id = v.trade_id"
+            )
+            statements.append(text(sql).bindparams(*params))
+        return statements
+
+    @staticmethod
+    def _group_status_entries(entries: Dict[str, Dict[str, Any]]) -> List[Dict[str, Dict[str, Any]]]:
+        """Split journal entries by column set, one group per UPDATE statement."""
+        groups = {}
+        for trade_id, values in entries.items():
+            groups.setdefault(tuple(sorted(values)), {})[trade_id] = values
+        return list(groups.values())
+
+    @staticmethod
+    def _is_transient(error: Exception) -> bool:
+        """True for connection-level failures, where the rows themselves are fine."""
+        return isinstance(error, (OperationalError, InterfaceError, DisconnectionError,
+                                  PoolTimeoutError, OSError, asyncio.TimeoutError))
+
+    def _status_written(self, group: Dict[str, Dict[str, Any]]) -> int:
+        for trade_id in group:
+            self.status_failures.pop(trade_id, None)
+        return len(group)
+
+    def _status_interrupted(self, groups: List[Dict[str, Dict[str, Any]]], error: Exception) -> None:
+        """Re-journal everything not yet written after a connection failure."""
+        remaining = {trade_id: values for group in groups for trade_id, values in group.items()}
+        self._restore_journal(remaining)
+        logger.error(f"Status journal flush interrupted, {len(remaining)} trades re-journaled: {error}")
+
+    def _status_row_failed(self, trade_id: str, values: Dict[str, Any], error: Exception) -> None:
+        """Re-journal a row that failed on its own, or dead-letter it after status_max_attempts."""
+        attempts = self.status_failures.get(trade_id, 0) + 1
+        if attempts >= self.status_max_attempts:
+            self.status_failures.pop(trade_id, None)
+            logger.error(
+                f"Dead-lettering status update for trade {trade_id} after {attempts} failed flushes: "
+                f"{error} (values: {values})"
+            )
+            return
+        self.status_failures[trade_id] = attempts
+        self._restore_journal({trade_id: values})
+        logger.warning(f"Status update for trade {trade_id} failed ({attempts}/{self.status_max_attempts}): {error}")
+
+    def _write_status(self, group: Dict[str, Dict[str, Any]]) -> None:
+        with self.get_db() as db:
+            for stmt in self._build_status_batches(group):
+                db.execute(stmt)
+            db.commit()
+
+    def flush_status(self) -> int:
+        """Write all journaled status updates now; returns number of trades flushed.
+        
+        Called on shutdown and usable by anything that must read fresh state.
+        Each column set commits on its own and a failing batch is retried row
+        by row, so one bad update cannot hold back the rest. Errors are logged,
+        never raised, so callers that flush before reading still read.
+        """
+        with self.flush_lock:
+            entries = self._drain_journal()
+            if not entries:
+                return 0
+            flushed = 0
+            groups = self._group_status_entries(entries)
+            for index, group in enumerate(groups):
+                try:
+                    self._write_status(group)
+                    flushed += self._status_written(group)
+                    continue
+                except Exception as e:
+                    if self._is_transient(e):
+                        self._status_interrupted(groups[index:], e)
+                        return flushed
+                    logger.warning(f"Status batch of {len(group)} trades failed, retrying row by row: {e}")
+                
+                rows = list(group.items())
+                for position, (trade_id, values) in enumerate(rows):
+                    try:
+                        self._write_status({trade_id: values})
+                        flushed += self._status_written({trade_id: values})
+                    except Exception as e:
+                        if self._is_transient(e):
+                            self._status_interrupted([dict(rows[position:]), *groups[index + 1:]], e)
+                            return flushed
+                        self._status_row_failed(trade_id, values, e)
+            return flushed
+
+    async def async_flush_status(self) -> int:
+        """Flush the status journal without blocking the loop."""
+        if not self.status_journal:
+            return 0
+        return await self.loop.run_in_executor(None, self.flush_status)
+
+    async def _run_journal_flusher(self) -> None:
+        """Flush the journal every status_flush_ms."""
+        while True:
+            await asyncio.sleep(self.status_flush_ms / 1000)
+            try:
+                await self.async_flush_status()
+            except Exception as e:
+                logger.error(f"Status journal flush failed, will retry: {e}")
+
+    def _ensure_journal_flusher(self) -> None:
+        if self.journal_task is None or self.journal_task.done():
+            self.journal_task = asyncio.get_running_loop().create_task(self._run_journal_flusher())
+
+    def listen_for_trades(self) -> None:
+        """Open a dedicated autocommit connection and LISTEN for pending trades."""
+        self.stop_listening()
+        cargs, cparams = self.engine.dialect.create_connect_args(self.engine.url)
+        conn = self.engine.dialect.connect(*cargs, **cparams)
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute(f"LISTEN {TRADE_NOTIFY_CHANNEL}")
+        self.listen_conn = conn
+        logger.info(f"Listening on {TRADE_NOTIFY_CHANNEL}")
+
+    def wait_for_trade_notifications(self, timeout: float) -> List[Dict[str, Any]]:
+        """Block up to timeout seconds for NOTIFYs; returns their payloads ([] on timeout)."""
+        if self.listen_conn is None:
+            self.listen_for_trades()
+        try:
+            if not self.listen_conn.notifies:
+                ready, _, _ = select.select([self.listen_conn], [], [], timeout)
+                if not ready:
+                    return []
+            self.listen_conn.poll()
+            payloads = []
+            while self.listen_conn.notifies:
+                notify = self.listen_conn.notifies.pop(0)
+                try:
+                    payloads.append(json.loads(notify.payload))
+                except ValueError:
+                    payloads.append({'trade_id': None, 'status': None})
+            return payloads
+        except Exception as e:
+            logger.error(f"Error waiting for trade notifications: {e}")
+            self.stop_listening()
+            raise
+
+    def stop_listening(self) -> None:
+        """Close the LISTEN connection if open."""
+        if self.listen_conn is not None:
+            try:
+                self.listen_conn.close()
+            except Exception as e:
+                logger.error(f"Error closing listen connection: {e}")
+            self.listen_conn = None
+
     def cleanup(self):
         """Cleanup database connections."""
+        self.stop_listening()
+        try:
+            if self.status_journal:
+                logger.info(f"Flushing {len(self.status_journal)} journaled trade updates")
+                self.flush_status()
+        except Exception as e:
+            logger.error(f"Error flushing status journal on cleanup: {e}")
         try:
             logger.info("Cleaning up database connections")
             self.engine.dispose()
@@ -205,6 +440,23 @@ class DatabaseHandler:
             logger.error(f"Error during cleanup: {e}")
             logger.error(traceback.format_exc())
 
+    async def _stop_journal_flusher(self) -> None:
+        if self.journal_task:
+            self.journal_task.cancel()
+            try:
+                await self.journal_task
+            except asyncio.CancelledError:
+                pass
+            self.journal_task = None
+
+    async def async_cleanup(self):
+        """Stop the journal flusher and write out pending updates."""
+        await self._stop_journal_flusher()
+        try:
+            await self.async_flush_status()
+        except Exception as e:
+            logger.error(f"Error flushing status journal on shutdown: {e}")
+
     async def async_save_trade(self, trade_data: Dict[str, Any]) -> None:
         """Save trade to database asynchronously."""
         def _save_trade():
@@ -214,6 +466,8 @@ class DatabaseHandler:
                     trade = Trade(
                         trade_id=trade_data['trade_id'],
                         order_id=trade_data['order_id'],
+                        tp_order_id=trade_data.get('tp_order_id'),
+                        sl_order_id=trade_data.get('sl_order_id'),
                         instrument=trade_data['instrument'],
                         side=trade_data['side'],
                         quantity=trade_data['quantity'],
@@ -238,7 +492,18 @@ class DatabaseHandler:
         await self.loop.run_in_executor(None, _save_trade)
 
     async def async_update_trade_status(self, trade_id: str, status: str, update_data: Dict[str, Any]) -> None:
-        """Update trade status asynchronously."""
+        """Update trade status asynchronously.
+        
+        With DB_WRITE_BEHIND=true the update is journaled and written in a
+        batch later; a missing trade is then silently skipped instead of raising.
+        """
+        if self.write_behind:
+            if self._journal_status(trade_id, status, update_data) >= self.status_flush_rows:
+                await self.async_flush_status()
+            else:
+                self._ensure_journal_flusher()
+            return
+        
         def _update_trade():
             with self.get_db() as db:
                 try:
@@ -300,6 +565,7 @@ class DatabaseHandler:
                     logger.error(traceback.format_exc())
                     raise
 
+        await self.async_flush_status()
         return await self.loop.run_in_executor(None, _get_trade)
 
     async def async_get_trade_by_position(self, position_id: str) -> Optional[Dict[str, Any]]:
@@ -316,6 +582,9 @@ class DatabaseHandler:
                     if trade:
                         return {
                             'trade_id': trade.trade_id,
+                            'order_id': trade.order_id,
+                            'tp_order_id': trade.tp_order_id,
+                            'sl_order_id': trade.sl_order_id,
                             'position_id': trade.position_id,
                             'mt5_ticket': trade.mt5_ticket,
                             'instrument': trade.instrument,
@@ -332,6 +601,50 @@ class DatabaseHandler:
                     logger.error(f"Error in async get trade by position: {e}")
                     raise
 
+        await self.async_flush_status()
+        return await self.loop.run_in_executor(None, _get_trade)
+
+    async def async_get_trade_by_order_id(self, order_id: str) -> Optional[Dict[str, Any]]:
+        """Get the open trade owning an entry, TP or SL order ID asynchronously."""
+        def _get_trade():
+            with self.get_db() as db:
+                try:
+                    trade = (
+                        db.query(Trade)
+                        .filter(
+                            or_(
+                                Trade.order_id == order_id,
+                                Trade.tp_order_id == order_id,
+                                Trade.sl_order_id == order_id
+                            ),
+                            Trade.is_closed.is_(False)
+                        )
+                        .first()
+                    )
+                    
+                    if trade:
+                        return {
+                            'trade_id': trade.trade_id,
+                            'order_id': trade.order_id,
+                            'tp_order_id': trade.tp_order_id,
+                            'sl_order_id': trade.sl_order_id,
+                            'position_id': trade.position_id,
+                            'mt5_ticket': trade.mt5_ticket,
+                            'instrument': trade.instrument,
+                            'side': trade.side,
+                            'execution_price': trade.execution_price,
+                            'quantity': str(trade.quantity),
+                            'status': trade.status,
+                            'type': trade.type,
+                            'take_profit': float(trade.take_profit) if trade.take_profit is not None else None,
+                            'stop_loss': float(trade.stop_loss) if trade.stop_loss is not None else None
+                        }
+                    return None
+                except Exception as e:
+                    logger.error(f"Error in async get trade by order ID: {e}")
+                    raise
+
+        await self.async_flush_status()
         return await self.loop.run_in_executor(None, _get_trade)
 
     async def async_get_latest_active_trade(self) -> Optional[Dict[str, Any]]:
@@ -368,6 +681,7 @@ class DatabaseHandler:
                     logger.error(f"Error in async get latest active trade: {e}")
                     raise
 
+        await self.async_flush_status()
         return await self.loop.run_in_executor(None, _get_trade)
 
     async def async_get_trade_by_mt5_ticket(self, mt5_ticket: str) -> Optional[Dict[str, Any]]:
@@ -402,8 +716,70 @@ class DatabaseHandler:
                     logger.error(traceback.format_exc())
                     raise
 
+        await self.async_flush_status()
         return await self.loop.run_in_executor(None, _get_trade)
 
+    async def async_get_trailing_trades(self) -> List[Dict[str, Any]]:
+        """Get every open, executed trade that has a trailing stop (one query)."""
+        def _get_trades():
+            with self.get_db() as db:
+                try:
+                    trades = (
+                        db.query(Trade.mt5_ticket, Trade.trailing_stop_pips)
+                        .filter(
+                            Trade.is_closed.is_(False),
+                            Trade.mt5_ticket.isnot(None),
+                            Trade.trailing_stop_pips > 0
+                        )
+                        .all()
+                    )
+                    return [
+                        {'mt5_ticket': trade.mt5_ticket, 'trailing_stop_pips': float(trade.trailing_stop_pips)}
+                        for trade in trades
+                    ]
+                except Exception as e:
+                    logger.error(f"Error in async get trailing trades: {e}")
+                    raise
+
+        await self.async_flush_status()
+        return await self.loop.run_in_executor(None, _get_trades)
+
+    def get_open_positions(self) -> List[Dict[str, Any]]:
+        """Get every open trade with a TradingView position (rebuilds the proxy's position index)."""
+        self.flush_status()
+        with self.get_db() as db:
+            try:
+                trades = (
+                    db.query(Trade)
+                    .filter(
+                        Trade.position_id.isnot(None),
+                        Trade.is_closed.is_(False)
+                    )
+                    .all()
+                )
+                return [
+                    {
+                        'trade_id': trade.trade_id,
+                        'order_id': trade.order_id,
+                        'tp_order_id': trade.tp_order_id,
+                        'sl_order_id': trade.sl_order_id,
+                        'position_id': trade.position_id,
+                        'mt5_ticket': trade.mt5_ticket,
+                        'instrument': trade.instrument,
+                        'side': trade.side,
+                        'execution_price': trade.execution_price,
+                        'quantity': str(trade.quantity),
+                        'type': trade.type,
+                        'take_profit': float(trade.take_profit) if trade.take_profit is not None else None,
+                        'stop_loss': float(trade.stop_loss) if trade.stop_loss is not None else None,
+                        'trailing_stop_pips': float(trade.trailing_stop_pips) if trade.trailing_stop_pips is not None else None
+                    }
+                    for trade in trades
+                ]
+            except Exception as e:
+                logger.error(f"Error getting open positions: {e}")
+                raise
+
     def get_pending_trades(self):
         session = self.SessionLocal()
         trades = session.query(Trade).filter_by(status="pending").all()
@@ -428,17 +804,257 @@ class DatabaseHandler:
             session.commit()
         session.close()
         
+    def _claim(self, status: str, worker_id: str, limit: int, lease_seconds: int) -> List[Dict[str, Any]]:
+        """Atomically lease up to limit rows in status; rows leased by others are skipped."""
+        with self.get_db() as db:
+            rows = db.execute(text("""
+                WITH picked AS (
+                    SELECT id FROM trades
+                    WHERE status = :status
+                      AND (lease_expires_at IS NULL OR lease_expires_at < now())
+                    ORDER BY created_at
+                    LIMIT :limit
+                    FOR UPDATE SKIP LOCKED
+                )
+                UPDATE trades AS t
+                SET claimed_by = :worker_id,
+                    lease_expires_at = now() + make_interval(secs => :lease_seconds)
+                FROM picked
+                WHERE t.id = picked.id
+                RETURNING t.trade_id, t.account_login, t.instrument, t.side,
+                          t.quantity, t.type, t.mt5_ticket
+            """), {
+                'status': status,
+                'worker_id': worker_id,
+                'limit': limit,
+                'lease_seconds': lease_seconds
+            }).mappings().all()
+            db.commit()
+            return [dict(row) for row in rows]
+
+    def claim_pending_trades(self, worker_id: str, limit: int = 10, lease_seconds: int = 60) -> List[Dict[str, Any]]:
+        """Claim pending trades for this worker; expired leases are claimable again."""
+        return self._claim('pending', worker_id, limit, lease_seconds)
+
+    def claim_pending_closes(self, worker_id: str, limit: int = 10, lease_seconds: int = 60) -> List[Dict[str, Any]]:
+        """Claim open fills of close_pending trades, one row per follower account."""
+        with self.get_db() as db:
+            rows = db.execute(text("""
+                WITH picked AS (
+                    SELECT f.id FROM trade_fills AS f
+                    JOIN trades AS t ON t.trade_id = f.trade_id
+                    WHERE t.status = 'close_pending'
+                      AND f.status = 'open'
+                      AND f.mt5_ticket IS NOT NULL
+                      AND (f.lease_expires_at IS NULL OR f.lease_expires_at < now())
+                    ORDER BY f.id
+                    LIMIT :limit
+                    FOR UPDATE OF f SKIP LOCKED
+                )
+                UPDATE trade_fills AS f
+                SET claimed_by = :worker_id,
+                    lease_expires_at = now() + make_interval(secs => :lease_seconds)
+                FROM picked, trades AS t
+                WHERE f.id = picked.id AND t.trade_id = f.trade_id
+                RETURNING f.trade_id, f.account_login, t.instrument, t.side,
+                          COALESCE(f.volume, t.quantity) AS quantity, f.mt5_ticket
+            """), {
+                'worker_id': worker_id,
+                'limit': limit,
+                'lease_seconds': lease_seconds
+            }).mappings().all()
+            db.commit()
+            return [dict(row) for row in rows]
+
+    def settle_empty_closes(self, grace_seconds: int = 60) -> int:
+        """Finish close_pending trades that have no open fill left to close.
+
+        They are never claimed by claim_pending_closes, so nothing else would
+        complete them: closed if any follower was filled, failed if none was.
+        The grace period leaves room for a fill that is still being saved.
+        """
+        with self.get_db() as db:
+            result = db.execute(text("""
+                UPDATE trades AS t
+                SET status = CASE WHEN filled.has_fill THEN 'closed' ELSE 'failed' END,
+                    is_closed = filled.has_fill,
+                    closed_at = CASE WHEN filled.has_fill THEN :now ELSE t.closed_at END,
+                    error_message = CASE WHEN filled.has_fill THEN t.error_message
+                                         ELSE 'Close requested before any follower was filled' END,
+                    claimed_by = NULL,
+                    lease_expires_at = NULL,
+                    updated_at = :now
+                FROM (
+                    SELECT t2.trade_id, EXISTS (
+                        SELECT 1 FROM trade_fills AS f
+                        WHERE f.trade_id = t2.trade_id AND f.mt5_ticket IS NOT NULL
+                    ) AS has_fill
+                    FROM trades AS t2
+                    WHERE t2.status = 'close_pending'
+                      AND (t2.close_requested_at IS NULL
+                           OR t2.close_requested_at < now() - make_interval(secs => :grace_seconds))
+                      AND NOT EXISTS (
+                          SELECT 1 FROM trade_fills AS f
+                          WHERE f.trade_id = t2.trade_id
+                            AND f.status = 'open'
+                            AND f.mt5_ticket IS NOT NULL
+                      )
+                    FOR UPDATE OF t2 SKIP LOCKED
+                ) AS filled
+                WHERE t.trade_id = filled.trade_id
+            """), {'now': datetime.utcnow(), 'grace_seconds': grace_seconds})
+            db.commit()
+            if result.rowcount:
+                logger.info(f"Settled {result.rowcount} close_pending trades with no open fills")
+            return result.rowcount
+
+    def renew_claims(self, trade_ids: List[str], worker_id: str, lease_seconds: int = 60) -> int:
+        """Extend this worker's lease on claimed trades; returns how many are still held."""
+        if not trade_ids:
+            return 0
+        with self.get_db() as db:
+            result = db.execute(text("""
+                UPDATE trades
+                SET lease_expires_at = now() + make_interval(secs => :lease_seconds)
+                WHERE trade_id = ANY(:trade_ids) AND claimed_by = :worker_id
+            """), {
+                'trade_ids': list(trade_ids),
+                'worker_id': worker_id,
+                'lease_seconds': lease_seconds
+            })
+            db.commit()
+            return result.rowcount
+
+    def get_filled_accounts(self, trade_ids: List[str]) -> Dict[str, Set[str]]:
+        """Accounts that already hold a ticket for each trade (skipped when a trade is re-claimed)."""
+        filled = {trade_id: set() for trade_id in trade_ids}
+        if not trade_ids:
+            return filled
+        with self.get_db() as db:
+            rows = db.query(TradeFill.trade_id, TradeFill.account_login).filter(
+                TradeFill.trade_id.in_(list(trade_ids)),
+                TradeFill.mt5_ticket.isnot(None)
+            ).all()
+        for trade_id, account_login in rows:
+            filled[trade_id].add(str(account_login))
+        return filled
+
+    def _complete_claim(self, trade_id: str, worker_id: str, status: str, values: Dict[str, Any]) -> bool:
+        """Finish a claimed row; False if the lease was lost to another worker."""
+        with self.get_db() as db:
+            result = db.execute(
+                update(Trade)
+                .where(
+                    Trade.trade_id == trade_id,
+                    Trade.status == status,
+                    Trade.claimed_by == worker_id
+                )
+                .values(claimed_by=None, lease_expires_at=None, updated_at=datetime.utcnow(), **values)
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            if result.rowcount == 0:
+                logger.warning(f"Lease on {trade_id} no longer held by {worker_id}")
+                return False
+            return True
+
+    def complete_trade(self, trade_id: str, worker_id: str) -> bool:
+        """Mark a claimed pending trade as executed."""
+        return self._complete_claim(trade_id, worker_id, 'pending', {'status': 'executed'})
+
+    def complete_close(self, trade_id: str, account_login: str, worker_id: str) -> bool:
+        """Mark a claimed fill closed; the trade closes with its last open fill."""
+        now = datetime.utcnow()
+        with self.get_db() as db:
+            result = db.execute(
+                update(TradeFill)
+                .where(
+                    TradeFill.trade_id == trade_id,
+                    TradeFill.account_login == str(account_login),
+                    TradeFill.status == 'open',
+                    TradeFill.claimed_by == worker_id
+                )
+                .values(status='closed', closed_at=now, claimed_by=None, lease_expires_at=None)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 0:
+                db.rollback()
+                logger.warning(f"Lease on {trade_id}/{account_login} no longer held by {worker_id}")
+                return False
+
+            open_fills = db.query(func.count(TradeFill.id)).filter(
+                TradeFill.trade_id == trade_id,
+                TradeFill.status == 'open'
+            ).scalar()
+            if open_fills == 0:
+                db.execute(
+                    update(Trade)
+                    .where(Trade.trade_id == trade_id)
+                    .values(status='closed', is_closed=True, closed_at=now, updated_at=now)
+                    .execution_options(synchronize_session=False)
+                )
+            db.commit()
+            return True
+
+    def release_claim(self, trade_id: str, worker_id: str, account_login: Optional[str] = None) -> None:
+        """Give a claimed trade (or one account's fill) back so another worker can retry it now."""
+        model = TradeFill if account_login is not None else Trade
+        conditions = [model.trade_id == trade_id, model.claimed_by == worker_id]
+        if account_login is not None:
+            conditions.append(TradeFill.account_login == str(account_login))
+        with self.get_db() as db:
+            db.execute(
+                update(model)
+                .where(*conditions)
+                .values(claimed_by=None, lease_expires_at=None)
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+
+    def save_trade_fills(self, trade_id: str, fills: List[Dict[str, Any]]) -> None:
+        """Upsert every follower's fill for a trade in one INSERT ... ON CONFLICT."""
+        if not fills:
+            return
+        rows = [{
+            'trade_id': trade_id,
+            'account_login': str(fill['account_login']),
+            'mt5_ticket': str(fill['mt5_ticket']) if fill.get('mt5_ticket') is not None else None,
+            'volume': fill.get('volume'),
+            'fill_price': fill.get('fill_price'),
+            'latency_ms': fill.get('latency_ms'),
+            'status': fill.get('status', 'open'),
+            'error_message': fill.get('error_message'),
+            'created_at': datetime.utcnow()
+        } for fill in fills]
+
+        stmt = pg_insert(TradeFill).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            constraint='uq_trade_fills_trade_account',
+            set_={
+                column: stmt.excluded[column]
+                for column in ('mt5_ticket', 'volume', 'fill_price', 'latency_ms', 'status', 'error_message')
+            }
+        )
+        with self.get_db() as db:
+            db.execute(stmt)
+            db.commit()
+
     def get_pending_closes(self):
         session = self.SessionLocal()
-        trades = session.query(Trade).filter_by(status="close_pending").all()
+        rows = (
+            session.query(TradeFill, Trade)
+            .join(Trade, Trade.trade_id == TradeFill.trade_id)
+            .filter(Trade.status == "close_pending", TradeFill.status == "open")
+            .all()
+        )
         result = []
-        for trade in trades:
+        for fill, trade in rows:
             result.append({
                 "trade_id": trade.trade_id,
-                "account_login": trade.account_login,
+                "account_login": fill.account_login,
                 "instrument": trade.instrument,
-                "mt5_ticket": trade.mt5_ticket,
-                "quantity": trade.quantity,
+                "mt5_ticket": fill.mt5_ticket,
+                "quantity": fill.volume if fill.volume is not None else trade.quantity,
                 "side": trade.side,
             })
         session.close()
@@ -455,29 +1071,16 @@ class DatabaseHandler:
         session.close()
         
     def update_mt5_ticket(self, trade_id, account_login, mt5_ticket):
-        session = self.SessionLocal()
-        trade = session.query(Trade).filter_by(trade_id=trade_id).first()
-        if trade:
-            trade.mt5_ticket = mt5_ticket
-            trade.account_login = str(account_login)
-            session.commit()
-        session.close()
+        """Record one follower's ticket (see save_trade_fills for a whole fan-out)."""
+        self.save_trade_fills(trade_id, [{'account_login': account_login, 'mt5_ticket': mt5_ticket}])
         
     def mark_trade_as_pending_close(self, trade_id):
+        """Flag a trade for closing; its open fills are picked up per account."""
         session = self.SessionLocal()
         trade = session.query(Trade).filter_by(trade_id=trade_id).first()
         if trade:
-            for account in accounts:
-                pending_close = Trade(
-                    trade_id=trade.trade_id,
-                    account_login=str(account['login']),
-                    mt5_ticket=trade.mt5_ticket,
-                    instrument=trade.instrument,
-                    quantity=trade.quantity,
-                    side=trade.side,
-                    status='close_pending'
-                )
-                session.add(pending_close)
+            trade.status = 'close_pending'
+            trade.close_requested_at = datetime.utcnow()
             session.commit()
         else:
             print(f"⚠️ Trade {trade_id} not found")
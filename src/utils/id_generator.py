@@ -0,0 +1,36 @@
+import os
+import threading
+import time
+
+# Crockford base32 alphabet used by ULID
+_ENCODING = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+_RANDOM_BITS = 80
+_RANDOM_MASK = (1 << _RANDOM_BITS) - 1
+
+_lock = threading.Lock()
+_last_ms = 0
+_last_random = 0
+
+def new_ulid() -> str:
+    """Generate a ULID: 48-bit millisecond timestamp + 80 random bits.
+
+    IDs sort by creation time and stay unique under burst load; within the
+    same millisecond the random part is incremented instead of redrawn.
+    """
+    global _last_ms, _last_random
+    with _lock:
+        now_ms = time.time_ns() // 1_000_000
+        if now_ms <= _last_ms:
+            # Same (or earlier, after a clock step) millisecond - keep ordering
+            now_ms = _last_ms
+            _last_random = (_last_random + 1) & _RANDOM_MASK
+        else:
+            _last_ms = now_ms
+            _last_random = int.from_bytes(os.urandom(10), 'big')
+        value = (now_ms << _RANDOM_BITS) | _last_random
+
+    chars = []
+    for _ in range(26):
+        chars.append(_ENCODING[value & 0x1F])
+        value >>= 5
+    return ''.join(reversed(chars))
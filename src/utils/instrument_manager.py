@@ -1,19 +1,30 @@
 import json
 import logging
 import os
+import threading
+import time
 from pathlib import Path
+from types import MappingProxyType
 from typing import Dict
 
 from dotenv import load_dotenv
 
 logger = logging.getLogger('InstrumentManager')
 
+DEFAULT_PIP_SIZE = 0.0001
+
 class InstrumentManager:
     def __init__(self):
         load_dotenv()
         self.config_path = Path(__file__).parent.parent.parent / 'data' / 'instruments.json'
         self.default_suffix = os.getenv('MT5_DEFAULT_SUFFIX', '')
-        self.instruments = self._load_config()
+        self.reload_interval = float(os.getenv('INSTRUMENTS_RELOAD_INTERVAL', '5'))
+        self.reload_lock = threading.Lock()
+        self.config_mtime = None
+        self.next_reload_check = 0.0
+        self.instruments = {}
+        self.pip_sizes = MappingProxyType({})
+        self._reload()
         
     def _load_config(self) -> Dict:
         """Load instrument configuration."""
@@ -45,47 +56,72 @@ class InstrumentManager:
             # print("❌ Error reading configuration file")
             return {}  # Return empty dict if file not found
 
+    def _compile_pip_sizes(self, config: Dict) -> MappingProxyType:
+        """Index pip sizes by normalized symbol, with and without the broker suffix.
+        
+        Custom pairs are compiled last so they override base instruments.
+        """
+        pip_sizes = {}
+        for section in ('instruments', 'custom'):
+            for pair in config.get(section, {}).get('pairs', []):
+                try:
+                    pip_size = float(pair['pip_size'])
+                except (KeyError, TypeError, ValueError):
+                    logger.warning(f"Skipping instrument with bad pip size: {pair}")
+                    continue
+                for name in {pair['name'].strip(), pair['name'].strip().upper()}:
+                    pip_sizes[name] = pip_size
+                    if self.default_suffix:
+                        pip_sizes[name + self.default_suffix] = pip_size
+                        pip_sizes[name + self.default_suffix.upper()] = pip_size
+        return MappingProxyType(pip_sizes)
+
+    def _reload(self) -> None:
+        """(Re)load the config if the file changed; readers see old or new, never a mix."""
+        with self.reload_lock:
+            try:
+                mtime = self.config_path.stat().st_mtime
+            except OSError:
+                mtime = None
+            if mtime == self.config_mtime and self.pip_sizes:
+                return
+            
+            config = self._load_config()
+            pip_sizes = self._compile_pip_sizes(config)
+            # Swap the index first: it is the only thing the hot path reads
+            self.pip_sizes = pip_sizes
+            self.instruments = config
+            self.config_mtime = mtime
+            logger.info(f"Loaded pip sizes for {len(pip_sizes)} symbols")
+
+    def _maybe_reload(self) -> None:
+        now = time.monotonic()
+        if now >= self.next_reload_check:
+            self.next_reload_check = now + self.reload_interval
+            self._reload()
+
     def get_pip_size(self, symbol: str) -> float:
         """Get pip size for a symbol."""
-        try:
-            # Remove suffix from symbol
-            clean_symbol = symbol.replace(self.default_suffix, '')
-            
-            # Check regular instruments
-            for pair in self.instruments.get('instruments', {}).get('pairs', []):
-                if pair['name'] == clean_symbol:
-                    return float(pair['pip_size'])
-            
-            # Check custom instruments
-            for pair in self.instruments.get('custom', {}).get('pairs', []):
-                if pair['name'] == clean_symbol:
-                    return float(pair['pip_size'])
-            
-            logger.warning(f"No pip size found for {symbol}, using default 0.0001")
-            return 0.0001
-            
-        except Exception as e:
-            logger.error(f"Error getting pip size: {e}")
-            return 0.0001
+        self._maybe_reload()
+        pip_size = self.pip_sizes.get(symbol)
+        if pip_size is not None:
+            return pip_size
+        
+        # Slow path: odd casing or a suffix the index doesn't know about
+        clean_symbol = symbol.strip().upper()
+        if self.default_suffix:
+            clean_symbol = clean_symbol.replace(self.default_suffix.upper(), '')
+        pip_size = self.pip_sizes.get(clean_symbol)
+        if pip_size is not None:
+            return pip_size
+        
+        logger.warning(f"No pip size found for {symbol}, using default {DEFAULT_PIP_SIZE}")
+        return DEFAULT_PIP_SIZE
 
     def calculate_trailing_distance(self, symbol: str, trailing_pips: float, symbol_info) -> float:
         """Calculate trailing distance for a symbol."""
         try:
-            pip_size = self.get_pip_size(symbol)
-            
-            # Calculate trailing distance
-            trailing_distance = trailing_pips * float(pip_size)
-            
-            # Round to symbol digits
-            trailing_distance = round(trailing_distance, symbol_info.digits)
-            
-            logger.debug(f"Trailing calculation for {symbol}:")
-            logger.debug(f"Pip size: {pip_size}")
-            logger.debug(f"Trailing pips: {trailing_pips}")
-            logger.debug(f"Trailing distance: {trailing_distance}")
-            
-            return trailing_distance
-            
+            return round(trailing_pips * self.get_pip_size(symbol), symbol_info.digits)
         except Exception as e:
             logger.error(f"Error calculating trailing distance: {e}")
-            return 0.0
\ No newline at end of file
+            return 0.0
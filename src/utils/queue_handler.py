@@ -1,16 +1,109 @@
 import asyncio
 import json
 import logging
+import os
+import socket
+import threading
+import time
+from collections import deque
+from concurrent.futures import TimeoutError as FuturesTimeoutError
 from datetime import datetime
 from functools import partial
-from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Union
+from typing import (Any, AsyncIterator, Awaitable, Callable, Dict, List,
+                    Optional, Set, Tuple, Union)
 
 import redis
+import redis.asyncio as aioredis
+
+from src.utils.id_generator import new_ulid
 
 logger = logging.getLogger('RedisQueue')
 
+# Publish a message only if its de-dup key was not seen within the window.
+# KEYS[1] = de-dup key, KEYS[2] = channel or stream
+# ARGV = mode, payload, de-dup TTL seconds, stream MAXLEN
+# Returns nil for duplicates, else the stream entry ID / subscriber count.
+PUBLISH_ONCE_SCRIPT = """
+if not redis.call('SET', KEYS[1], '1', 'NX', 'EX', ARGV[3]) then
+    return false
+end
+if ARGV[1] == 'streams' then
+    return redis.call('XADD', KEYS[2], 'MAXLEN', '~', ARGV[4], '*', 'payload', ARGV[2])
+end
+return redis.call('PUBLISH', KEYS[2], ARGV[2])
+"""
+
+# Priority lanes, highest first: protective closes, then TP/SL updates, then opens
+PRIORITY_LANES = ('close', 'update', 'open')
+
+def classify_trade(trade_data: Dict[str, Any]) -> str:
+    """Return the priority lane for a trade message payload."""
+    if not isinstance(trade_data, dict):
+        return 'open'
+    if trade_data.get('execution_data', {}).get('isClose', False):
+        return 'close'
+    if trade_data.get('type') == 'update':
+        return 'update'
+    return 'open'
+
+class PriorityBuffer:
+    """In-process message lanes drained highest priority first.
+
+    A lower lane that has been passed over `starvation_limit` times in a row
+    is served next, so opens still progress during a long burst of closes.
+    Each lane has its own capacity, so a backlog of opens never blocks
+    closes from being buffered.
+    """
+
+    def __init__(self, lanes: Tuple[str, ...] = PRIORITY_LANES, lane_capacity: int = 100,
+                 starvation_limit: int = 5):
+        self.lanes = lanes
+        self.starvation_limit = starvation_limit
+        self.queues = {lane: deque() for lane in lanes}
+        self.skips = {lane: 0 for lane in lanes}
+        self.dispatched = {lane: 0 for lane in lanes}
+        self.free = {lane: asyncio.Semaphore(lane_capacity) for lane in lanes}
+        self.available = asyncio.Semaphore(0)
+
+    async def put(self, lane: str, item: Any) -> None:
+        """Add item to a lane, waiting while that lane is full."""
+        await self.free[lane].acquire()
+        self.queues[lane].append(item)
+        self.available.release()
+
+    def _next_lane(self) -> str:
+        """Pick lane to serve: a starved lane first, otherwise highest non-empty."""
+        for lane in self.lanes:
+            if self.queues[lane] and self.skips[lane] >= self.starvation_limit:
+                return lane
+        return next(lane for lane in self.lanes if self.queues[lane])
+
+    async def get(self) -> Any:
+        """Remove and return the next item by priority."""
+        await self.available.acquire()
+        lane = self._next_lane()
+
+        # Waiting lower lanes were passed over once more
+        for other in self.lanes[self.lanes.index(lane) + 1:]:
+            if self.queues[other]:
+                self.skips[other] += 1
+        self.skips[lane] = 0
+        self.dispatched[lane] += 1
+
+        item = self.queues[lane].popleft()
+        self.free[lane].release()
+        return item
+
+    def depths(self) -> Dict[str, int]:
+        """Number of buffered messages per lane."""
+        return {lane: len(self.queues[lane]) for lane in self.lanes}
+
 class RedisQueue:
-    def __init__(self, host='localhost', port=6379, db=0):
+    def __init__(self, host='localhost', port=6379, db=0, mode: Optional[str] = None,
+                 stream_maxlen: Optional[int] = None, group: Optional[str] = None,
+                 consumer: Optional[str] = None, claim_idle_ms: Optional[int] = None,
+                 concurrency: Optional[int] = None, account_login: Optional[str] = None,
+                 starvation_limit: Optional[int] = None, dedup_ttl: Optional[int] = None):
         self.logger = logging.getLogger('RedisQueue')
         
         # Main Redis connection for operations
@@ -22,6 +115,19 @@ class RedisQueue:
             socket_timeout=5
         )
 
+        # Native asyncio connection for async_* methods (connects lazily
+        # on the event loop that first uses it)
+        self.async_redis = aioredis.Redis(
+            host=host,
+            port=port,
+            db=db,
+            decode_responses=True,
+            socket_timeout=5
+        )
+
+        # MT5 account whose trade shard this instance consumes (None = shared only)
+        self.account_login = str(account_login) if account_login else None
+
         # Channel names for pub/sub
         self.channels = {
             'trades': 'trades:channel',      # Main trade execution channel
@@ -29,6 +135,41 @@ class RedisQueue:
             'errors': 'trades:errors'        # Error notifications channel
         }
 
+        # Delivery mode: 'pubsub' (fire-and-forget) or 'streams' (durable consumer groups)
+        self.mode = (mode or os.getenv('REDIS_QUEUE_MODE', 'pubsub')).lower()
+        if self.mode not in ('pubsub', 'streams'):
+            raise ValueError(f"Unknown Redis queue mode: {self.mode}")
+
+        # Stream settings (only used in 'streams' mode)
+        self.streams = {
+            'trades': 'trades:stream'        # Durable trade execution stream
+        }
+        self.stream_maxlen = int(stream_maxlen or os.getenv('REDIS_STREAM_MAXLEN', 10000))
+        self.group = group or os.getenv('REDIS_STREAM_GROUP', 'mt5-workers')
+        self.consumer = (
+            consumer
+            or os.getenv('REDIS_STREAM_CONSUMER')
+            or f"{socket.gethostname()}-{os.getpid()}"
+        )
+        self.claim_idle_ms = int(claim_idle_ms or os.getenv('REDIS_STREAM_CLAIM_IDLE_MS', 30000))
+        self.stream_groups: Set[str] = set()  # Streams whose group is known to exist
+        # (stream, entry_id) handed to a consumer and not yet acked
+        self.in_flight: Set[Tuple[str, str]] = set()
+
+        # Window in which a repeated TV execution is dropped as duplicate
+        self.dedup_ttl = int(dedup_ttl or os.getenv('REDIS_DEDUP_TTL_SECONDS', 3600))
+        self.stream_thread = None
+        self.stream_stop = threading.Event()
+
+        # Number of messages handled concurrently by async_subscribe
+        self.concurrency = int(concurrency or os.getenv('REDIS_QUEUE_CONCURRENCY', 4))
+        self.consumer_task = None
+        self.handler_tasks: Set[asyncio.Task] = set()
+
+        # Priority lanes for incoming trades (see PriorityBuffer)
+        self.starvation_limit = int(starvation_limit or os.getenv('REDIS_QUEUE_STARVATION_LIMIT', 5))
+        self.priority_buffer: Optional[PriorityBuffer] = None
+
         # Initialize event loop for async operations
         self.loop = asyncio.get_event_loop()
         self.pubsub = None
@@ -47,6 +188,11 @@ class RedisQueue:
                 'trades:completed',
                 'trades:failed'
             )
+
+            # Make sure the consumer group exists before anything is published,
+            # so trades pushed while no worker is running are kept for later
+            if self.mode == 'streams':
+                self._ensure_stream_group()
             
             # Publish system startup message
             self.publish_status("Queue system initialized\n")
@@ -54,104 +200,469 @@ class RedisQueue:
         except Exception as e:
             self.logger.error(f"Error initializing Redis: {e}")
     
+    def trade_channel(self, account_login: Optional[str] = None) -> str:
+        """Pub/sub channel for an account's trades (shared channel if None)."""
+        if account_login:
+            return f"trades:{account_login}"
+        return self.channels['trades']
+
+    def trade_stream(self, account_login: Optional[str] = None, lane: str = 'open') -> str:
+        """Stream key for an account's trades in a priority lane (shared stream if no account)."""
+        if account_login:
+            return f"{self.streams['trades']}:{account_login}:{lane}"
+        return f"{self.streams['trades']}:{lane}"
+
+    def _consumed_channels(self) -> List[str]:
+        """Trade channels this instance listens on: shared plus own shard."""
+        channels = [self.trade_channel()]
+        if self.account_login:
+            channels.append(self.trade_channel(self.account_login))
+        return channels
+
+    def _consumed_streams(self) -> List[str]:
+        """Trade streams this instance reads, highest priority lane first."""
+        streams = []
+        for lane in PRIORITY_LANES:
+            streams.append(self.trade_stream(lane=lane))
+            if self.account_login:
+                streams.append(self.trade_stream(self.account_login, lane))
+        return streams
+
+    @staticmethod
+    def _message_lane(msg_type: str, data: Dict[str, Any]) -> str:
+        """Priority lane of a received message; status and errors never compete with closes."""
+        if msg_type != 'trade':
+            return PRIORITY_LANES[-1]
+        return data.get('priority') or classify_trade(data.get('data'))
+
+    def _ensure_stream_group(self, stream: Optional[str] = None) -> None:
+        """Create a trade stream and its consumer group if missing."""
+        streams = [stream] if stream else self._consumed_streams()
+        for key in streams:
+            if key in self.stream_groups:
+                continue
+            try:
+                self.redis.xgroup_create(key, self.group, id='$', mkstream=True)
+                self.logger.info(f"Created consumer group {self.group} on {key}")
+            except redis.ResponseError as e:
+                # Group already exists - nothing to do
+                if 'BUSYGROUP' not in str(e):
+                    raise
+            self.stream_groups.add(key)
+
+    def _build_status_message(self, message: str) -> str:
+        """Encode status update payload."""
+        return json.dumps({
+            'type': 'status',
+            'message': message,
+            'timestamp': datetime.now().isoformat()
+        })
+
     def publish_status(self, message: str) -> None:
         """Publish status update."""
         try:
-            self.redis.publish(self.channels['status'], 
-                             json.dumps({
-                                 'type': 'status',
-                                 'message': message,
-                                 'timestamp': datetime.now().isoformat()
-                             }))
+            self.redis.publish(self.channels['status'], self._build_status_message(message))
         except Exception as e:
             self.logger.error(f"Error publishing status: {e}")
     
     async def async_publish_status(self, message: str) -> None:
         """Publish status update asynchronously."""
         try:
-            await self.loop.run_in_executor(
-                None,
-                self.publish_status,
-                message
+            await self.async_redis.publish(
+                self.channels['status'],
+                self._build_status_message(message)
             )
         except Exception as e:
             self.logger.error(f"Error publishing async status: {e}")
-    
-    def push_trade(self, trade_data: Dict[str, Any]) -> str:
-        """Publish trade data to channel."""
+
+    def positions_key(self, account_login: Optional[str] = None) -> str:
+        """Redis hash holding a worker's open-positions snapshot (ticket -> volume)."""
+        return f"positions:{account_login or self.account_login or 'default'}"
+
+    def publish_positions(self, positions: Dict[str, float], ttl: int = 30,
+                          account_login: Optional[str] = None) -> None:
+        """Replace this worker's snapshot atomically; it expires if the worker stops refreshing it."""
+        key = self.positions_key(account_login)
         try:
-            # Generate trade ID
-            trade_id = f"trade_{datetime.now().timestamp()}"
-            
-            # Add trade ID and timestamp if not present
-            if isinstance(trade_data, dict):
-                if 'trade_id' not in trade_data:
-                    trade_data['trade_id'] = trade_id
-
-            # Prepare message
-            message = {
-                'id': trade_id,
-                'data': trade_data,
-                'timestamp': datetime.now().isoformat()
-            }
-            
-            # Publish to trades channel
-            self.redis.publish(
-                self.channels['trades'],
-                json.dumps(message)
+            pipe = self.redis.pipeline(transaction=True)
+            pipe.delete(key)
+            # _ts marks the snapshot as present even when there are no positions
+            pipe.hset(key, mapping={'_ts': time.time(), **positions})
+            pipe.expire(key, ttl)
+            pipe.execute()
+        except Exception as e:
+            self.logger.error(f"Error publishing positions snapshot: {e}")
+
+    async def async_publish_positions(self, positions: Dict[str, float], ttl: int = 30,
+                                      account_login: Optional[str] = None) -> None:
+        """Replace this worker's snapshot atomically (async)."""
+        key = self.positions_key(account_login)
+        try:
+            pipe = self.async_redis.pipeline(transaction=True)
+            pipe.delete(key)
+            pipe.hset(key, mapping={'_ts': time.time(), **positions})
+            pipe.expire(key, ttl)
+            await pipe.execute()
+        except Exception as e:
+            self.logger.error(f"Error publishing async positions snapshot: {e}")
+
+    async def async_get_position_volume(self, position_id: str,
+                                        account_logins: Optional[List[str]] = None,
+                                        not_before: Optional[float] = None) -> Optional[float]:
+        """Volume of a TV position across the followers' snapshots.
+
+        Each follower holds the position under its own ticket, so snapshots
+        are looked up by TV#<positionId>. Returns the volume if any follower
+        still holds it. Returns 0.0 (closed everywhere) only when every
+        follower has a snapshot taken after not_before, the time the position
+        was known to be open, and none holds it. Otherwise the answer is
+        unknown (None): a follower without a snapshot (e.g. served by the
+        group worker) or a snapshot older than the open may simply not list it
+        yet.
+        """
+        keys = [self.positions_key(login) for login in (account_logins or [None])]
+        try:
+            pipe = self.async_redis.pipeline(transaction=False)
+            for key in keys:
+                pipe.hmget(key, '_ts', f"TV#{position_id}")
+            results = await pipe.execute()
+        except Exception as e:
+            self.logger.error(f"Error reading positions snapshot: {e}")
+            return None
+
+        for stamp, volume in results:
+            if volume is not None:
+                return float(volume)
+        if not_before is None:
+            return None
+        fresh = all(stamp is not None and float(stamp) >= not_before for stamp, _ in results)
+        return 0.0 if fresh else None
+
+    def _build_trade_message(self, trade_data: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        """Assign trade ID and wrap trade data in a queue message."""
+        # Generate collision-free, time-ordered trade ID
+        trade_id = f"trade_{new_ulid()}"
+        
+        # Add trade ID and timestamp if not present
+        if isinstance(trade_data, dict):
+            if 'trade_id' not in trade_data:
+                trade_data['trade_id'] = trade_id
+
+        # Prepare message
+        message = {
+            'id': trade_id,
+            'data': trade_data,
+            'priority': classify_trade(trade_data),
+            'timestamp': datetime.now().isoformat()
+        }
+        return trade_id, message
+
+    def _build_error_message(self, error: Exception) -> str:
+        """Encode error notification payload."""
+        return json.dumps({
+            'error': str(error),
+            'timestamp': datetime.now().isoformat()
+        })
+    
+    @staticmethod
+    def dedup_key(trade_data: Dict[str, Any], account_login: Optional[str] = None) -> Optional[str]:
+        """De-dup key for a TV execution: (orderId, execution id, account).
+
+        Returns None for messages that do not come from an execution
+        (closes and TP/SL updates), which are never de-duplicated.
+        """
+        if not isinstance(trade_data, dict):
+            return None
+        execution = trade_data.get('execution_data') or {}
+        order_id = execution.get('orderId')
+        execution_id = execution.get('id')
+        if not order_id or not execution_id:
+            return None
+        return f"trades:dedup:{order_id}:{execution_id}:{account_login or 'all'}"
+
+    def _encode_batch(self, batch: List[Tuple[Dict[str, Any], Optional[str]]]) -> List[Tuple[str, str, str, Optional[str]]]:
+        """Encode a fan-out batch as (trade_id, routing key, payload, de-dup key) per message.
+
+        Entries sharing the same trade_data object are encoded only once.
+        """
+        encoded: Dict[int, Tuple[str, str, str]] = {}
+        messages = []
+        for trade_data, account_login in batch:
+            variant = id(trade_data)
+            if variant not in encoded:
+                trade_id, message = self._build_trade_message(trade_data)
+                encoded[variant] = (trade_id, message['priority'], json.dumps(message))
+            trade_id, lane, payload = encoded[variant]
+            if self.mode == 'streams':
+                key = self.trade_stream(account_login, lane)
+            else:
+                key = self.trade_channel(account_login)
+            messages.append((trade_id, key, payload, self.dedup_key(trade_data, account_login)))
+        return messages
+
+    def _queue_command(self, client: Any, key: str, payload: str, dedup_key: Optional[str]) -> Any:
+        """Issue the publish command for one message on a client or pipeline."""
+        if dedup_key:
+            return client.eval(
+                PUBLISH_ONCE_SCRIPT, 2, dedup_key, key,
+                self.mode, payload, self.dedup_ttl, self.stream_maxlen
             )
-            
-            self.logger.info(f"Trade {trade_id} published to channel")
+        if self.mode == 'streams':
+            return client.xadd(key, {'payload': payload}, maxlen=self.stream_maxlen, approximate=True)
+        return client.publish(key, payload)
+
+    def push_trade(self, trade_data: Dict[str, Any], account_login: Optional[str] = None) -> Optional[str]:
+        """Publish trade data to channel (an account's shard if account_login given).
+
+        Returns the trade ID, or None if the execution was already queued.
+        """
+        try:
+            trade_id, key, payload, dedup_key = self._encode_batch([(trade_data, account_login)])[0]
+            if self.mode == 'streams':
+                self._ensure_stream_group(key)
+
+            result = self._queue_command(self.redis, key, payload, dedup_key)
+            if dedup_key and result is None:
+                self.logger.info(f"Duplicate trade dropped ({dedup_key})")
+                return None
+
+            self.logger.info(f"Trade {trade_id} published to {key}")
             return trade_id
             
         except Exception as e:
             self.logger.error(f"Error publishing trade: {e}")
             # Publish error
-            self.redis.publish(
-                self.channels['errors'],
-                json.dumps({
-                    'error': str(e),
-                    'timestamp': datetime.now().isoformat()
-                })
-            )
+            self.redis.publish(self.channels['errors'], self._build_error_message(e))
             raise
     
-    async def async_push_trade(self, trade_data: Dict[str, Any]) -> str:
+    async def async_push_trade(self, trade_data: Dict[str, Any], account_login: Optional[str] = None) -> Optional[str]:
         """Publish trade data to channel asynchronously."""
         try:
-            result = await self.loop.run_in_executor(
-                None,
-                self.push_trade,
-                trade_data
-            )
-            return result
+            trade_id, key, payload, dedup_key = self._encode_batch([(trade_data, account_login)])[0]
+            if self.mode == 'streams':
+                await self._async_ensure_stream_group(key)
+
+            result = await self._queue_command(self.async_redis, key, payload, dedup_key)
+            if dedup_key and result is None:
+                self.logger.info(f"Duplicate trade dropped ({dedup_key})")
+                return None
+
+            self.logger.info(f"Trade {trade_id} published to {key}")
+            return trade_id
+
         except Exception as e:
             self.logger.error(f"Error publishing async trade: {e}")
+            await self.async_redis.publish(self.channels['errors'], self._build_error_message(e))
+            raise
+
+    def _batch_ids(self, messages: List[Tuple[str, str, str, Optional[str]]], results: List[Any]) -> List[Optional[str]]:
+        """Per-message IDs for a published batch; None marks a dropped duplicate."""
+        ids = []
+        for (trade_id, _, _, dedup_key), result in zip(messages, results):
+            if dedup_key and result is None:
+                self.logger.info(f"Duplicate trade dropped ({dedup_key})")
+                ids.append(None)
+            elif self.mode == 'streams':
+                ids.append(result)
+            else:
+                ids.append(trade_id)
+        return ids
+
+    def push_trades(self, batch: List[Tuple[Dict[str, Any], Optional[str]]],
+                    transaction: bool = True) -> List[Optional[str]]:
+        """Publish a batch of (trade_data, account_login) in one round trip.
+
+        Returns one ID per message: the stream entry ID in streams mode,
+        the trade ID in pub/sub mode, None for a dropped duplicate. The batch
+        is sent as MULTI/EXEC, so a fan-out reaches every follower or none;
+        transaction=False sends it as a plain pipeline.
+        """
+        try:
+            messages = self._encode_batch(batch)
+            if self.mode == 'streams':
+                for key in {key for _, key, _, _ in messages}:
+                    self._ensure_stream_group(key)
+
+            pipe = self.redis.pipeline(transaction=transaction)
+            for _, key, payload, dedup_key in messages:
+                self._queue_command(pipe, key, payload, dedup_key)
+            results = pipe.execute()
+
+            self.logger.info(f"Published {len(messages)} trade messages in one round trip")
+            return self._batch_ids(messages, results)
+
+        except Exception as e:
+            self.logger.error(f"Error publishing trade batch: {e}")
+            self.redis.publish(self.channels['errors'], self._build_error_message(e))
             raise
 
+    async def async_push_trades(self, batch: List[Tuple[Dict[str, Any], Optional[str]]],
+                                transaction: bool = True) -> List[Optional[str]]:
+        """Publish a batch of (trade_data, account_login) in one round trip asynchronously."""
+        try:
+            messages = self._encode_batch(batch)
+            if self.mode == 'streams':
+                for key in {key for _, key, _, _ in messages}:
+                    await self._async_ensure_stream_group(key)
+
+            pipe = self.async_redis.pipeline(transaction=transaction)
+            for _, key, payload, dedup_key in messages:
+                self._queue_command(pipe, key, payload, dedup_key)
+            results = await pipe.execute()
+
+            self.logger.info(f"Published {len(messages)} trade messages in one round trip")
+            return self._batch_ids(messages, results)
+
+        except Exception as e:
+            self.logger.error(f"Error publishing async trade batch: {e}")
+            await self.async_redis.publish(self.channels['errors'], self._build_error_message(e))
+            raise
+
+    def _dispatch(self, callback: Union[Callable, Awaitable], msg_type: str, data: Dict[str, Any],
+                  on_done: Optional[Callable[[bool], None]] = None) -> bool:
+        """Run callback for a decoded message. Returns True if it completed.
+
+        An async callback that outlives the 10 second wait keeps running on
+        the loop; on_done(succeeded) is called whenever it actually finishes.
+        """
+        if asyncio.iscoroutinefunction(callback):
+            # Handle async callback
+            future = asyncio.run_coroutine_threadsafe(
+                callback(msg_type, data),
+                self.loop
+            )
+            if on_done:
+                future.add_done_callback(lambda f: on_done(not f.cancelled() and f.exception() is None))
+            # Handle any exceptions from the future
+            try:
+                future.result(timeout=10)  # 10 second timeout
+            except FuturesTimeoutError:
+                self.logger.warning(f"Async {msg_type} callback still running after 10s")
+                return False
+            except Exception as e:
+                self.logger.error(f"Async callback error: {e}")
+                return False
+        else:
+            # Handle sync callback
+            try:
+                callback(msg_type, data)
+            except Exception:
+                if on_done:
+                    on_done(False)
+                raise
+            if on_done:
+                on_done(True)
+        return True
+
     def _handle_message(self, callback: Union[Callable, Awaitable], msg_type: str) -> Callable:
         """Create message handler that supports both sync and async callbacks."""
         def handler(message):
             try:
                 if message['type'] == 'message':
                     data = json.loads(message['data'])
-                    if asyncio.iscoroutinefunction(callback):
-                        # Handle async callback
-                        future = asyncio.run_coroutine_threadsafe(
-                            callback(msg_type, data),
-                            self.loop
-                        )
-                        # Handle any exceptions from the future
-                        try:
-                            future.result(timeout=10)  # 10 second timeout
-                        except Exception as e:
-                            self.logger.error(f"Async callback error: {e}")
-                    else:
-                        # Handle sync callback
-                        callback(msg_type, data)
+                    self._dispatch(callback, msg_type, data)
             except Exception as e:
                 self.logger.error(f"Error handling {msg_type} message: {e}")
         return handler
+
+    def _settle_stream_entry(self, stream: str, entry_id: str, succeeded: bool) -> None:
+        """Acknowledge a finished entry; a failed one stays pending for reclaim."""
+        try:
+            if succeeded:
+                self.redis.xack(stream, self.group, entry_id)
+        except Exception as e:
+            self.logger.error(f"Error acknowledging stream entry {entry_id}: {e}")
+        finally:
+            self.in_flight.discard((stream, entry_id))
+
+    def _process_stream_entry(self, callback: Union[Callable, Awaitable], stream: str,
+                              entry_id: str, fields: Optional[Dict[str, str]]) -> None:
+        """Deliver one stream entry and acknowledge it once handled."""
+        if (stream, entry_id) in self.in_flight:
+            # Its handler timed out but is still running - don't run it twice
+            return
+        try:
+            if fields is None:
+                # Entry was trimmed away while pending
+                self.redis.xack(stream, self.group, entry_id)
+                return
+            data = json.loads(fields['payload'])
+            self.in_flight.add((stream, entry_id))
+            # Acked when the handler finishes, even if that is after the dispatch timeout
+            self._dispatch(callback, 'trade', data,
+                           on_done=lambda succeeded: self._settle_stream_entry(stream, entry_id, succeeded))
+        except (KeyError, json.JSONDecodeError) as e:
+            # Malformed entry can never succeed - ack it so it is not redelivered
+            self.logger.error(f"Dropping malformed stream entry {entry_id}: {e}")
+            self.redis.xack(stream, self.group, entry_id)
+        except Exception as e:
+            # Left pending; will be retried through reclaim
+            self.logger.error(f"Error handling stream entry {entry_id}: {e}")
+
+    def _reclaim_pending(self, callback: Union[Callable, Awaitable], stream: str) -> None:
+        """Take over entries left pending by crashed or stuck consumers."""
+        start_id = '0-0'
+        while not self.stream_stop.is_set():
+            result = self.redis.xautoclaim(
+                stream,
+                self.group,
+                self.consumer,
+                min_idle_time=self.claim_idle_ms,
+                start_id=start_id,
+                count=100
+            )
+            start_id, entries = result[0], result[1]
+            for entry_id, fields in entries:
+                if (stream, entry_id) in self.in_flight:
+                    continue
+                self.logger.warning(f"Reclaimed pending trade entry {entry_id} from {stream}")
+                self._process_stream_entry(callback, stream, entry_id, fields)
+            if start_id == '0-0':
+                break
+
+    @staticmethod
+    def _advance_read_ids(read_ids: Dict[str, str], entries: List) -> None:
+        """Move streams whose own pending backlog is drained on to new entries."""
+        returned = {stream: messages for stream, messages in entries or []}
+        for stream, read_id in read_ids.items():
+            if read_id == '>':
+                continue
+            messages = returned.get(stream)
+            # Continue after the last replayed entry, or switch to '>' when done
+            read_ids[stream] = messages[-1][0] if messages else '>'
+
+    def _consume_stream(self, callback: Union[Callable, Awaitable]) -> None:
+        """Read trade streams through the consumer group until stopped."""
+        last_reclaim = 0.0
+
+        # Replay anything this consumer received but never acknowledged
+        read_ids = {stream: '0' for stream in self._consumed_streams()}
+        while not self.stream_stop.is_set():
+            try:
+                now = time.monotonic()
+                if now - last_reclaim >= self.claim_idle_ms / 1000:
+                    for stream in read_ids:
+                        self._reclaim_pending(callback, stream)
+                    last_reclaim = now
+
+                entries = self.redis.xreadgroup(
+                    self.group,
+                    self.consumer,
+                    dict(read_ids),
+                    count=10,
+                    block=1000
+                )
+                self._advance_read_ids(read_ids, entries)
+
+                # Streams are listed highest lane first; serve in that order
+                returned = dict(entries or [])
+                for stream in read_ids:
+                    for entry_id, fields in returned.get(stream, []):
+                        self._process_stream_entry(callback, stream, entry_id, fields)
+
+            except Exception as e:
+                self.logger.error(f"Error reading trade stream: {e}")
+                self.stream_stop.wait(1)
     
     def subscribe(self, callback: Callable[[str, Dict], None]) -> None:
         """Subscribe to trade channel with callback."""
@@ -160,58 +671,331 @@ class RedisQueue:
             self.pubsub = self.redis.pubsub()
             
             # Subscribe to all channels
-            self.pubsub.subscribe(**{
-                self.channels['trades']: self._handle_message(callback, 'trade'),
+            handlers = {
                 self.channels['status']: self._handle_message(callback, 'status'),
                 self.channels['errors']: self._handle_message(callback, 'error')
-            })
+            }
+            if self.mode == 'pubsub':
+                for channel in self._consumed_channels():
+                    handlers[channel] = self._handle_message(callback, 'trade')
+            self.pubsub.subscribe(**handlers)
             
             # Start listening
             # self.logger.info("Subscribed to trade channels")
             self.pubsub_thread = self.pubsub.run_in_thread(sleep_time=0.001)
+
+            # Trades come from the stream through the consumer group
+            if self.mode == 'streams':
+                self._ensure_stream_group()
+                self.stream_stop.clear()
+                self.stream_thread = threading.Thread(
+                    target=self._consume_stream,
+                    args=(callback,),
+                    name='RedisStreamConsumer',
+                    daemon=True
+                )
+                self.stream_thread.start()
             
         except Exception as e:
             self.logger.error(f"Error subscribing: {e}")
             raise
     
+    async def _async_ensure_stream_group(self, stream: Optional[str] = None) -> None:
+        """Create a trade stream and its consumer group if missing (async)."""
+        streams = [stream] if stream else self._consumed_streams()
+        for key in streams:
+            if key in self.stream_groups:
+                continue
+            try:
+                await self.async_redis.xgroup_create(key, self.group, id='$', mkstream=True)
+            except aioredis.ResponseError as e:
+                if 'BUSYGROUP' not in str(e):
+                    raise
+            self.stream_groups.add(key)
+
+    async def _async_read_channels(self, inbox: PriorityBuffer) -> None:
+        """Forward pub/sub messages into the priority buffer."""
+        channel_types = {
+            self.channels['status']: 'status',
+            self.channels['errors']: 'error'
+        }
+        if self.mode == 'pubsub':
+            for channel in self._consumed_channels():
+                channel_types[channel] = 'trade'
+
+        pubsub = self.async_redis.pubsub(ignore_subscribe_messages=True)
+        try:
+            await pubsub.subscribe(*channel_types)
+            while True:
+                # Blocks on the socket until a message arrives (no busy polling)
+                message = await pubsub.get_message(timeout=1.0)
+                if message is None:
+                    continue
+                try:
+                    data = json.loads(message['data'])
+                except json.JSONDecodeError as e:
+                    self.logger.error(f"Dropping malformed message on {message['channel']}: {e}")
+                    continue
+                msg_type = channel_types[message['channel']]
+                await inbox.put(self._message_lane(msg_type, data), (msg_type, data, None))
+        finally:
+            await pubsub.aclose()
+
+    async def _async_read_stream(self, inbox: PriorityBuffer) -> None:
+        """Forward trade stream entries into the priority buffer, reclaiming stale ones."""
+        await self._async_ensure_stream_group()
+        last_reclaim = 0.0
+
+        async def forward(stream: str, entry_id: str, fields: Optional[Dict[str, str]]) -> None:
+            if (stream, entry_id) in self.in_flight:
+                # Still buffered or being handled - reclaim/replay saw it again
+                return
+            if fields is None:
+                # Entry was trimmed away while pending
+                await self.async_redis.xack(stream, self.group, entry_id)
+                return
+            try:
+                data = json.loads(fields['payload'])
+            except (KeyError, json.JSONDecodeError) as e:
+                self.logger.error(f"Dropping malformed stream entry {entry_id}: {e}")
+                await self.async_redis.xack(stream, self.group, entry_id)
+                return
+            self.in_flight.add((stream, entry_id))
+            await inbox.put(self._message_lane('trade', data), ('trade', data, (stream, entry_id)))
+
+        # Replay anything this consumer received but never acknowledged
+        read_ids = {stream: '0' for stream in self._consumed_streams()}
+        while True:
+            try:
+                now = time.monotonic()
+                # Reclaim only once the own-pending replay is done, so it
+                # cannot hand back entries the replay is about to deliver
+                replayed = all(read_id == '>' for read_id in read_ids.values())
+                if replayed and now - last_reclaim >= self.claim_idle_ms / 1000:
+                    for stream in read_ids:
+                        start_id = '0-0'
+                        while True:
+                            result = await self.async_redis.xautoclaim(
+                                stream,
+                                self.group,
+                                self.consumer,
+                                min_idle_time=self.claim_idle_ms,
+                                start_id=start_id,
+                                count=100
+                            )
+                            start_id, entries = result[0], result[1]
+                            for entry_id, fields in entries:
+                                if (stream, entry_id) in self.in_flight:
+                                    continue
+                                self.logger.warning(f"Reclaimed pending trade entry {entry_id} from {stream}")
+                                await forward(stream, entry_id, fields)
+                            if start_id == '0-0':
+                                break
+                    last_reclaim = now
+
+                entries = await self.async_redis.xreadgroup(
+                    self.group,
+                    self.consumer,
+                    dict(read_ids),
+                    count=10,
+                    block=1000
+                )
+                self._advance_read_ids(read_ids, entries)
+
+                for stream, messages in entries or []:
+                    for entry_id, fields in messages:
+                        await forward(stream, entry_id, fields)
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"Error reading trade stream: {e}")
+                await asyncio.sleep(1)
+
+    async def messages(self) -> AsyncIterator[Tuple[str, Dict[str, Any], Optional[Tuple[str, str]]]]:
+        """Iterate over incoming messages as (msg_type, data, entry).
+
+        entry is the (stream, entry_id) to pass to async_ack() once the
+        message has been handled; it is None for pub/sub deliveries.
+        """
+        inbox = PriorityBuffer(
+            lane_capacity=max(self.concurrency * 2, 10),
+            starvation_limit=self.starvation_limit
+        )
+        self.priority_buffer = inbox
+        readers = [asyncio.create_task(self._async_read_channels(inbox))]
+        if self.mode == 'streams':
+            readers.append(asyncio.create_task(self._async_read_stream(inbox)))
+
+        try:
+            while True:
+                getter = asyncio.ensure_future(inbox.get())
+                done, _ = await asyncio.wait(
+                    [getter, *readers],
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if getter not in done:
+                    getter.cancel()
+                    # A reader died - surface its error to the consumer
+                    for reader in readers:
+                        if reader.done():
+                            reader.result()
+                    continue
+                yield getter.result()
+        finally:
+            for reader in readers:
+                reader.cancel()
+            await asyncio.gather(*readers, return_exceptions=True)
+            # Buffered entries were never handed out; let replay deliver them again
+            for lane in inbox.lanes:
+                for _, _, entry in inbox.queues[lane]:
+                    self.in_flight.discard(entry)
+
+    async def async_ack(self, entry: Optional[Tuple[str, str]]) -> None:
+        """Acknowledge a handled stream entry (no-op for pub/sub messages)."""
+        if entry is not None:
+            stream, entry_id = entry
+            await self.async_redis.xack(stream, self.group, entry_id)
+            self.in_flight.discard(entry)
+
+    async def _async_handle(self, callback: Union[Callable, Awaitable], msg_type: str,
+                            data: Dict[str, Any], entry: Optional[Tuple[str, str]]) -> None:
+        """Run callback for one message and acknowledge it on success."""
+        try:
+            if asyncio.iscoroutinefunction(callback):
+                await callback(msg_type, data)
+            else:
+                callback(msg_type, data)
+            await self.async_ack(entry)
+        except Exception as e:
+            # Stream entries stay pending and are retried through reclaim
+            self.in_flight.discard(entry)
+            self.logger.error(f"Error handling {msg_type} message: {e}")
+
+    async def _async_consume(self, callback: Union[Callable, Awaitable]) -> None:
+        """Dispatch messages to callback with bounded concurrency."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        messages = self.messages()
+        try:
+            while True:
+                # Wait for a free slot before choosing the next message, so
+                # the pick reflects the lanes at the moment it can run
+                await semaphore.acquire()
+                try:
+                    msg_type, data, entry = await messages.__anext__()
+                except StopAsyncIteration:
+                    break
+                task = asyncio.create_task(self._async_handle(callback, msg_type, data, entry))
+                self.handler_tasks.add(task)
+                task.add_done_callback(self.handler_tasks.discard)
+                task.add_done_callback(lambda _: semaphore.release())
+        finally:
+            await messages.aclose()
+
     async def async_subscribe(self, callback: Union[Callable, Awaitable]) -> None:
-        """Subscribe to trade channels asynchronously."""
+        """Subscribe to trade channels on the running event loop.
+
+        Messages are handled by up to `concurrency` callbacks at a time, so a
+        slow trade does not hold back the ones queued behind it.
+        """
         try:
-            await self.loop.run_in_executor(
-                None,
-                self.subscribe,
-                callback
-            )
+            if self.mode == 'streams':
+                await self._async_ensure_stream_group()
+            self.consumer_task = asyncio.create_task(self._async_consume(callback))
         except Exception as e:
             self.logger.error(f"Error in async subscribe: {e}")
             raise
     
-    def get_queue_status(self) -> Dict[str, int]:
+    def get_queue_status(self) -> Dict[str, Any]:
         """Get current queue status."""
         try:
-            return {
-                'trades_channel': self.redis.pubsub_numsub(self.channels['trades'])[0][1],
+            status = {
+                'trades_channel': sum(
+                    count for _, count in self.redis.pubsub_numsub(*self._consumed_channels())
+                ),
                 'status_channel': self.redis.pubsub_numsub(self.channels['status'])[0][1],
                 'errors_channel': self.redis.pubsub_numsub(self.channels['errors'])[0][1]
             }
+            if self.mode == 'streams':
+                lanes = {lane: {'stream_length': 0, 'pending': 0} for lane in PRIORITY_LANES}
+                for lane in PRIORITY_LANES:
+                    for stream in self._consumed_streams():
+                        if stream.endswith(f":{lane}"):
+                            lanes[lane]['stream_length'] += self.redis.xlen(stream)
+                            lanes[lane]['pending'] += self.redis.xpending(stream, self.group)['pending']
+                status['trades_stream_length'] = sum(l['stream_length'] for l in lanes.values())
+                status['trades_stream_pending'] = sum(l['pending'] for l in lanes.values())
+                status['lanes'] = lanes
+            return status
         except Exception as e:
             self.logger.error(f"Error getting queue status: {e}")
             return {'error': str(e)}
 
-    async def async_get_queue_status(self) -> Dict[str, int]:
+    async def async_get_queue_status(self) -> Dict[str, Any]:
         """Get current queue status asynchronously."""
         try:
-            return await self.loop.run_in_executor(
-                None,
-                self.get_queue_status
-            )
+            subscribers = dict(await self.async_redis.pubsub_numsub(
+                *self._consumed_channels(),
+                self.channels['status'],
+                self.channels['errors']
+            ))
+            status = {
+                'trades_channel': sum(subscribers.get(c, 0) for c in self._consumed_channels()),
+                'status_channel': subscribers.get(self.channels['status'], 0),
+                'errors_channel': subscribers.get(self.channels['errors'], 0)
+            }
+            lanes = {lane: {} for lane in PRIORITY_LANES}
+            if self.mode == 'streams':
+                for lane in PRIORITY_LANES:
+                    lanes[lane].update(stream_length=0, pending=0)
+                    for stream in self._consumed_streams():
+                        if stream.endswith(f":{lane}"):
+                            lanes[lane]['stream_length'] += await self.async_redis.xlen(stream)
+                            lanes[lane]['pending'] += (await self.async_redis.xpending(
+                                stream, self.group
+                            ))['pending']
+                status['trades_stream_length'] = sum(l['stream_length'] for l in lanes.values())
+                status['trades_stream_pending'] = sum(l['pending'] for l in lanes.values())
+            if self.priority_buffer is not None:
+                for lane, depth in self.priority_buffer.depths().items():
+                    lanes[lane]['buffered'] = depth
+                    lanes[lane]['dispatched'] = self.priority_buffer.dispatched[lane]
+            status['lanes'] = lanes
+            status['in_flight'] = len(self.handler_tasks)
+            return status
         except Exception as e:
             self.logger.error(f"Error getting async queue status: {e}")
             return {'error': str(e)}
+
+    async def async_cleanup(self) -> None:
+        """Stop async consumer, let in-flight handlers finish and close the async connection."""
+        try:
+            if self.consumer_task is not None:
+                self.logger.info("Stopping async consumer...")
+                self.consumer_task.cancel()
+                await asyncio.gather(self.consumer_task, return_exceptions=True)
+                self.consumer_task = None
+
+            if self.handler_tasks:
+                self.logger.info(f"Waiting for {len(self.handler_tasks)} in-flight messages...")
+                await asyncio.wait(set(self.handler_tasks), timeout=10)
+
+            if self.async_redis is not None:
+                await self.async_redis.aclose()
+                self.async_redis = None
+        except Exception as e:
+            self.logger.error(f"Error during async Redis cleanup: {e}")
     
     def cleanup(self) -> None:
         """Cleanup Redis connections with proper thread shutdown."""
         try:
+            # Stop stream consumer thread if running
+            if self.stream_thread is not None:
+                self.logger.info("Stopping stream consumer thread...")
+                self.stream_stop.set()
+                self.stream_thread.join(timeout=2.0)  # Blocking read returns within 1s
+                self.stream_thread = None
+
             # Stop pubsub thread if running
             if self.pubsub_thread is not None:
                 self.logger.info("Stopping pubsub thread...")
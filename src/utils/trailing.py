@@ -0,0 +1,23 @@
+import numpy as np
+
+def round_to_digits(values: np.ndarray, digits: np.ndarray) -> np.ndarray:
+    """Round each value to its own symbol's digits."""
+    scale = np.power(10.0, digits)
+    return np.round(values * scale) / scale
+
+def compute_trailing_stops(is_buy: np.ndarray, bid: np.ndarray, ask: np.ndarray,
+                           trailing_pips: np.ndarray, pip_size: np.ndarray,
+                           last_sl: np.ndarray, digits: np.ndarray, step: np.ndarray):
+    """Candidate stop losses and the should-move mask for every position at once.
+
+    All arguments are equal-length arrays, one row per position. A buy trails
+    bid - distance and moves up; a sell trails ask + distance and moves down.
+    A row moves when it has no SL yet or the new SL is at least one step
+    better than the current one. Returns (new_sl, move).
+    """
+    distance = round_to_digits(trailing_pips * pip_size, digits)
+    new_sl = round_to_digits(np.where(is_buy, bid - distance, ask + distance), digits)
+
+    steps = np.where(is_buy, new_sl - last_sl, last_sl - new_sl) / step
+    move = (last_sl == 0) | (np.round(steps, 6) >= 1)
+    return new_sl, move
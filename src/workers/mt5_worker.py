@@ -3,15 +3,16 @@ import logging
 import signal
 import time
 from datetime import datetime, timezone
-from typing import Any, Dict, Set
+from typing import Any, Dict, Optional, Set
 import os
 from pathlib import Path
 import MetaTrader5 as mt5
 
 from src.config.mt5_config import MT5_CONFIG
+from src.services.deal_cursor import DealCursor
 from src.services.mt5_service import MT5Service, find_mt5_terminals
 from src.services.tradingview_service import TradingViewService
-from src.utils.database_handler import DatabaseHandler
+from src.utils.async_database_handler import create_database_handler
 from src.utils.queue_handler import RedisQueue
 from src.utils.token_manager import GLOBAL_TOKEN_MANAGER
 
@@ -22,11 +23,21 @@ class MT5Worker:
         self.running = True
         self.shutdown_event = asyncio.Event()
         self.open_positions: Set[str] = set()
+        # TV positionId -> this terminal's ticket; every follower holds its own ticket
+        self.position_tickets: Dict[str, str] = {}
         self.loop = None
         self.queue = None
         self.db = None
         self.mt5 = None
         self.tv_service = None
+        self.deal_cursor = None
+        # ticket -> exit deal whose remaining volume the terminal didn't report yet
+        self.unconfirmed_closes: Dict[str, Any] = {}
+        
+        # ticket -> volume snapshot in Redis, read by the proxy to validate closes
+        self.positions_dirty = True
+        self.last_snapshot = 0.0
+        self.snapshot_interval = float(os.getenv('POSITIONS_SNAPSHOT_SECONDS', '5'))
 
     def initialize(self):
         """Initialize all services with shared event loop."""
@@ -44,10 +55,11 @@ class MT5Worker:
             print("\nAdd your chosen path to .env as MT5_TERMINAL_PATH=<path>")
         
         # Initialize services
-        self.queue = RedisQueue()
+        # Consume only this terminal's trade shard (plus the shared channel)
+        self.queue = RedisQueue(account_login=str(MT5_CONFIG['account']))
         self.queue.loop = self.loop
         
-        self.db = DatabaseHandler()
+        self.db = create_database_handler()
         
         self.mt5 = MT5Service(
             account=MT5_CONFIG['account'],
@@ -57,6 +69,9 @@ class MT5Worker:
         )
         self.mt5.set_loop(self.loop)
         
+        # Looks back a little so closes racing the startup snapshot are still seen
+        self.deal_cursor = DealCursor()
+        
         self.tv_service = TradingViewService(
             token_manager=GLOBAL_TOKEN_MANAGER
         )
@@ -68,6 +83,11 @@ class MT5Worker:
                 positions = await self.loop.run_in_executor(None, mt5.positions_get)
                 if positions is not None:
                     self.open_positions = {str(pos.ticket) for pos in positions}
+                    # Orders are sent with comment TV#<positionId>
+                    self.position_tickets = {
+                        pos.comment[3:]: str(pos.ticket)
+                        for pos in positions if (pos.comment or '').startswith('TV#')
+                    }
                     print(f"\n📊 Initialized {len(self.open_positions)} open positions\n")
         except Exception as e:
             logger.error(f"❌ Error initializing positions: {e}")
@@ -135,6 +155,8 @@ class MT5Worker:
             
             mt5_ticket = str(result['mt5_ticket'])
             self.open_positions.add(mt5_ticket)
+            self.position_tickets[str(position_id)] = mt5_ticket
+            self.positions_dirty = True
             
             # Log success
             direction = trade_data.get('execution_data', {}).get('side', '').lower()
@@ -158,16 +180,42 @@ class MT5Worker:
         
         await self.db.async_update_trade_status(trade_id, status, update_data)
 
+    def _own_ticket(self, position_id: str, hinted_ticket: Optional[str]) -> Optional[str]:
+        """This terminal's ticket for a TV position.
+
+        The proxy sends one payload to every follower, so its mt5_ticket is
+        only used when this terminal actually holds that ticket.
+        """
+        ticket = self.position_tickets.get(str(position_id))
+        if ticket:
+            return ticket
+        if hinted_ticket and str(hinted_ticket) in self.open_positions:
+            return str(hinted_ticket)
+        return None
+
+    def _forget_ticket(self, ticket: str) -> None:
+        """Drop a fully closed position from this terminal's bookkeeping."""
+        self.open_positions.discard(ticket)
+        self.mt5.unregister_trailing_stop(ticket)
+        self.position_tickets = {
+            position_id: own for position_id, own in self.position_tickets.items() if own != ticket
+        }
+
     async def _handle_position_close(self, trade_data: Dict[str, Any], trade_id: str, start_time: int) -> None:
         """Handle closing an existing position."""
         try:
             position_id = trade_data.get('execution_data', {}).get('positionId', 'N/A')
-            mt5_ticket = trade_data.get('mt5_ticket', 'Pending')
+            mt5_ticket = self._own_ticket(position_id, trade_data.get('mt5_ticket'))
+            if not mt5_ticket:
+                print(f"ℹ️ No position on this account for TV #{position_id}, skipping close\n")
+                return
+            trade_data = {**trade_data, 'mt5_ticket': mt5_ticket}
             is_partial = trade_data.get('is_partial', False)
             close_amount = float(trade_data.get('qty', 0))
                         
             # Send close request
             result = await self.mt5.async_close_position(trade_data)
+            self.positions_dirty = True
             
             if 'error' in result:
                 status = 'failed'
@@ -186,9 +234,8 @@ class MT5Worker:
                     'closed_at': datetime.now(timezone.utc).isoformat() if not is_partial else None
                 }
                 
-                mt5_ticket = str(trade_data.get('mt5_ticket'))
                 if not is_partial:
-                    self.open_positions.discard(mt5_ticket)
+                    self._forget_ticket(mt5_ticket)
                 
                 direction = trade_data.get('execution_data', {}).get('side', '').lower()
                 direction_emoji = "SELL🔻" if direction == 'buy' else "BUY🔼"
@@ -222,19 +269,13 @@ class MT5Worker:
         """Handle updating TP/SL for an existing position."""
         try:
             position_id = trade_data.get('position_id', 'N/A')
-            mt5_ticket = trade_data.get('mt5_ticket', 'N/A')
-            
-            # Get current trade data
-            trade = await self.db.async_get_trade_by_mt5_ticket(mt5_ticket)
-            if not trade:
-                logger.error(f"No trade found for MT5 ticket {mt5_ticket}")
-                return
-                
-            if trade.get('is_closed'):
-                logger.info(f"Position {mt5_ticket} is already closed, skipping update")
+            # Only a position this terminal holds open is updated
+            mt5_ticket = self._own_ticket(position_id, trade_data.get('mt5_ticket'))
+            if not mt5_ticket:
+                logger.info(f"No open position on this account for TV #{position_id}, skipping update")
                 return
             
-            result = await self.mt5.async_update_position(trade_data)
+            result = await self.mt5.async_update_position({**trade_data, 'mt5_ticket': mt5_ticket})
             
             if 'error' not in result:
                 status = 'updated'
@@ -245,7 +286,7 @@ class MT5Worker:
                     'stop_loss': result.get('stop_loss')
                 }
 
-                print(f"💱 Position updated for {result.get('symbol')} x {trade.get('quantity')} @ {trade.get('execution_price')}")
+                print(f"💱 Position updated for {result.get('symbol')}")
                 print(f"🔗 References: TV# {position_id} --> MT5# {mt5_ticket}")
                 
                 if result.get('take_profit') or result.get('stop_loss'):
@@ -275,32 +316,79 @@ class MT5Worker:
             )
 
     async def check_mt5_positions(self) -> None:
-        """Monitor MT5 positions for manual closes asynchronously."""
+        """Pick up MT5-initiated closes (SL/TP/manual) from new exit deals."""
         try:
-            if not await self.mt5.async_initialize():
+            closes = await self.loop.run_in_executor(None, self.deal_cursor.poll)
+            if closes is None:
+                # Terminal didn't answer; reattach and catch up next cycle
+                await self.mt5.async_initialize()
                 return
 
-            positions = await self.loop.run_in_executor(None, mt5.positions_get)
-            if positions is None:
-                return
+            if closes:
+                self.positions_dirty = True
+
+            # Exit deals are returned once, so ones left unconfirmed last cycle are retried here
+            pending = self.unconfirmed_closes
+            for close in closes:
+                pending[close.position_id] = close
 
-            current_position_tickets = {str(pos.ticket) for pos in positions}
+            for ticket, close in list(pending.items()):
+                if ticket not in self.open_positions:
+                    pending.pop(ticket)
+                    continue  # closed by us, or not a position this worker opened
 
-            for ticket in self.open_positions.copy():
-                # Check if position exists in current positions
-                if ticket not in current_position_tickets:
-                    await self.handle_mt5_close(ticket)
-                    self.open_positions.discard(ticket)
+                remaining = await self.loop.run_in_executor(
+                    None, lambda ticket=ticket: mt5.positions_get(ticket=int(ticket))
+                )
+                if remaining is None:
+                    # Terminal didn't answer: not proof of a full close, check again next cycle
+                    logger.warning(f"positions_get failed for MT5# {ticket}: {mt5.last_error()}, retrying")
+                    continue
+                pending.pop(ticket)
+                if remaining:
+                    print(f"🔳 MT5# {ticket} partially closed ({close.reason}): {close.volume} @ {close.price}")
+                    continue
 
-            self.open_positions = current_position_tickets
+                self._forget_ticket(ticket)
+                await self.handle_mt5_close(ticket, close)
 
         except Exception as e:
             logger.error(f"❌ Error checking positions: {e}")
 
-    async def handle_mt5_close(self, ticket: str) -> None:
+    async def publish_positions(self) -> None:
+        """Publish ticket -> volume and TV#<positionId> -> volume to Redis when due.
+
+        The proxy checks a TV position by its positionId, since each follower
+        holds it under its own ticket.
+        """
+        now = time.monotonic()
+        if not self.positions_dirty and now - self.last_snapshot < self.snapshot_interval:
+            return
+        try:
+            positions = await self.loop.run_in_executor(None, mt5.positions_get)
+            if positions is None:
+                return
+            snapshot = {str(pos.ticket): pos.volume for pos in positions}
+            for pos in positions:
+                if (pos.comment or '').startswith('TV#'):
+                    snapshot[pos.comment] = pos.volume
+            for position_id, ticket in self.position_tickets.items():
+                if ticket in snapshot:
+                    snapshot[f"TV#{position_id}"] = snapshot[ticket]
+            await self.queue.async_publish_positions(
+                snapshot,
+                ttl=int(self.snapshot_interval * 3) + 1
+            )
+            self.positions_dirty = False
+            self.last_snapshot = now
+        except Exception as e:
+            logger.error(f"❌ Error publishing positions snapshot: {e}")
+
+    async def handle_mt5_close(self, ticket: str, close=None) -> None:
         """Handle position closed in MT5 asynchronously."""
         try:            
-            print(f"📤 Processing MT5-initiated close for Ticket#: {ticket}")
+            reason = f" ({close.reason} @ {close.price})" if close else ""
+            print(f"📤 Processing MT5-initiated close for Ticket#: {ticket}{reason}")
                 
             # Get trade data from database
             trade = await self.db.async_get_trade_by_mt5_ticket(ticket)
@@ -318,10 +406,17 @@ class MT5Worker:
                 return
 
             # First update database status
-            await self.db.async_update_trade_status(trade['trade_id'], 'closed', {
+            update_data = {
                 'is_closed': True,
                 'closed_at': datetime.now(timezone.utc).isoformat()
-            })
+            }
+            if close:
+                # Deal times are broker server time, so closed_at stays our UTC clock like the other paths
+                update_data.update({
+                    'close_reason': close.reason,
+                    'close_price': close.price
+                })
+            await self.db.async_update_trade_status(trade['trade_id'], 'closed', update_data)
 
             # Log position details
             direction = trade.get('side', '').lower()
@@ -352,17 +447,22 @@ class MT5Worker:
         print("👀 Watching for trades...\n")
         
         try:
+            # Subscribe to Redis channels on this loop
+            await self.queue.async_subscribe(self.handle_message)
+
             # Initialize positions
             await self._initialize_positions()
             
-            # Start trailing stop monitor as a task
+            # Start tick poller and trailing stop monitor as tasks
             if self.mt5.initialized:
+                self.loop.create_task(self.mt5.ticks.run(self.loop))
                 self.loop.create_task(self.mt5.monitor_trailing_stops())
             
             # Main loop for position checking
             while self.running:
                 try:
                     await self.check_mt5_positions()
+                    await self.publish_positions()
                     await asyncio.sleep(1)
                 except Exception as e:
                     logger.error(f"❌ Error in position check: {e}")
@@ -386,8 +486,13 @@ class MT5Worker:
         logger.info("🛑 Initiating shutdown sequence...")
         self.running = False
         
-        # Wait a bit for ongoing operations to complete
-        await asyncio.sleep(0.5)
+        # Stop consuming and let in-flight trades complete
+        if self.queue:
+            await self.queue.async_cleanup()
+        
+        # Close async DB pool while the loop is still running
+        if self.db:
+            await self.db.async_cleanup()
         
         # Cleanup resources
         self.cleanup()
@@ -403,9 +508,6 @@ class MT5Worker:
             signal.signal(signal.SIGINT, self.handle_shutdown)
             signal.signal(signal.SIGTERM, self.handle_shutdown)
             
-            # Subscribe to Redis channels
-            self.queue.subscribe(self.handle_message)
-            
             # Run the main async loop
             self.loop.run_until_complete(self.run_async())
             
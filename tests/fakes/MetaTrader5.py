@@ -0,0 +1,98 @@
+"""Minimal stand-in for the Windows-only MetaTrader5 package.
+
+Put tests/fakes on sys.path (or PYTHONPATH for child processes) to run MT5
+code on Linux. FAKE_MT5_LATENCY_MS sets order_send latency; an order for
+symbol 'CRASH' kills the process to exercise supervisor restarts.
+"""
+import itertools
+import os
+import time
+from collections import namedtuple
+
+TRADE_ACTION_DEAL = 1
+TRADE_ACTION_SLTP = 6
+ORDER_TYPE_BUY = 0
+ORDER_TYPE_SELL = 1
+ORDER_TIME_GTC = 0
+ORDER_FILLING_FOK = 0
+ORDER_FILLING_IOC = 1
+TRADE_RETCODE_DONE = 10009
+DEAL_ENTRY_IN = 0
+DEAL_ENTRY_OUT = 1
+DEAL_ENTRY_INOUT = 2
+DEAL_ENTRY_OUT_BY = 3
+DEAL_REASON_CLIENT = 0
+DEAL_REASON_MOBILE = 1
+DEAL_REASON_WEB = 2
+DEAL_REASON_EXPERT = 3
+DEAL_REASON_SL = 4
+DEAL_REASON_TP = 5
+DEAL_REASON_SO = 6
+
+TerminalInfo = namedtuple('TerminalInfo', ['connected', 'trade_allowed', 'path'])
+AccountInfo = namedtuple('AccountInfo', ['login', 'server', 'balance'])
+SymbolInfo = namedtuple('SymbolInfo', ['name', 'visible', 'point', 'digits'])
+Tick = namedtuple('Tick', ['time', 'bid', 'ask', 'last'])
+TradeDeal = namedtuple('TradeDeal', [
+    'ticket', 'order', 'time', 'time_msc', 'type', 'entry', 'reason', 'position_id',
+    'volume', 'price', 'profit', 'symbol', 'comment'
+])
+OrderSendResult = namedtuple('OrderSendResult', [
+    'retcode', 'deal', 'order', 'volume', 'price', 'bid', 'ask', 'comment', 'request_id', 'request'
+])
+
+_state = {'login': None, 'server': None, 'path': None}
+_tickets = itertools.count(100000)
+
+def initialize(path=None, login=None, password=None, server=None, **kwargs):
+    _state.update(login=login, server=server, path=path)
+    return True
+
+def login(login, password=None, server=None, **kwargs):
+    _state.update(login=login, server=server)
+    return True
+
+def shutdown():
+    _state.update(login=None, server=None, path=None)
+
+def last_error():
+    return (1, 'Success')
+
+def terminal_info():
+    if _state['login'] is None:
+        return None
+    return TerminalInfo(connected=True, trade_allowed=True, path=_state['path'])
+
+def account_info():
+    if _state['login'] is None:
+        return None
+    return AccountInfo(login=_state['login'], server=_state['server'], balance=10000.0)
+
+def symbol_info(symbol):
+    return SymbolInfo(name=symbol, visible=True, point=0.00001, digits=5)
+
+def symbol_select(symbol, enable=True):
+    return True
+
+def symbol_info_tick(symbol):
+    return Tick(time=int(time.time()), bid=1.10000, ask=1.10010, last=1.10005)
+
+def order_send(request):
+    if _state['login'] is None:
+        return None
+    if request.get('symbol') == 'CRASH':
+        os._exit(3)
+    time.sleep(int(os.getenv('FAKE_MT5_LATENCY_MS', '0')) / 1000)
+    ticket = next(_tickets)
+    return OrderSendResult(
+        retcode=TRADE_RETCODE_DONE, deal=ticket, order=ticket,
+        volume=request.get('volume'), price=request.get('price'),
+        bid=1.10000, ask=1.10010, comment='Request executed',
+        request_id=ticket, request=request
+    )
+
+def positions_get(**kwargs):
+    return ()
+
+def history_deals_get(date_from, date_to, **kwargs):
+    return ()
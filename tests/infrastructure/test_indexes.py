@@ -0,0 +1,112 @@
+import json
+import logging
+
+from sqlalchemy import text
+
+from src.utils.database_handler import DatabaseHandler
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger('IndexTest')
+
+EXPECTED_INDEXES = [
+    'ix_trades_mt5_ticket',
+    'ix_trades_account_login_mt5_ticket',
+    'ix_trades_open_created_at',
+    'ix_trades_pending_status',
+]
+
+SEED_ROWS = 1_000_000
+
+# Hot lookups, written the way DatabaseHandler / AsyncDatabaseHandler issue them
+HOT_QUERIES = {
+    'trade by mt5_ticket': "SELECT * FROM trades_explain WHERE mt5_ticket = '100500000' LIMIT 1",
+    'trade by account + ticket': (
+        "SELECT * FROM trades_explain WHERE account_login = '3' AND mt5_ticket = '100500003' LIMIT 1"
+    ),
+    'latest active trade': (
+        "SELECT * FROM trades_explain "
+        "WHERE position_id IS NOT NULL AND is_closed IS false AND mt5_ticket IS NOT NULL "
+        "ORDER BY created_at DESC LIMIT 1"
+    ),
+    'pending trades': "SELECT * FROM trades_explain WHERE status = 'pending'",
+    'pending closes': "SELECT * FROM trades_explain WHERE status = 'close_pending'",
+}
+
+def seq_scans(plan):
+    """Return relations read with a sequential scan anywhere in the plan tree."""
+    found = []
+    if plan.get('Node Type') == 'Seq Scan':
+        found.append(plan.get('Relation Name'))
+    for child in plan.get('Plans', []):
+        found.extend(seq_scans(child))
+    return found
+
+def test_trade_indexes():
+    """Check hot trade lookups use indexes on a 1M-row table."""
+    print("\nTesting Trade Lookup Indexes")
+    print("============================")
+
+    db = None
+    try:
+        db = DatabaseHandler()
+
+        with db.get_db() as session:
+            print("\n1. Checking migration b7c2d91e4f03 is applied...")
+            existing = {
+                row[0] for row in session.execute(
+                    text("SELECT indexname FROM pg_indexes WHERE tablename = 'trades'")
+                )
+            }
+            missing = [name for name in EXPECTED_INDEXES if name not in existing]
+            assert not missing, f"Missing indexes (run alembic upgrade head): {missing}"
+            print("✅ All indexes present")
+
+            print(f"\n2. Seeding {SEED_ROWS:,} rows into a temp copy of trades...")
+            # Temp table lives only for this session; LIKE copies the (partial) indexes
+            session.execute(text("CREATE TEMP TABLE trades_explain (LIKE trades INCLUDING INDEXES)"))
+            session.execute(text("""
+                INSERT INTO trades_explain (
+                    id, trade_id, order_id, position_id, mt5_ticket, account_login,
+                    instrument, side, quantity, type, status, is_closed, created_at
+                )
+                SELECT
+                    g, 'EXPLAIN_' || g, 'O' || g, 'P' || g, (100000000 + g)::text, (g % 20)::text,
+                    'EURUSD', 'buy', 0.01, 'market',
+                    CASE WHEN g % 1000 = 0 THEN 'pending'
+                         WHEN g % 1000 = 1 THEN 'close_pending'
+                         ELSE 'closed' END,
+                    g % 100 <> 0,
+                    now() - (g || ' seconds')::interval
+                FROM generate_series(1, :rows) AS g
+            """), {'rows': SEED_ROWS})
+            session.execute(text("ANALYZE trades_explain"))
+            print("✅ Seeded and analyzed")
+
+            print("\n3. Checking query plans...")
+            for name, query in HOT_QUERIES.items():
+                result = session.execute(text(f"EXPLAIN (FORMAT JSON) {query}")).scalar()
+                plan = (json.loads(result) if isinstance(result, str) else result)[0]['Plan']
+                scans = seq_scans(plan)
+                assert not scans, f"{name} does a sequential scan on {scans}"
+                print(f"✅ {name}: {plan['Node Type']}")
+
+            session.rollback()
+
+        print("\nAll index tests passed! ✨")
+
+    except Exception as e:
+        print(f"\n❌ Index test failed: {e}")
+        raise
+    finally:
+        if db:
+            db.cleanup()
+            print("\nDatabase connection cleaned up")
+
+if __name__ == "__main__":
+    try:
+        test_trade_indexes()
+    except KeyboardInterrupt:
+        print("\nTest cancelled by user")
+    except Exception as e:
+        print(f"Test failed: {e}")
+        exit(1)
@@ -1,4 +1,5 @@
 import logging
+import time
 from typing import Any, Dict
 
 from src.utils.queue_handler import RedisQueue
@@ -44,6 +45,22 @@ def test_redis_connection():
         status = queue.get_queue_status()
         print(f"✅ Queue status retrieved: {status}")
         
+        # Test durable streams mode
+        print("\n5. Testing streams consumer group...")
+        stream_queue = RedisQueue(mode='streams', consumer='test-consumer')
+        try:
+            stream_messages = []
+            stream_queue.push_trade({"test": "stream"})
+            stream_queue.subscribe(lambda msg_type, data: stream_messages.append(data))
+            for _ in range(30):
+                if stream_messages:
+                    break
+                time.sleep(0.1)
+            assert stream_messages, "No message received from trade stream"
+            print(f"✅ Stream delivered message published before subscribe: {stream_messages[0]['id']}")
+        finally:
+            stream_queue.cleanup()
+        
         print("\nAll Redis tests passed! ✨")
         
     except Exception as e:
@@ -0,0 +1,92 @@
+import logging
+import os
+import time
+from pathlib import Path
+
+from src.services.mt5_supervisor import MT5Supervisor
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger('SupervisorTest')
+
+ACCOUNTS = [
+    {'login': 1001 + i, 'password': 'x', 'server': 'Demo', 'path': f'C:/MT5/{i}/terminal64.exe'}
+    for i in range(3)
+]
+
+# Terminal processes import the fake MetaTrader5 from here
+FAKES_DIR = str(Path(__file__).parent.parent / 'fakes')
+
+TRADE_RETCODE_DONE = 10009
+ORDER = {
+    'action': 1,        # TRADE_ACTION_DEAL
+    'symbol': 'EURUSD',
+    'volume': 0.01,
+    'type': 0,          # ORDER_TYPE_BUY
+    'deviation': 10,
+    'type_time': 0,     # ORDER_TIME_GTC
+    'type_filling': 0,  # ORDER_FILLING_FOK
+}
+
+def test_supervisor():
+    """Test parallel dispatch and crash restart with a fake MetaTrader5."""
+    print("\nTesting MT5 Supervisor")
+    print("======================")
+
+    saved_env = {key: os.environ.get(key) for key in ('PYTHONPATH', 'FAKE_MT5_LATENCY_MS')}
+    os.environ['PYTHONPATH'] = os.pathsep.join(filter(None, [FAKES_DIR, saved_env['PYTHONPATH']]))
+    os.environ['FAKE_MT5_LATENCY_MS'] = '300'
+
+    supervisor = MT5Supervisor(ACCOUNTS, monitor_interval=0.2)
+    try:
+        print("\n1. Starting one process per terminal...")
+        supervisor.start()
+        results = supervisor.broadcast(ORDER, timeout=15)  # warm-up: interpreter start + login
+        assert all(r and r['retcode'] == TRADE_RETCODE_DONE for r in results.values()), results
+        print(f"✅ {len(results)} terminal processes ready")
+
+        print("\n2. Testing concurrent fan-out...")
+        start = time.perf_counter()
+        results = supervisor.broadcast(ORDER, timeout=5)
+        elapsed = time.perf_counter() - start
+        assert all(r and r['retcode'] == TRADE_RETCODE_DONE for r in results.values()), results
+        # Three 300ms orders in well under the 900ms a serial loop would need
+        assert elapsed < 0.6, f"Fan-out took {elapsed:.2f}s"
+        print(f"✅ {len(results)} followers filled in {elapsed * 1000:.0f}ms")
+
+        print("\n3. Testing restart after crash...")
+        crashed = str(ACCOUNTS[0]['login'])
+        result = supervisor.submit(crashed, {**ORDER, 'symbol': 'CRASH'}).result(timeout=5)
+        assert result is None, "Crashed order should resolve to None"
+
+        deadline = time.time() + 10
+        while time.time() < deadline and not (
+            supervisor.status()[crashed]['alive'] and supervisor.status()[crashed]['restarts'] == 1
+        ):
+            time.sleep(0.1)
+        assert supervisor.status()[crashed]['restarts'] == 1, supervisor.status()
+
+        result = supervisor.submit(crashed, ORDER).result(timeout=15)
+        assert result and result['retcode'] == TRADE_RETCODE_DONE, result
+        print("✅ Crashed terminal process restarted and accepting orders")
+
+        print("\nAll supervisor tests passed! ✨")
+
+    except Exception as e:
+        print(f"\n❌ Supervisor test failed: {e}")
+        raise
+    finally:
+        supervisor.stop()
+        for key, value in saved_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+if __name__ == "__main__":
+    try:
+        test_supervisor()
+    except KeyboardInterrupt:
+        print("\nTest cancelled by user")
+    except Exception as e:
+        print(f"Test failed: {e}")
+        exit(1)
@@ -0,0 +1,109 @@
+import importlib.util
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+# Use the fake terminal API where the real (Windows-only) package is missing
+if importlib.util.find_spec('MetaTrader5') is None:
+    sys.path.insert(0, str(Path(__file__).parent.parent / 'fakes'))
+
+import MetaTrader5 as mt5
+
+from src.services import deal_cursor
+from src.services.deal_cursor import DealCursor
+
+NOW_MSC = int(time.time() * 1000)
+
+def deal(ticket, time_msc, entry=mt5.DEAL_ENTRY_OUT, reason=mt5.DEAL_REASON_SL, position_id=None):
+    return mt5.TradeDeal(
+        ticket=ticket, order=ticket, time=time_msc // 1000, time_msc=time_msc, type=0,
+        entry=entry, reason=reason, position_id=position_id or ticket + 1000,
+        volume=0.1, price=1.1, profit=5.0, symbol='EURUSD', comment=''
+    )
+
+@pytest.fixture
+def history(monkeypatch):
+    """Deals the fake terminal returns, the date_from of each call, and the server clock."""
+    state = {'deals': [], 'calls': [], 'server_msc': NOW_MSC}
+
+    def history_deals_get(date_from, date_to):
+        state['calls'].append(date_from)
+        return tuple(state['deals'])
+
+    def symbol_info_tick(symbol):
+        return SimpleNamespace(time=state['server_msc'] // 1000, time_msc=state['server_msc'], bid=1.1, ask=1.1001)
+
+    monkeypatch.setattr(deal_cursor.mt5, 'history_deals_get', history_deals_get)
+    monkeypatch.setattr(deal_cursor.mt5, 'symbol_info_tick', symbol_info_tick)
+    return state
+
+def test_only_exit_deals_are_returned(history):
+    history['deals'] = [
+        deal(1, NOW_MSC, entry=mt5.DEAL_ENTRY_IN),
+        deal(2, NOW_MSC + 1, entry=mt5.DEAL_ENTRY_OUT, reason=mt5.DEAL_REASON_TP),
+        deal(3, NOW_MSC + 2, entry=mt5.DEAL_ENTRY_OUT_BY, reason=mt5.DEAL_REASON_CLIENT),
+    ]
+    closes = DealCursor().poll()
+    assert [c.deal for c in closes] == [2, 3]
+    assert [c.reason for c in closes] == ['tp', 'manual']
+    assert closes[0].position_id == '1002'
+
+def test_each_deal_is_returned_once(history):
+    cursor = DealCursor()
+    history['deals'] = [deal(1, NOW_MSC), deal(2, NOW_MSC + 500)]
+    assert [c.deal for c in cursor.poll()] == [1, 2]
+
+    # Re-read window overlaps the last second: nothing new comes back
+    assert cursor.poll() == []
+
+    history['deals'].append(deal(3, NOW_MSC + 900))
+    assert [c.deal for c in cursor.poll()] == [3]
+
+def test_cursor_moves_forward(history):
+    cursor = DealCursor()
+    history['deals'] = [deal(1, NOW_MSC)]
+    cursor.poll()
+    history['deals'] = [deal(1, NOW_MSC + 5000)]
+    cursor.poll()
+    assert cursor.cursor_msc == NOW_MSC  # ticket 1 already seen; cursor stays
+    history['deals'] = [deal(2, NOW_MSC + 5000)]
+    cursor.poll()
+    assert cursor.cursor_msc == NOW_MSC + 5000
+
+    # The next query starts from the cursor's second, not the original lookback
+    cursor.poll()
+    assert history['calls'][-1].timestamp() == (NOW_MSC + 5000) // 1000
+
+    # Deals older than the re-read window are ignored, and seen tickets are pruned
+    history['deals'] = [deal(9, NOW_MSC + 1000), deal(10, NOW_MSC + 7000)]
+    assert [c.deal for c in cursor.poll()] == [10]
+    assert set(cursor.seen) == {10}
+
+@pytest.mark.parametrize('offset_hours', [-5, 3])
+def test_cursor_seeded_from_server_clock(history, offset_hours):
+    """A server clock behind UTC must not hide new closes; one ahead must not replay old ones."""
+    server_now = NOW_MSC + offset_hours * 3600 * 1000
+    history['server_msc'] = server_now
+    cursor = DealCursor(lookback_seconds=60)
+
+    # Nothing to read the server clock from yet
+    assert cursor.poll() == []
+    assert cursor.cursor_msc is None
+
+    history['deals'] = [deal(1, server_now - 3600 * 1000), deal(2, server_now - 10 * 1000)]
+    assert [c.deal for c in cursor.poll()] == [2]
+    assert cursor.cursor_msc == server_now - 10 * 1000
+
+    history['deals'].append(deal(3, server_now + 500))
+    assert [c.deal for c in cursor.poll()] == [3]
+
+def test_terminal_failure_returns_none(history, monkeypatch):
+    cursor = DealCursor()
+    history['deals'] = [deal(1, NOW_MSC)]
+    cursor.poll()
+    monkeypatch.setattr(deal_cursor.mt5, 'history_deals_get', lambda date_from, date_to: None)
+    assert cursor.poll() is None
+    assert cursor.cursor_msc == NOW_MSC
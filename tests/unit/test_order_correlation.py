@@ -0,0 +1,123 @@
+import asyncio
+import json
+import time
+
+from src.core.order_correlation import OrderCorrelation
+
+KEY = 'orders:pending'
+
+class HashStore:
+    """The few Redis hash commands OrderCorrelation uses, sync and async."""
+
+    def __init__(self, stored=None):
+        self.hash = dict(stored or {})
+
+    def hgetall(self, key):
+        return dict(self.hash)
+
+    def hdel(self, key, *fields):
+        for field in fields:
+            self.hash.pop(field, None)
+
+    def hset(self, key, field, value):
+        self.hash[field] = value
+
+    def expire(self, key, seconds):
+        pass
+
+class AsyncHashStore:
+    def __init__(self, store: HashStore):
+        self.store = store
+
+    async def hset(self, key, field, value):
+        self.store.hset(key, field, value)
+
+    async def hdel(self, key, *fields):
+        self.store.hdel(key, *fields)
+
+    def pipeline(self, transaction=False):
+        return Pipeline(self.store)
+
+class Pipeline:
+    def __init__(self, store: HashStore):
+        self.store = store
+        self.commands = []
+
+    def __getattr__(self, name):
+        return lambda *args: self.commands.append((name, args))
+
+    async def execute(self):
+        return [getattr(self.store, name)(*args) for name, args in self.commands]
+
+def correlation(stored=None, **kwargs):
+    store = HashStore(stored)
+    return OrderCorrelation(store, AsyncHashStore(store), key=KEY, **kwargs), store
+
+def test_add_get_and_mirror():
+    orders, store = correlation(max_size=10, ttl_seconds=60)
+    asyncio.run(orders.add('O1', 'T1'))
+    assert orders.get('O1') == 'T1'
+    assert orders.get('O2') is None
+    assert json.loads(store.hash['O1'])['trade_id'] == 'T1'
+    assert orders.stats() == {'size': 1, 'hits': 1, 'misses': 1, 'evictions': 0}
+
+def test_cap_evicts_least_recently_used():
+    orders, store = correlation(max_size=2, ttl_seconds=60)
+
+    async def scenario():
+        await orders.add('O1', 'T1')
+        await orders.add('O2', 'T2')
+        orders.get('O1')  # O2 is now the least recently used
+        return await orders.add('O3', 'T3')
+
+    assert asyncio.run(scenario()) == [('O2', 'T2')]
+    assert 'O1' in orders and 'O3' in orders and 'O2' not in orders
+    assert set(store.hash) == {'O1', 'O3'}
+
+def test_expired_entries_are_dropped():
+    orders, _ = correlation(max_size=10, ttl_seconds=60)
+    asyncio.run(orders.add('O1', 'T1'))
+    trade_id, created_at, published = orders.entries['O1']
+    orders.entries['O1'] = (trade_id, created_at - 120, published)
+
+    assert orders.get('O1') is None
+    assert 'O1' not in orders
+    assert orders.evictions == 1
+
+def test_publish_claim_is_exclusive_until_released():
+    orders, store = correlation(max_size=10, ttl_seconds=60)
+    asyncio.run(orders.add('O1', 'T1'))
+    assert orders.claim_publish('O1')
+    assert not orders.claim_publish('O1')
+
+    orders.release_publish('O1')
+    assert orders.claim_publish('O1')
+    asyncio.run(orders.mark_published('O1'))
+    assert json.loads(store.hash['O1'])['published'] is True
+    assert not orders.claim_publish('unknown')
+
+def test_hydrate_restores_live_entries_in_age_order():
+    now = time.time()
+    stored = {
+        'O2': json.dumps({'trade_id': 'T2', 'created_at': now - 10, 'published': True}),
+        'O1': json.dumps({'trade_id': 'T1', 'created_at': now - 20}),
+        'OLD': json.dumps({'trade_id': 'T0', 'created_at': now - 1000}),
+    }
+    orders, store = correlation(stored, max_size=10, ttl_seconds=60)
+    assert orders.hydrate() == 2
+    assert list(orders.entries) == ['O1', 'O2']
+    assert orders.is_published('O2') and not orders.is_published('O1')
+    assert 'OLD' not in store.hash
+
+def test_hydrate_skips_and_deletes_malformed_entries():
+    now = time.time()
+    stored = {
+        'O1': json.dumps({'trade_id': 'T1', 'created_at': now}),
+        'BAD_JSON': '{not json',
+        'NO_TRADE': json.dumps({'created_at': now}),
+        'NOT_A_DICT': json.dumps([1, 2]),
+    }
+    orders, store = correlation(stored, max_size=10, ttl_seconds=60)
+    assert orders.hydrate() == 1
+    assert orders.get('O1') == 'T1'
+    assert set(store.hash) == {'O1'}
@@ -0,0 +1,74 @@
+from src.core.position_index import PositionIndex
+
+def order(trade_id, order_id, tp_order_id=None, sl_order_id=None, **fields):
+    return {
+        'trade_id': trade_id, 'order_id': order_id, 'tp_order_id': tp_order_id,
+        'sl_order_id': sl_order_id, 'instrument': 'EURUSD', 'side': 'buy', 'quantity': '1', **fields
+    }
+
+def test_bind_moves_order_under_position():
+    index = PositionIndex(max_size=10)
+    index.add_order('T1', order('T1', 'O1'))
+    entry = index.bind('T1', 'P1', execution_price=1.1)
+    assert entry['position_id'] == 'P1' and entry['execution_price'] == 1.1
+    assert index.get_order('T1') is None
+    assert index.get('P1')['trade_id'] == 'T1'
+    assert index.bind('T1', 'P2') is None
+
+def test_tp_sl_order_lookup():
+    index = PositionIndex(max_size=10)
+    index.add_order('T1', order('T1', 'O1', tp_order_id='TP1', sl_order_id='SL1'))
+    # Not executed yet: the order IDs are known but there is no position
+    assert index.find_by_order_id('TP1') is None
+
+    index.bind('T1', 'P1')
+    assert index.find_by_order_id('TP1')['position_id'] == 'P1'
+    assert index.find_by_order_id('SL1')['position_id'] == 'P1'
+    assert index.find_by_order_id('O1')['position_id'] == 'P1'
+    # TV suffixes TP/SL order IDs as 'orderId.TP.timestamp'
+    assert index.find_by_order_id('TP1.TP.1712345678')['position_id'] == 'P1'
+    assert index.find_by_order_id('unknown') is None
+
+def test_drop_order_unlinks_order_ids():
+    index = PositionIndex(max_size=10)
+    index.add_order('T1', order('T1', 'O1', tp_order_id='TP1'))
+    index.drop_order('T1')
+    assert index.get_order('T1') is None
+    assert 'O1' not in index.order_ids and 'TP1' not in index.order_ids
+    index.drop_order('T1')  # already gone: no-op
+
+def test_drop_order_keeps_links_of_bound_position():
+    index = PositionIndex(max_size=10)
+    index.put('P1', order('T1', 'O1', tp_order_id='TP1'))
+    # An order entry for the same trade (e.g. re-added) must not unlink the open position
+    index.add_order('T1', order('T1', 'O1', tp_order_id='TP1'))
+    index.drop_order('T1')
+    assert index.find_by_order_id('TP1')['position_id'] == 'P1'
+
+def test_evict_forgets_order_ids():
+    index = PositionIndex(max_size=10)
+    index.put('P1', order('T1', 'O1', sl_order_id='SL1'))
+    index.evict('P1')
+    assert index.get('P1') is None
+    assert index.find_by_order_id('SL1') is None
+    assert 'T1' not in index.trade_positions
+
+def test_least_recently_used_is_evicted_when_full():
+    index = PositionIndex(max_size=2)
+    index.put('P1', order('T1', 'O1'))
+    index.put('P2', order('T2', 'O2'))
+    index.get('P1')
+    index.put('P3', order('T3', 'O3'))
+    assert index.get('P2') is None
+    assert index.get('P1') and index.get('P3')
+    assert index.find_by_order_id('O2') is None
+
+def test_ticket_seen_at_stamped_once():
+    index = PositionIndex(max_size=10)
+    index.put('P1', order('T1', 'O1'))
+    assert index.get('P1')['ticket_seen_at'] is None
+    index.update('P1', mt5_ticket='555')
+    seen_at = index.get('P1')['ticket_seen_at']
+    assert seen_at
+    index.update('P1', quantity='0.5')
+    assert index.get('P1')['ticket_seen_at'] == seen_at
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from src.utils.queue_handler import PriorityBuffer, RedisQueue, classify_trade
+
+CLOSE = {'execution_data': {'isClose': True}}
+UPDATE = {'type': 'update'}
+OPEN = {'execution_data': {'isClose': False}}
+
+def drain(buffer: PriorityBuffer, count: int) -> list:
+    async def take():
+        return [await buffer.get() for _ in range(count)]
+    return asyncio.run(take())
+
+def fill(buffer: PriorityBuffer, items: list) -> None:
+    async def put():
+        for lane, item in items:
+            await buffer.put(lane, item)
+    asyncio.run(put())
+
+def test_classify_trade():
+    assert classify_trade(CLOSE) == 'close'
+    assert classify_trade(UPDATE) == 'update'
+    assert classify_trade(OPEN) == 'open'
+    assert classify_trade(None) == 'open'
+
+def test_status_and_errors_use_lowest_lane():
+    assert RedisQueue._message_lane('status', {'message': 'up'}) == 'open'
+    assert RedisQueue._message_lane('error', {'error': 'boom'}) == 'open'
+    assert RedisQueue._message_lane('trade', {'data': CLOSE}) == 'close'
+    assert RedisQueue._message_lane('trade', {'priority': 'update', 'data': OPEN}) == 'update'
+
+def test_highest_lane_first():
+    buffer = PriorityBuffer(starvation_limit=10)
+    fill(buffer, [('open', 'o1'), ('update', 'u1'), ('close', 'c1'), ('open', 'o2'), ('close', 'c2')])
+    assert drain(buffer, 5) == ['c1', 'c2', 'u1', 'o1', 'o2']
+    assert buffer.depths() == {'close': 0, 'update': 0, 'open': 0}
+    assert buffer.dispatched == {'close': 2, 'update': 1, 'open': 2}
+
+def test_starved_lane_is_served():
+    buffer = PriorityBuffer(starvation_limit=2)
+    fill(buffer, [('open', 'o1')] + [('close', f"c{i}") for i in range(4)])
+    # The open is passed over twice, then goes ahead of the remaining closes
+    assert drain(buffer, 5) == ['c0', 'c1', 'o1', 'c2', 'c3']
+
+def test_full_lane_blocks_only_itself():
+    async def scenario():
+        buffer = PriorityBuffer(lane_capacity=2)
+        await buffer.put('open', 'o1')
+        await buffer.put('open', 'o2')
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(buffer.put('open', 'o3'), timeout=0.05)
+
+        # Closes are still buffered while opens are full
+        await asyncio.wait_for(buffer.put('close', 'c1'), timeout=0.05)
+        assert buffer.depths() == {'close': 1, 'update': 0, 'open': 2}
+
+        # Taking one open frees a slot for the next
+        assert await buffer.get() == 'c1'
+        assert await buffer.get() == 'o1'
+        await asyncio.wait_for(buffer.put('open', 'o3'), timeout=0.05)
+        return [await buffer.get() for _ in range(2)]
+
+    assert asyncio.run(scenario()) == ['o2', 'o3']
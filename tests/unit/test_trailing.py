@@ -0,0 +1,63 @@
+import numpy as np
+
+from src.utils.trailing import compute_trailing_stops, round_to_digits
+
+def trail(is_buy, bid, ask, pips, last_sl, pip_size=0.0001, digits=5, step=0.00001):
+    count = len(is_buy)
+    return compute_trailing_stops(
+        np.array(is_buy, dtype=bool),
+        np.array(bid, dtype=float),
+        np.array(ask, dtype=float),
+        np.array(pips, dtype=float),
+        np.full(count, pip_size),
+        np.array(last_sl, dtype=float),
+        np.full(count, digits, dtype=float),
+        np.full(count, step)
+    )
+
+def test_round_to_digits_per_row():
+    values = np.array([1.234567, 150.12345])
+    assert np.allclose(round_to_digits(values, np.array([5.0, 3.0])), [1.23457, 150.123])
+
+def test_buy_trails_below_bid_and_moves_up():
+    new_sl, move = trail([True], [1.10500], [1.10510], [10], [1.10300])
+    assert np.isclose(new_sl[0], 1.10400)
+    assert move[0]
+
+def test_sell_trails_above_ask_and_moves_down():
+    new_sl, move = trail([False], [1.10500], [1.10510], [10], [1.10700])
+    assert np.isclose(new_sl[0], 1.10610)
+    assert move[0]
+
+def test_no_move_when_stop_would_worsen_or_step_too_small():
+    new_sl, move = trail(
+        [True, False, True, False],
+        [1.10500, 1.10500, 1.10500, 1.10500],
+        [1.10510, 1.10510, 1.10510, 1.10510],
+        [10, 10, 10, 10],
+        # buy SL already above, sell SL already below, then both less than one step better
+        [1.10450, 1.10550, 1.103995, 1.106105]
+    )
+    assert not move.any()
+    assert np.allclose(new_sl, [1.10400, 1.10610, 1.10400, 1.10610])
+
+def test_first_stop_always_set():
+    _, move = trail([True, False], [1.10500, 1.10500], [1.10510, 1.10510], [10, 10], [0.0, 0.0])
+    assert move.all()
+
+def test_mixed_batch_matches_scalar_rule():
+    rng = np.random.default_rng(7)
+    count = 500
+    is_buy = rng.random(count) < 0.5
+    bid = np.round(rng.uniform(0.5, 2.0, count), 5)
+    ask = np.round(bid + 0.0001, 5)
+    pips = rng.choice([5.0, 10.0, 20.0], count)
+    last_sl = np.round(np.where(is_buy, bid - 0.0015, ask + 0.0015), 5)
+
+    new_sl, move = trail(is_buy, bid, ask, pips, last_sl)
+    for i in range(count):
+        distance = round(pips[i] * 0.0001, 5)
+        expected = round(bid[i] - distance, 5) if is_buy[i] else round(ask[i] + distance, 5)
+        moved = expected - last_sl[i] if is_buy[i] else last_sl[i] - expected
+        assert np.isclose(new_sl[i], expected)
+        assert move[i] == (round(moved / 0.00001, 6) >= 1)